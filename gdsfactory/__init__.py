@@ -30,9 +30,13 @@ from gdsfactory.port import Port
 from gdsfactory.cell import cell
 from gdsfactory.cell import cell_without_validator
 from gdsfactory.cell import clear_cache
+from gdsfactory.cell import cache_info
+from gdsfactory.cell import set_cache_limits
+from gdsfactory.cell import merge_cache
 from gdsfactory.tech import LAYER
 from gdsfactory.show import show
 from gdsfactory.read.import_gds import import_gds
+from gdsfactory.read.import_oas import import_oas
 from gdsfactory.cross_section import CrossSection, Section
 from gdsfactory.types import Label
 
@@ -66,7 +70,7 @@ from gdsfactory.add_padding import (
     add_padding_container,
     get_padding_points,
 )
-from gdsfactory.fill import fill_rectangle
+from gdsfactory.fill import fill_density, fill_rectangle
 from gdsfactory.pack import pack
 from gdsfactory.grid import grid, grid_with_text
 from gdsfactory.pdk import (
@@ -78,6 +82,7 @@ from gdsfactory.pdk import (
     get_cell,
 )
 from gdsfactory.get_factories import get_cells
+from gdsfactory.build_parallel import build_parallel
 from gdsfactory.cross_section import get_cross_section_factories
 
 
@@ -111,16 +116,21 @@ __all__ = [
     "cell",
     "cell_without_validator",
     "clear_cache",
+    "cache_info",
+    "set_cache_limits",
+    "merge_cache",
     "components",
     "cross_section",
     "dft",
     "export",
+    "fill_density",
     "fill_rectangle",
     "functions",
     "get_padding_points",
     "grid",
     "grid_with_text",
     "import_gds",
+    "import_oas",
     "klive",
     "layers",
     "mask",
@@ -144,6 +154,7 @@ __all__ = [
     "get_cross_section",
     "get_cell",
     "get_cells",
+    "build_parallel",
     "get_cross_section_factories",
     "quickplotter",
     "quickplot2",
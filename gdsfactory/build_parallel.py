@@ -0,0 +1,149 @@
+"""Build many independent Components in a process pool and assemble them.
+
+Each worker builds a spec with the active PDK and sends the Component back
+(pickled). The results are merged into the CACHE of the main process with
+`merge_cache` in the order of the specs, so cells shared between dies are not
+duplicated and names are the same as building the specs serially.
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from tqdm import tqdm
+
+from gdsfactory.cell import CACHE, merge_cache
+from gdsfactory.component import Component
+from gdsfactory.grid import grid
+from gdsfactory.pdk import Pdk, get_active_pdk, set_active_pdk
+from gdsfactory.serialization import clean_value_name
+from gdsfactory.types import ComponentSpec
+
+# name of the Component built for each (pdk name, spec), to skip specs in the CACHE
+BUILT: Dict[Tuple[str, str], str] = {}
+
+
+def _init_worker(pdk: Pdk) -> None:
+    set_active_pdk(pdk)
+
+
+def _build(component: ComponentSpec) -> Component:
+    return get_active_pdk().get_component(component)
+
+
+def build_components_parallel(
+    specs: Sequence[ComponentSpec],
+    max_workers: Optional[int] = None,
+    progress: bool = True,
+) -> List[Component]:
+    """Returns list of Components built in a process pool.
+
+    Identical specs are only built once, and specs built by a previous call
+    are taken from the CACHE.
+
+    Args:
+        specs: component specs resolvable by the active Pdk.get_component.
+            They need to be picklable (strings, dicts, module level functions
+            or partials).
+        max_workers: number of processes. Defaults to the number of CPUs.
+            max_workers=1 builds serially in this process.
+        progress: shows a progress bar.
+    """
+    pdk = get_active_pdk()
+    keys = [
+        None if isinstance(spec, Component) else clean_value_name(spec)
+        for spec in specs
+    ]
+    unique_specs = {key: spec for key, spec in zip(keys, specs) if key is not None}
+    built: Dict[str, Component] = {}
+
+    for key in list(unique_specs):
+        name = BUILT.get((pdk.name, key))
+        if name in CACHE:
+            built[key] = CACHE[name]
+            unique_specs.pop(key)
+
+    if max_workers == 1 or len(unique_specs) <= 1:
+        for key, spec in tqdm(unique_specs.items(), disable=not progress):
+            built[key] = pdk.get_component(spec)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=max_workers, initializer=_init_worker, initargs=(pdk,)
+        ) as executor:
+            futures = {
+                key: executor.submit(_build, spec) for key, spec in unique_specs.items()
+            }
+            for _ in tqdm(
+                as_completed(futures.values()),
+                total=len(futures),
+                disable=not progress,
+            ):
+                pass
+
+        # merge in submission order, so renamed cells do not depend on timing
+        for key, future in futures.items():
+            built[key] = merge_cache(future.result())
+
+    for key in unique_specs:
+        BUILT[(pdk.name, key)] = built[key].name
+    return [spec if key is None else built[key] for key, spec in zip(keys, specs)]
+
+
+def build_parallel(
+    specs: Sequence[ComponentSpec],
+    max_workers: Optional[int] = None,
+    progress: bool = True,
+    assemble: Callable[..., Component] = grid,
+    **kwargs,
+) -> Component:
+    """Returns Component with specs built in a process pool.
+
+    The result (name, geometry and settings) is the same as
+    `assemble([gf.get_component(spec) for spec in specs], **kwargs)`.
+
+    Args:
+        specs: component specs resolvable by the active Pdk.get_component.
+        max_workers: number of processes. Defaults to the number of CPUs.
+        progress: shows a progress bar.
+        assemble: function that places a list of components (grid, pack ...).
+
+    Keyword Args:
+        settings for assemble.
+
+    .. code::
+
+        import gdsfactory as gf
+
+        specs = [dict(component="mzi", settings=dict(delta_length=i)) for i in range(100)]
+        c = gf.build_parallel(specs, max_workers=8, spacing=(50, 50))
+
+    """
+    components = build_components_parallel(
+        specs, max_workers=max_workers, progress=progress
+    )
+    return assemble(tuple(components), **kwargs)
+
+
+def test_build_parallel() -> None:
+    import gdsfactory as gf
+
+    specs = [
+        dict(component="mzi", settings=dict(delta_length=length))
+        for length in [10, 20, 30, 10]
+    ] + ["straight"]
+    c1 = build_parallel(specs, max_workers=2, progress=False)
+    gf.clear_cache()
+    c2 = grid(tuple(gf.get_component(spec) for spec in specs))
+
+    assert c1.name == c2.name
+    assert len(c1.references) == len(specs)
+    names = [cell.name for cell in c1.get_dependencies(recursive=True)]
+    assert len(names) == len(set(names))
+    assert (c1.bbox == c2.bbox).all()
+
+
+if __name__ == "__main__":
+    specs = [
+        dict(component="mzi", settings=dict(delta_length=length))
+        for length in range(10, 100, 10)
+    ]
+    c = build_parallel(specs)
+    c.show()
@@ -1,19 +1,55 @@
 """cell decorator"""
+import collections
+import contextlib
 import copy
 import functools
 import hashlib
 import inspect
-from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+import itertools
+import threading
+import types
+import weakref
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, TypeVar
 
 import toolz
 from pydantic import BaseModel, validate_arguments
 
+from gdsfactory.cell_cache import DISK_CACHE
 from gdsfactory.component import Component
+from gdsfactory.config import CONF
 from gdsfactory.name import MAX_NAME_LENGTH, clean_name, get_name_short
 from gdsfactory.serialization import clean_dict, clean_value_name
 
 CACHE: Dict[str, Component] = {}
 
+# evicted cells that are still alive (referenced by a live parent or a user
+# variable) so that asking for them again returns the same object
+CACHE_EVICTED: "weakref.WeakValueDictionary[str, Component]" = (
+    weakref.WeakValueDictionary()
+)
+# estimated size of each cached cell, only measured when max_bytes is set
+CACHE_NBYTES: Dict[str, int] = {}
+_nbytes_total = 0
+# cells not built by @cell added by merge_cache, to rename cells from
+# different processes with the same name
+CACHE_MERGED: "weakref.WeakValueDictionary[str, Component]" = (
+    weakref.WeakValueDictionary()
+)
+# (function, call arguments) to cell name for cache hits without building the
+# name, and the call keys of each cell name to drop them on eviction
+CALL_NAMES: Dict[Hashable, str] = {}
+CALL_KEYS: Dict[str, List[Hashable]] = {}
+CACHE_STATS: Dict[str, int] = dict(hits=0, misses=0, evictions=0)
+CACHE_LIMITS: Dict[str, Optional[int]] = dict(
+    max_entries=CONF.get("cell_cache_max_entries"),
+    max_bytes=CONF.get("cell_cache_max_bytes"),
+)
+
+# guards CACHE, CACHE_EVICTED, CACHE_NBYTES, CACHE_STATS and _BUILD_LOCKS
+_CACHE_LOCK = threading.RLock()
+# cell name: [build lock, number of threads using it]
+_BUILD_LOCKS: Dict[str, list] = {}
+
 INFO_VERSION = 2
 
 
@@ -22,9 +58,21 @@ class CellReturnTypeError(ValueError):
 
 
 def clear_cache() -> None:
-    """Clears Component CACHE."""
-    global CACHE
-    CACHE = {}
+    """Clears Component CACHE and the routes cached by from_yaml."""
+    global _nbytes_total
+    from gdsfactory.read.from_yaml import ROUTES_CACHE
+
+    with _CACHE_LOCK:
+        ROUTES_CACHE.clear()
+        CACHE.clear()
+        CACHE_EVICTED.clear()
+        CACHE_MERGED.clear()
+        CALL_NAMES.clear()
+        CALL_KEYS.clear()
+        CACHE_NBYTES.clear()
+        _nbytes_total = 0
+        for key in CACHE_STATS:
+            CACHE_STATS[key] = 0
 
 
 def print_cache() -> None:
@@ -32,6 +80,277 @@ def print_cache() -> None:
         print(k)
 
 
+def set_cache_limits(
+    max_entries: Optional[int] = None, max_bytes: Optional[int] = None
+) -> None:
+    """Bounds the Component CACHE. None means no limit.
+
+    When the CACHE goes over the limits the least recently used cells are
+    evicted. Cells referenced by a parent cell that is still alive are never
+    evicted.
+
+    Args:
+        max_entries: maximum number of cells.
+        max_bytes: maximum estimated size of polygon data (bytes).
+    """
+    with _CACHE_LOCK:
+        CACHE_LIMITS.update(max_entries=max_entries, max_bytes=max_bytes)
+        for name, component in CACHE.items():
+            if name not in CACHE_NBYTES:
+                _measure(name, component)
+        _evict()
+
+
+def cache_info() -> Dict[str, Any]:
+    """Returns CACHE statistics.
+
+    - hits: number of times a cell was returned from the CACHE.
+    - misses: number of times a cell had to be built.
+    - evictions: number of cells evicted.
+    - entries: number of cells in the CACHE.
+    - nbytes: estimated memory of the polygon data in the CACHE.
+    - cells: estimated memory for each cell.
+    """
+    with _CACHE_LOCK:
+        cells = {
+            name: CACHE_NBYTES[name]
+            if name in CACHE_NBYTES
+            else get_component_nbytes(component)
+            for name, component in CACHE.items()
+        }
+        return dict(
+            CACHE_STATS,
+            entries=len(CACHE),
+            nbytes=sum(cells.values()),
+            cells=cells,
+            **CACHE_LIMITS,
+        )
+
+
+def get_component_nbytes(component: Component) -> int:
+    """Returns estimated memory of the polygons, paths and labels of a cell.
+
+    Does not include referenced cells, as those are cached separately.
+    """
+    nbytes = 0
+    for polygon in component.polygons:
+        nbytes += sum(points.nbytes for points in polygon.polygons)
+    for path in component.paths:
+        nbytes += sum(getattr(points, "nbytes", 0) for points in path.polygons)
+    nbytes += 100 * (len(component.labels) + len(component.references))
+    return nbytes
+
+
+def _cache_get(name: str) -> Optional[Component]:
+    """Returns a cell from the CACHE and marks it as recently used."""
+    with _CACHE_LOCK:
+        component = CACHE.pop(name, None)
+        if component is None:
+            component = CACHE_EVICTED.pop(name, None)
+            if component is None:
+                CACHE_STATS["misses"] += 1
+                return None
+            _measure(name, component)
+
+        CACHE[name] = component
+        CACHE_STATS["hits"] += 1
+        return component
+
+
+def _cache_set(name: str, component: Component) -> None:
+    with _CACHE_LOCK:
+        CACHE.pop(name, None)
+        CACHE[name] = component
+        _measure(name, component)
+        _evict()
+
+
+def _measure(name: str, component: Component) -> None:
+    """Updates the estimated size of a cached cell (only when max_bytes is set)."""
+    global _nbytes_total
+    _nbytes_total -= CACHE_NBYTES.pop(name, 0)
+    if CACHE_LIMITS["max_bytes"] is not None:
+        CACHE_NBYTES[name] = get_component_nbytes(component)
+        _nbytes_total += CACHE_NBYTES[name]
+
+
+@contextlib.contextmanager
+def _build_lock(name: str):
+    """Makes threads asking for the same cell wait for the first one to build it.
+
+    Cells form a DAG, so a thread only waits on cells that do not depend on
+    the cells it is building, which can't deadlock.
+    """
+    with _CACHE_LOCK:
+        entry = _BUILD_LOCKS.setdefault(name, [threading.RLock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _CACHE_LOCK:
+            entry[1] -= 1
+            if entry[1] == 0:
+                _BUILD_LOCKS.pop(name, None)
+
+
+def merge_cache(component: Component) -> Component:
+    """Adds a Component built in another process to the CACHE.
+
+    Cells that already exist in the CACHE (same name) are reused, so the
+    merged Component references the same cells as the ones built in this
+    process and there are no duplicated cell names when writing GDS.
+    Cells not built by @cell (not locked) are never reused: if their name is
+    already in the CACHE or was used by another merged cell they are renamed
+    with a `_1`, `_2` ... suffix.
+
+    .. code::
+
+        from concurrent.futures import ProcessPoolExecutor
+        import gdsfactory as gf
+
+        with ProcessPoolExecutor() as executor:
+            futures = [executor.submit(gf.components.mzi, delta_length=i) for i in range(10)]
+            components = [gf.merge_cache(f.result()) for f in futures]
+
+    Args:
+        component: unpickled Component (for example a ProcessPoolExecutor result).
+
+    Returns:
+        Component from the CACHE with the same name, if any, or component.
+    """
+    with _CACHE_LOCK:
+        merged: Dict[int, Component] = {}
+
+        def _merge(c: Component) -> Component:
+            if id(c) in merged:
+                return merged[id(c)]
+
+            for reference in c.references:
+                ref_cell = _merge(reference.ref_cell)
+                reference.ref_cell = ref_cell
+                reference.parent = ref_cell
+            child = getattr(c, "child", None)
+            if isinstance(child, Component):
+                c.child = _merge(child)
+
+            cached = CACHE.get(c.name) or CACHE_EVICTED.get(c.name)
+            if not getattr(c, "_locked", False):
+                other = CACHE_MERGED.get(c.name)
+                if (cached is not None or other is not None) and other is not c:
+                    c.name = _get_unique_name(c.name)
+                CACHE_MERGED[c.name] = c
+                cached = c
+            elif cached is None:
+                cached = c
+                _cache_set(c.name, c)
+            merged[id(c)] = cached
+            return cached
+
+        return _merge(component)
+
+
+def _get_unique_name(name: str) -> str:
+    """Returns name with the first `_{i}` suffix not used in the CACHE."""
+    for i in itertools.count(1):
+        new_name = f"{name}_{i}"
+        if not any(new_name in names for names in (CACHE, CACHE_EVICTED, CACHE_MERGED)):
+            return new_name
+
+
+def _set_call_name(call_key: Optional[Hashable], name: str) -> None:
+    """Remembers the cell name of a call (if its arguments are hashable)."""
+    if call_key is None:
+        return
+    with _CACHE_LOCK:
+        if call_key not in CALL_NAMES:
+            CALL_KEYS.setdefault(name, []).append(call_key)
+        CALL_NAMES[call_key] = name
+
+
+def _is_over_limit(
+    entries: int, nbytes: int, max_entries: Optional[int], max_bytes: Optional[int]
+) -> bool:
+    return bool(
+        (max_entries is not None and entries > max_entries)
+        or (max_bytes is not None and nbytes > max_bytes)
+    )
+
+
+def _evict() -> None:
+    """Evicts least recently used cells until the CACHE is within limits.
+
+    Evicts down to 90% of the limits so that a sweep of new cells does not
+    trigger an eviction pass on every insert.
+    """
+    global _nbytes_total
+    max_entries = CACHE_LIMITS["max_entries"]
+    max_bytes = CACHE_LIMITS["max_bytes"]
+    if max_entries is None and max_bytes is None:
+        return
+    if not _is_over_limit(len(CACHE), _nbytes_total, max_entries, max_bytes):
+        return
+
+    target_entries = None if max_entries is None else int(0.9 * max_entries)
+    target_bytes = None if max_bytes is None else int(0.9 * max_bytes)
+
+    referenced = collections.Counter(
+        id(reference.ref_cell)
+        for component in itertools.chain(CACHE.values(), CACHE_EVICTED.values())
+        for reference in component.references
+    )
+
+    for name in list(CACHE.keys()):
+        if not _is_over_limit(len(CACHE), _nbytes_total, target_entries, target_bytes):
+            break
+        component = CACHE[name]
+        if referenced[id(component)] > 0:
+            continue
+        CACHE.pop(name)
+        CACHE_EVICTED[name] = component
+        _nbytes_total -= CACHE_NBYTES.pop(name, 0)
+        for call_key in CALL_KEYS.pop(name, []):
+            CALL_NAMES.pop(call_key, None)
+        CACHE_STATS["evictions"] += 1
+
+
+def _freeze(value: Any) -> Hashable:
+    """Returns a hashable version of a cell argument.
+
+    Raises TypeError for values that are not safe to use as a key.
+    """
+    if isinstance(value, (str, int, float, bool, type(None))):
+        return type(value), value
+    elif isinstance(value, (tuple, list)):
+        return type(value), tuple(_freeze(v) for v in value)
+    elif isinstance(value, dict):
+        return dict, tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    elif isinstance(value, functools.partial):
+        return (
+            functools.partial,
+            _freeze(value.func),
+            _freeze(value.args),
+            _freeze(value.keywords),
+        )
+    elif isinstance(value, types.FunctionType):
+        return value
+    raise TypeError(f"{type(value)} is not supported")
+
+
+def get_call_key(*values) -> Optional[Hashable]:
+    """Returns a cheap hashable key for the arguments of a cell call.
+
+    Returns None if any argument is not a plain python value or function
+    (Components, CrossSections, numpy arrays ...).
+    """
+    try:
+        key = _freeze(values)
+        hash(key)
+        return key
+    except TypeError:
+        return None
+
+
 def get_source_code(func: Callable) -> str:
     if isinstance(func, functools.partial):
         source = inspect.getsource(func.func)
@@ -68,40 +387,54 @@ def cell_without_validator(func):
     I recommend using @cell instead
     """
 
+    sig = inspect.signature(func)
+    default = {
+        p.name: p.default
+        for p in sig.parameters.values()
+        if p.default != inspect._empty
+    }
+    # list of default args as strings
+    default_args_list = [
+        f"{key}={clean_value_name(copy.deepcopy(default[key]))}"
+        for key in sorted(default.keys())
+    ]
+    validate_kwargs = (
+        "args" not in sig.parameters
+        and "kwargs" not in sig.parameters
+        and "settings" not in sig.parameters
+    )
+
     @functools.wraps(func)
     def _cell(*args, **kwargs):
         autoname = kwargs.pop("autoname", True)
         name = kwargs.pop("name", None)
         cache = kwargs.pop("cache", True)
+        cache_disk = kwargs.pop("cache_disk", None)
         flatten = kwargs.pop("flatten", False)
         info = kwargs.pop("info", {})
         prefix = kwargs.pop("prefix", func.__name__)
         max_name_length = kwargs.pop("max_name_length", MAX_NAME_LENGTH)
 
-        sig = inspect.signature(func)
+        call_key = get_call_key(args, kwargs, name, prefix, max_name_length)
+        if call_key is not None:
+            call_key = (_cell, call_key)
+        if cache and call_key in CALL_NAMES:
+            name_cached = CALL_NAMES.get(call_key)
+            if name_cached in CACHE or name_cached in CACHE_EVICTED:
+                component = _cache_get(name_cached)
+                if component is not None:
+                    return component
+
         args_as_kwargs = dict(zip(sig.parameters.keys(), args))
         args_as_kwargs.update(**copy.deepcopy(kwargs))
 
-        default = {
-            p.name: p.default
-            for p in sig.parameters.values()
-            if p.default != inspect._empty
-        }
-
         changed = args_as_kwargs
         full = copy.deepcopy(default)
         full.update(**args_as_kwargs)
 
-        default2 = copy.deepcopy(default)
-        changed2 = copy.deepcopy(changed)
-
-        # list of default args as strings
-        default_args_list = [
-            f"{key}={clean_value_name(default2[key])}" for key in sorted(default.keys())
-        ]
         # list of explicitly passed args as strings
         passed_args_list = [
-            f"{key}={clean_value_name(changed2[key])}" for key in sorted(changed.keys())
+            f"{key}={clean_value_name(changed[key])}" for key in sorted(changed.keys())
         ]
 
         # get only the args which are explicitly passed and different from defaults
@@ -125,11 +458,7 @@ def cell_without_validator(func):
         decorator = kwargs.pop("decorator", None)
         name = get_name_short(name, max_name_length=max_name_length)
 
-        if (
-            "args" not in sig.parameters
-            and "kwargs" not in sig.parameters
-            and "settings" not in sig.parameters
-        ):
+        if validate_kwargs:
             for key in kwargs.keys():
                 if key not in sig.parameters.keys():
                     raise TypeError(
@@ -137,65 +466,89 @@ def cell_without_validator(func):
                         f"valid arguments are {list(sig.parameters.keys())}"
                     )
 
-        if cache and name in CACHE:
-            # print(f"CACHE LOAD {name} {func.__name__}({named_args_string})")
-            return CACHE[name]
-        # print(f"BUILD {name} {func.__name__}({named_args_string})")
-
-        if not callable(func):
-            raise ValueError(
-                f"{func!r} is not callable! @cell decorator is only for functions"
-            )
-
-        component = func(*args, **kwargs)
-        metadata_child = (
-            dict(component.child.settings) if hasattr(component, "child") else None
-        )
-
-        if not isinstance(component, Component):
-            raise CellReturnTypeError(
-                f"function {func.__name__!r} return type = {type(component)}",
-                "make sure that functions with @cell decorator return a Component",
+        with _build_lock(name) if cache else contextlib.nullcontext():
+            if cache:
+                component = _cache_get(name)
+                if component is not None:
+                    # print(f"CACHE LOAD {name} {func.__name__}({named_args_string})")
+                    _set_call_name(call_key, name)
+                    return component
+            # print(f"BUILD {name} {func.__name__}({named_args_string})")
+
+            disk_key = (
+                DISK_CACHE.get_key(func, name)
+                if cache and DISK_CACHE.is_enabled(cache_disk)
+                else None
             )
-
-        if metadata_child and component.get_child_name:
-            component_name = f"{metadata_child.get('name')}_{name}"
-            component_name = get_name_short(
-                component_name, max_name_length=max_name_length
-            )
-        else:
-            component_name = name
-
-        if autoname and not hasattr(component, "imported_gds"):
-            component.name = component_name
-
-        component.info.update(**info)
-
-        if not hasattr(component, "imported_gds"):
-            component.settings = Settings(
-                name=component_name,
-                module=func.__module__,
-                function_name=func.__name__,
-                changed=clean_dict(changed),
-                default=clean_dict(default),
-                full=clean_dict(full),
-                info=component.info,
-                child=metadata_child,
+            if disk_key:
+                component = DISK_CACHE.load(disk_key)
+                if component is not None:
+                    # reference the cells already in the CACHE and add the others
+                    component = merge_cache(component)
+                    _cache_set(name, component)
+                    _set_call_name(call_key, name)
+                    return component
+
+            if not callable(func):
+                raise ValueError(
+                    f"{func!r} is not callable! @cell decorator is only for functions"
+                )
+
+            component = func(*args, **kwargs)
+            metadata_child = (
+                dict(component.child.settings) if hasattr(component, "child") else None
             )
 
-        if decorator:
-            if not callable(decorator):
-                raise ValueError(f"decorator = {type(decorator)} needs to be callable")
-            component.unlock()
-            component_new = decorator(component)
-            component = component_new or component
+            if not isinstance(component, Component):
+                raise CellReturnTypeError(
+                    f"function {func.__name__!r} return type = {type(component)}",
+                    "make sure that functions with @cell decorator return a Component",
+                )
+
+            if metadata_child and component.get_child_name:
+                component_name = f"{metadata_child.get('name')}_{name}"
+                component_name = get_name_short(
+                    component_name, max_name_length=max_name_length
+                )
+            else:
+                component_name = name
+
+            if autoname and not hasattr(component, "imported_gds"):
+                component.name = component_name
+
+            component.info.update(**info)
+
+            if not hasattr(component, "imported_gds"):
+                component.settings = Settings(
+                    name=component_name,
+                    module=func.__module__,
+                    function_name=func.__name__,
+                    changed=clean_dict(changed),
+                    default=clean_dict(dict(default)),
+                    full=clean_dict(full),
+                    info=component.info,
+                    child=metadata_child,
+                )
+
+            if decorator:
+                if not callable(decorator):
+                    raise ValueError(
+                        f"decorator = {type(decorator)} needs to be callable"
+                    )
+                component.unlock()
+                component_new = decorator(component)
+                component = component_new or component
 
-        if flatten:
-            component = component.flatten()
+            if flatten:
+                component = component.flatten()
 
-        component.lock()
-        CACHE[name] = component
-        return component
+            component.lock()
+            _cache_set(name, component)
+            if cache:
+                _set_call_name(call_key, name)
+            if disk_key:
+                DISK_CACHE.save(disk_key, component)
+            return component
 
     return _cell
 
@@ -224,6 +577,9 @@ def cell(func: _F, *args, **kwargs) -> _F:
         cache (bool): returns component from the cache if it already exists.
             if False creates a new component.
             by default True avoids having duplicated cells with the same name.
+        cache_disk (bool): also look up and store the component in the
+            persistent disk cache (gdsfactory.cell_cache.DISK_CACHE).
+            Defaults to `cell_cache_disk` in the config.
         info: updates component.info dict.
         prefix: name_prefix, defaults to function name.
         max_name_length: truncates name beyond some characters (32) with a hash.
@@ -0,0 +1,248 @@
+"""Persistent on-disk cache for Components built with the @cell decorator.
+
+The in-memory `gdsfactory.cell.CACHE` only lives as long as the python process.
+`DiskCache` adds a second tier that stores the built Components (geometry,
+ports, settings) in `CONFIG["cache_directory"] / "cells"` so that another
+process (a CI job, a mask build worker) can skip cell construction entirely.
+
+The key combines:
+
+- the cell name (already a hash of the function name and its arguments)
+- the source code of the cell function
+- the active PDK name and the gdsfactory version
+
+Changing the source of a cell function invalidates its entries. Changes in
+the source code of the cells it calls do not, so clear the cache with
+`DISK_CACHE.clear()` after editing low level cells.
+
+You can enable it:
+
+- for all cells in your config.yml `cell_cache_disk: true`
+- for the current session `gf.cell_cache.DISK_CACHE.enabled = True`
+- for a single call `gf.components.mzi(cache_disk=True)`
+
+"""
+import hashlib
+import os
+import pathlib
+import pickle
+import tempfile
+from typing import Any, Callable, Dict, Optional
+
+from gdsfactory.component import Component
+from gdsfactory.config import CONF, CONFIG, PathType, __version__, logger
+
+SUFFIX = ".pkl"
+
+
+class DiskCache:
+    """Size bounded persistent Component cache.
+
+    Entries are evicted in least recently used order (file modification time)
+    when the directory size goes beyond `max_bytes`.
+
+    Args:
+        dirpath: directory to store the pickled Components.
+        max_bytes: maximum size of the cache directory.
+        enabled: use the cache for all cells by default.
+    """
+
+    def __init__(
+        self,
+        dirpath: PathType,
+        max_bytes: int = 2_000_000_000,
+        enabled: bool = False,
+    ) -> None:
+        self.dirpath = pathlib.Path(dirpath)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.errors = 0
+        self._size: Optional[int] = None
+
+    def is_enabled(self, cache_disk: Optional[bool] = None) -> bool:
+        """Returns True if cache is enabled. `cache_disk` overrides the default."""
+        return self.enabled if cache_disk is None else cache_disk
+
+    def get_key(self, func: Callable, name: str) -> Optional[str]:
+        """Returns cache key for a cell function and cell name.
+
+        Returns None for functions without source code (defined in a REPL).
+        """
+        from gdsfactory.cell import get_source_code
+
+        try:
+            source = get_source_code(func)
+        except (OSError, TypeError, ValueError):
+            return None
+
+        try:
+            from gdsfactory.pdk import get_active_pdk
+
+            pdk_name = get_active_pdk().name
+        except ImportError:
+            pdk_name = ""
+
+        h = hashlib.sha256()
+        for value in (name, source, pdk_name, __version__):
+            h.update(value.encode())
+        return h.hexdigest()[:32]
+
+    def get_path(self, key: str) -> pathlib.Path:
+        return self.dirpath / f"{key}{SUFFIX}"
+
+    def load(self, key: str) -> Optional[Component]:
+        """Returns Component from disk or None if it is not cached."""
+        filepath = self.get_path(key)
+        try:
+            data = filepath.read_bytes()
+        except OSError:
+            self.misses += 1
+            return None
+
+        try:
+            component = pickle.loads(data)
+        except Exception as e:
+            logger.warning(f"Removing corrupted cache entry {str(filepath)!r} {e}")
+            self.errors += 1
+            self.misses += 1
+            self._remove(filepath)
+            return None
+
+        try:
+            os.utime(filepath)
+        except OSError:
+            pass
+        self.hits += 1
+        return component
+
+    def save(self, key: str, component: Component) -> bool:
+        """Stores component. Returns False if the Component can't be pickled."""
+        try:
+            data = pickle.dumps(component, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logger.debug(f"Cannot store {component.name!r} in disk cache {e}")
+            self.errors += 1
+            return False
+
+        self.dirpath.mkdir(parents=True, exist_ok=True)
+        filepath = self.get_path(key)
+
+        # write to a temporary file and rename so that concurrent processes
+        # never read a partially written entry
+        fd, tmppath = tempfile.mkstemp(dir=self.dirpath, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmppath, filepath)
+
+        self.stores += 1
+        self._size = self.size + len(data)
+        if self._size > self.max_bytes:
+            self.evict()
+        return True
+
+    @property
+    def size(self) -> int:
+        """Returns the size of the cache directory in bytes."""
+        if self._size is None:
+            self._size = sum(filepath.stat().st_size for filepath in self._files())
+        return self._size
+
+    def evict(self) -> None:
+        """Remove least recently used entries until size < max_bytes."""
+        entries = []
+        for filepath in self._files():
+            try:
+                stat = filepath.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, filepath))
+        entries.sort()
+
+        size = sum(entry[1] for entry in entries)
+        for _, filesize, filepath in entries:
+            if size <= self.max_bytes:
+                break
+            if self._remove(filepath):
+                size -= filesize
+                self.evictions += 1
+        self._size = size
+
+    def clear(self) -> None:
+        """Removes all entries."""
+        for filepath in self._files():
+            self._remove(filepath)
+        self._size = 0
+
+    def info(self) -> Dict[str, Any]:
+        """Returns cache statistics."""
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            stores=self.stores,
+            evictions=self.evictions,
+            errors=self.errors,
+            size=self.size,
+            max_bytes=self.max_bytes,
+            enabled=self.enabled,
+            dirpath=str(self.dirpath),
+        )
+
+    def reset_counters(self) -> None:
+        self.hits = self.misses = self.stores = self.evictions = self.errors = 0
+
+    def _files(self):
+        if not self.dirpath.is_dir():
+            return []
+        return list(self.dirpath.glob(f"*{SUFFIX}"))
+
+    @staticmethod
+    def _remove(filepath: pathlib.Path) -> bool:
+        try:
+            filepath.unlink()
+            return True
+        except OSError:
+            return False
+
+
+DISK_CACHE = DiskCache(
+    dirpath=pathlib.Path(CONFIG["cache_directory"]) / "cells",
+    max_bytes=int(CONF.get("cell_cache_disk_max_bytes", 2_000_000_000)),
+    enabled=bool(CONF.get("cell_cache_disk", False)),
+)
+
+
+def test_disk_cache(tmp_path) -> None:
+    import gdsfactory as gf
+
+    disk_cache = DiskCache(dirpath=tmp_path, max_bytes=10_000_000)
+    c = gf.components.straight(length=7)
+    key = disk_cache.get_key(gf.components.straight, c.name)
+
+    assert disk_cache.load(key) is None
+    assert disk_cache.save(key, c)
+
+    c2 = disk_cache.load(key)
+    assert c2.name == c.name
+    assert c2.ports["o2"].x == c.ports["o2"].x
+    assert c2.settings.full["length"] == 7
+    assert disk_cache.info()["hits"] == 1
+    assert disk_cache.info()["misses"] == 1
+
+
+def test_disk_cache_eviction(tmp_path) -> None:
+    import gdsfactory as gf
+
+    disk_cache = DiskCache(dirpath=tmp_path, max_bytes=1)
+    c = gf.components.straight(length=7)
+    disk_cache.save("a", c)
+    disk_cache.save("b", c)
+    assert disk_cache.evictions == 2
+    assert disk_cache.size == 0
+
+
+if __name__ == "__main__":
+    print(DISK_CACHE.info())
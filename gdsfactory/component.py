@@ -3,10 +3,11 @@ import hashlib
 import itertools
 import pathlib
 import tempfile
+import threading
 import uuid
 import warnings
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Set, Tuple, Union
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Union
 
 import gdspy
 import matplotlib.pyplot as plt
@@ -33,8 +34,13 @@ from gdsfactory.port import (
     map_ports_to_orientation_cw,
     select_ports,
 )
+from gdsfactory.port_table import PortTable
 from gdsfactory.serialization import clean_dict
 from gdsfactory.snap import snap_to_grid
+from gdsfactory.spatial_index import get_index, invalidate
+
+# guards the read and increment of Device._next_uid in Device.__init__
+_uid_lock = threading.Lock()
 
 Plotter = Literal["holoviews", "matplotlib", "qt"]
 Axis = Literal["x", "y"]
@@ -53,6 +59,7 @@ tmp = pathlib.Path(tempfile.TemporaryDirectory().name) / "gdsfactory"
 tmp.mkdir(exist_ok=True, parents=True)
 _timestamp2019 = datetime.datetime.fromtimestamp(1572014192.8273)
 MAX_NAME_LENGTH = 32
+PORT_TABLE_MIN_PORTS = CONF.get("port_table_min_ports")
 
 
 class Component(Device):
@@ -98,7 +105,8 @@ class Component(Device):
         if "with_uuid" in kwargs or name == "Unnamed":
             name += f"_{self.uid}"
 
-        super(Component, self).__init__(name=name, exclude_from_current=True)
+        with _uid_lock:
+            super(Component, self).__init__(name=name, exclude_from_current=True)
         self.name = name  # overwrite PHIDL's incremental naming convention
         self.info: Dict[str, Any] = {}
 
@@ -184,6 +192,28 @@ class Component(Device):
             bbox = ((0, 0), (0, 0))
         return np.round(bbox, 3)
 
+    def get_bounding_box(self) -> Optional[np.ndarray]:
+        """Return the bounding box [[xmin, ymin], [xmax, ymax]] or None if empty.
+
+        The bounding box is cached per cell and recomputed only when the
+        Component (or an unlocked Component that it references) changes.
+        """
+        bbox = get_index(self).bbox
+        return None if bbox is None else bbox.reshape(2, 2).copy()
+
+    def get_bbox(self, layers: Optional[Layers] = None) -> np.ndarray:
+        """Return the bounding box of some layers (cached per cell).
+        it snaps to 3 decimals in um (0.001um = 1nm precision)
+
+        Args:
+            layers: list of layers. None uses all layers.
+        """
+        layers = frozenset(tuple(layer) for layer in layers) if layers else None
+        bbox = get_index(self).get_bbox(layers)
+        if bbox is None:
+            return np.zeros((2, 2))
+        return np.round(bbox.reshape(2, 2), 3)
+
     @property
     def ports_layer(self) -> Dict[str, str]:
         """Return a mapping from layer0_layer1_E0: portName"""
@@ -306,7 +336,16 @@ class Component(Device):
         return get_netlist(component=self, **kwargs)
 
     def get_netlist_dict(self, **kwargs) -> Dict[str, Any]:
-        return OmegaConf.to_container(self.get_netlist(**kwargs))
+        """Return netlist as a plain dict (faster than get_netlist DictConfig).
+
+        Keyword Args:
+            full_settings: True returns all, false changed settings.
+            layer_label: label to read instanceNames from (if any).
+            tolerance: tolerance in nm to consider two ports connected.
+        """
+        from gdsfactory.get_netlist import get_netlist_dict
+
+        return get_netlist_dict(component=self, **kwargs)
 
     def get_netlist_recursive(self, **kwargs) -> Dict[str, DictConfig]:
         """Returns recursive netlist for a component and subcomponents.
@@ -355,6 +394,74 @@ class Component(Device):
         """
         return list(select_ports(self.ports, **kwargs).values())
 
+    def nearest_ports(
+        self,
+        point: Float2,
+        k: int = 1,
+        include_references: bool = False,
+        **kwargs,
+    ) -> List[Port]:
+        """Return the k ports closest to point, sorted by distance.
+
+        Args:
+            point: x, y.
+            k: number of ports.
+            include_references: also include the ports of the references.
+
+        Keyword Args:
+            layer: port GDS layer.
+            prefix: with in port name.
+            orientation: in degrees.
+            width: port width.
+            layers_excluded: List of layers to exclude.
+            port_type: optical, electrical, ...
+        """
+        from gdsfactory.spatial_index import nearest_ports
+
+        return nearest_ports(
+            self, point=point, k=k, include_references=include_references, **kwargs
+        )
+
+    def query_region(
+        self,
+        bbox: Tuple[Float2, Float2],
+        layers: Optional[Layers] = None,
+        depth: Optional[int] = None,
+    ) -> Dict[Layer, List[np.ndarray]]:
+        """Return polygons {layer: [points]} that overlap a region.
+
+        Uses a spatial index cached per cell, so only the references and
+        polygons that overlap the region are visited.
+
+        Args:
+            bbox: ((xmin, ymin), (xmax, ymax)) region.
+            layers: only return polygons in these layers. None for all.
+            depth: how many reference levels to visit. None for all.
+        """
+        from gdsfactory.spatial_index import query_region
+
+        return query_region(self, bbox=bbox, layers=layers, depth=depth)
+
+    def iter_polygons(
+        self,
+        layers: Optional[Layers] = None,
+        bbox: Optional[Tuple[Float2, Float2]] = None,
+        depth: Optional[int] = None,
+    ) -> Iterator[Tuple[Layer, np.ndarray]]:
+        """Yields (layer, points) for each polygon without flattening.
+
+        Same polygons as `get_polygons(by_spec=True)`, transformed one
+        reference at a time, so memory does not grow with the layout size.
+
+        Args:
+            layers: only yield polygons in these layers. None for all.
+            bbox: ((xmin, ymin), (xmax, ymax)) only polygons overlapping it.
+            depth: how many reference levels to visit. None for all.
+        """
+        from gdsfactory.spatial_index import iter_polygons
+
+        return iter_polygons(self, layers=layers, bbox=bbox, depth=depth)
+
     def ref(
         self,
         position: Coordinate = (0, 0),
@@ -503,6 +610,15 @@ class Component(Device):
             raise ValueError(f"add_port() Port name {p.name!r} exists in {self.name!r}")
 
         self.ports[p.name] = p
+        invalidate(self)
+        if (
+            PORT_TABLE_MIN_PORTS
+            and isinstance(self.ports, dict)
+            and len(self.ports) >= PORT_TABLE_MIN_PORTS
+        ):
+            self.ports = PortTable(self.ports, parent=self)
+        if isinstance(self.ports, PortTable):
+            return self.ports.get_port(p.name, cache=False)
         return p
 
     def add_ports(
@@ -567,6 +683,7 @@ class Component(Device):
                 )
 
             D.paths = paths
+            invalidate(D)
 
             if include_labels:
                 new_labels = []
@@ -664,6 +781,23 @@ class Component(Device):
         """
         self.is_unlocked()
         super().add(element)
+        invalidate(self)
+
+        elements = element if isinstance(element, (list, tuple)) else [element]
+        for reference in elements:
+            if isinstance(reference, (ComponentReference, CellArray)):
+                reference.owner = reference.owner or self
+
+    def remove(self, items):
+        """Removes items from a Component, which can include Ports, PolygonSets \
+        CellReferences, ComponentReferences and Labels.
+
+        Args:
+            items: list of Items to be removed from the Component.
+        """
+        super().remove(items)
+        invalidate(self)
+        return self
 
     def add_array(
         self,
@@ -932,11 +1066,13 @@ class Component(Device):
         timestamp: Optional[datetime.datetime] = _timestamp2019,
         logging: bool = True,
         on_duplicate_cell: Optional[str] = "warn",
+        streaming: bool = False,
     ) -> Path:
         """Write component to GDS and returns gdspath
 
         Args:
-            gdspath: GDS file path to write to.
+            gdspath: GDS file path to write to. Paths ending in `.gz` are
+                written gzip compressed (with streaming=True).
             gdsdir: directory for the GDS file. Defaults to /tmp/randomFile/gdsfactory.
             unit: unit size for objects in library. 1um by default.
             precision: for dimensions in the library (m). 1nm by default.
@@ -948,6 +1084,9 @@ class Component(Device):
                 "error": throw a ValueError when attempting to write a gds with duplicate cells.
                 "overwrite": overwrite all duplicate cells with one of the duplicates, without warning.
                 None: do not try to resolve (at your own risk!)
+            streaming: writes each cell as soon as it is visited (bottom-up)
+                instead of collecting all the cells first
+                (see gdsfactory.export.to_gds).
 
         """
         gdsdir = (
@@ -959,6 +1098,19 @@ class Component(Device):
         gdsdir = gdspath.parent
         gdsdir.mkdir(exist_ok=True, parents=True)
 
+        if streaming or gdspath.suffix == ".gz":
+            from gdsfactory.export.to_gds import to_gds
+
+            return to_gds(
+                self,
+                gdspath=gdspath,
+                unit=unit,
+                precision=precision,
+                timestamp=timestamp,
+                logging=logging,
+                on_duplicate_cell=on_duplicate_cell,
+            )
+
         cells = self.get_dependencies(recursive=True)
         cell_names = [cell.name for cell in list(cells)]
         cell_names_unique = set(cell_names)
@@ -1009,6 +1161,43 @@ class Component(Device):
         logger.info(f"Write YAML metadata to {str(metadata)!r}")
         return gdspath
 
+    def write_oas(
+        self,
+        oaspath: Optional[PathType] = None,
+        oasdir: Optional[PathType] = None,
+        **kwargs,
+    ) -> Path:
+        """Write component to OASIS and returns oaspath. Needs klayout.
+
+        Args:
+            oaspath: OASIS file path to write to.
+            oasdir: directory for the OASIS file. Defaults to /tmp/randomFile/gdsfactory.
+
+        Keyword Args:
+            compression_level: repetition search depth (0 disables it, 10 is slow).
+            write_cblocks: compresses cell data blocks with deflate.
+            strict_mode: writes strict mode OASIS.
+            logging: disable OASIS path logging.
+            unit: unit size for objects in library. 1um by default.
+            precision: for dimensions in the library (m). 1nm by default.
+            on_duplicate_cell: specify how to resolve duplicate-named cells.
+        """
+        from gdsfactory.export.to_oas import to_oas
+
+        oasdir = (
+            oasdir or pathlib.Path(tempfile.TemporaryDirectory().name) / "gdsfactory"
+        )
+        oaspath = oaspath or pathlib.Path(oasdir) / f"{self.name}.oas"
+        return to_oas(self, oaspath=oaspath, **kwargs)
+
+    def write_oas_with_metadata(self, *args, **kwargs) -> Path:
+        """Write component in OASIS and metadata (component settings) in YAML"""
+        oaspath = self.write_oas(*args, **kwargs)
+        metadata = oaspath.with_suffix(".yml")
+        metadata.write_text(self.to_yaml(with_cells=True, with_ports=True))
+        logger.info(f"Write YAML metadata to {str(metadata)!r}")
+        return oaspath
+
     def to_dict(
         self,
         ignore_components_prefix: Optional[List[str]] = None,
@@ -12,6 +12,7 @@ from gdsfactory.port import (
     select_ports,
 )
 from gdsfactory.snap import snap_to_grid
+from gdsfactory.spatial_index import invalidate
 
 Number = Union[float64, int64, float, int]
 Coordinate = Union[Tuple[Number, Number], ndarray, List[Number]]
@@ -214,29 +215,49 @@ class ComponentReference(DeviceReference):
     @property
     def ports(self) -> Dict[str, Port]:
         """This property allows you to access myref.ports, and receive a copy
-        of the ports dict which is correctly rotated and translated"""
-        for name, port in self.parent.ports.items():
-            port = self.parent.ports[name]
-            new_midpoint, new_orientation = self._transform_port(
-                port.midpoint,
-                port.orientation,
+        of the ports dict which is correctly rotated and translated.
+
+        The ports are derived again from the parent ports on every call, all
+        at once with `_transform_ports`.
+        """
+        parent_ports = self.parent.ports
+
+        # Remove any ports that no longer exist in the reference's parent
+        for name in list(self._local_ports):
+            if name not in parent_ports:
+                self._local_ports.pop(name)
+
+        names = []
+        for name, port in parent_ports.items():
+            if name not in self._local_ports:
+                self._local_ports[name] = port.copy(new_uid=True)
+            local_port = self._local_ports[name]
+            local_port.parent = self
+
+            if port.orientation is None:
+                local_port.midpoint, local_port.orientation = self._transform_port(
+                    port.midpoint,
+                    port.orientation,
+                    self.origin,
+                    self.rotation,
+                    self.x_reflection,
+                )
+            else:
+                names.append(name)
+
+        if names:
+            midpoints, orientations = self._transform_ports(
+                [parent_ports[name].midpoint for name in names],
+                [parent_ports[name].orientation for name in names],
                 self.origin,
                 self.rotation,
                 self.x_reflection,
             )
-            if name not in self._local_ports:
-                self._local_ports[name] = port.copy(new_uid=True)
-            self._local_ports[name].midpoint = new_midpoint
-            self._local_ports[name].orientation = (
-                mod(new_orientation, 360) if new_orientation else new_orientation
-            )
-            self._local_ports[name].parent = self
-        # Remove any ports that no longer exist in the reference's parent
-        parent_names = self.parent.ports.keys()
-        local_names = list(self._local_ports.keys())
-        for name in local_names:
-            if name not in parent_names:
-                self._local_ports.pop(name)
+            for name, midpoint, orientation in zip(names, midpoints, orientations):
+                local_port = self._local_ports[name]
+                local_port.midpoint = midpoint
+                local_port.orientation = orientation
+
         return self._local_ports
 
     @property
@@ -288,6 +309,31 @@ class ComponentReference(DeviceReference):
 
         return new_point, new_orientation
 
+    def _transform_ports(
+        self,
+        points: Coordinates,
+        orientations: Union[ndarray, List[float]],
+        origin: Coordinate = (0, 0),
+        rotation: Optional[int] = None,
+        x_reflection: bool = False,
+    ) -> Tuple[ndarray, ndarray]:
+        """Apply GDS-type transformation to arrays of port midpoints (N, 2)
+        and orientations (N)."""
+        new_points = np.array(points, dtype=float).reshape(-1, 2)
+        new_orientations = np.array(orientations, dtype=float)
+
+        if x_reflection:
+            new_points[:, 1] = -new_points[:, 1]
+            new_orientations = -new_orientations
+        if rotation is not None:
+            new_points = _rotate_points(new_points, angle=rotation, center=[0, 0])
+            new_orientations = new_orientations + rotation
+        if origin is not None:
+            new_points = new_points + np.array(origin)
+        new_orientations = mod(new_orientations, 360)
+
+        return new_points, new_orientations
+
     def _transform_point(
         self,
         point: ndarray,
@@ -373,6 +419,8 @@ class ComponentReference(DeviceReference):
         dxdy = np.array(d) - np.array(o)
         self.origin = np.array(self.origin) + dxdy
         self._bb_valid = False
+        if self.owner is not None:
+            invalidate(self.owner)
         return self
 
     def rotate(
@@ -397,6 +445,8 @@ class ComponentReference(DeviceReference):
         self.rotation %= 360
         self.origin = _rotate_points(self.origin, angle, center)
         self._bb_valid = False
+        if self.owner is not None:
+            invalidate(self.owner)
         return self
 
     def reflect_h(
@@ -456,6 +506,8 @@ class ComponentReference(DeviceReference):
         self.origin = self.origin + p1
 
         self._bb_valid = False
+        if self.owner is not None:
+            invalidate(self.owner)
         return self
 
     def connect(
@@ -57,6 +57,11 @@ default_config = io.StringIO(
     """
 plotter: matplotlib
 sparameters_path: ${oc.env:HOME}/.gdsfactory/sparameters/generic
+cell_cache_max_entries: null
+cell_cache_max_bytes: null
+cell_cache_disk: false
+cell_cache_disk_max_bytes: 2000000000
+port_table_min_ports: null
 """
 )
 
@@ -0,0 +1,184 @@
+"""Streaming GDS writer.
+
+`Component.write_gds` collects all the cells of the hierarchy before writing
+them. `to_gds` writes each cell to the file as soon as it is visited
+(bottom-up, each cell after the cells it references) and deduplicates cells
+by name on the fly, so nothing else is kept in memory. Paths ending in `.gz`
+are written compressed.
+"""
+import datetime
+import gzip
+import pathlib
+import warnings
+from typing import BinaryIO, Dict, Iterator, Optional
+
+import gdspy
+
+from gdsfactory.component import Component, _timestamp2019
+from gdsfactory.config import logger
+from gdsfactory.types import PathType
+
+
+def iter_cells_bottom_up(component: gdspy.Cell) -> Iterator[gdspy.Cell]:
+    """Yields each cell in the hierarchy once, after all the cells it references.
+
+    Uses an explicit stack so deep hierarchies do not hit the recursion limit.
+    """
+    visited = set()
+    stack = [(component, False)]
+
+    while stack:
+        cell, expanded = stack.pop()
+        if expanded:
+            yield cell
+            continue
+        if id(cell) in visited:
+            continue
+        visited.add(id(cell))
+        stack.append((cell, True))
+        for reference in reversed(cell.references):
+            ref_cell = reference.ref_cell
+            if isinstance(ref_cell, gdspy.Cell) and id(ref_cell) not in visited:
+                stack.append((ref_cell, False))
+
+
+def write_cells(
+    component: Component,
+    outfile: BinaryIO,
+    unit: float = 1e-6,
+    precision: float = 1e-9,
+    timestamp: Optional[datetime.datetime] = _timestamp2019,
+    on_duplicate_cell: Optional[str] = "warn",
+) -> None:
+    """Writes the GDS stream of component to an open binary file.
+
+    Args:
+        component: to write.
+        outfile: binary file (or io.BytesIO), it is not closed.
+        unit: unit size for objects in library. 1um by default.
+        precision: for dimensions in the library (m). 1nm by default.
+        timestamp: Defaults to 2019-10-25 for consistent hash.
+            If None uses current time.
+        on_duplicate_cell: specify how to resolve duplicate-named cells.
+            "warn" (default): write the first cell with that name and warn.
+            "error": throw a ValueError when finding duplicated cells.
+            "overwrite": write the first cell with that name, without warning.
+            None: write all duplicated cells (at your own risk!)
+    """
+    if on_duplicate_cell not in {None, "warn", "error", "overwrite"}:
+        raise ValueError(
+            f"on_duplicate_cell: {on_duplicate_cell!r} not in (None, warn, error, overwrite)"
+        )
+
+    written: Dict[str, int] = {}
+    duplicated = []
+    no_name_cells = 0
+
+    writer = gdspy.GdsWriter(
+        outfile, name="library", unit=unit, precision=precision, timestamp=timestamp
+    )
+    for cell in iter_cells_bottom_up(component):
+        if cell.name in written and written[cell.name] != id(cell):
+            if on_duplicate_cell == "error":
+                raise ValueError(
+                    f"Duplicated cell names in {component.name!r}: {cell.name!r}"
+                )
+            duplicated.append(cell.name)
+            if on_duplicate_cell is not None:
+                continue
+        written[cell.name] = id(cell)
+        no_name_cells += cell.name.startswith("Unnamed")
+        writer.write_cell(cell, timestamp=timestamp)
+    writer.close()
+
+    if duplicated and on_duplicate_cell == "warn":
+        warnings.warn(f"Duplicated cell names in {component.name!r}:  {duplicated}")
+    if no_name_cells:
+        warnings.warn(
+            f"Component {component.name!r} contains {no_name_cells} Unnamed cells"
+        )
+
+
+def to_gds(
+    component: Component,
+    gdspath: PathType,
+    unit: float = 1e-6,
+    precision: float = 1e-9,
+    timestamp: Optional[datetime.datetime] = _timestamp2019,
+    logging: bool = True,
+    on_duplicate_cell: Optional[str] = "warn",
+) -> pathlib.Path:
+    """Writes component to GDS cell by cell and returns gdspath.
+
+    Args:
+        component: to write.
+        gdspath: GDS file path. Writes gzip compressed GDS if it ends with `.gz`.
+        unit: unit size for objects in library. 1um by default.
+        precision: for dimensions in the library (m). 1nm by default.
+        timestamp: Defaults to 2019-10-25 for consistent hash.
+            If None uses current time.
+        logging: disable GDS path logging.
+        on_duplicate_cell: specify how to resolve duplicate-named cells.
+            "warn" (default): write the first cell with that name and warn.
+            "error": throw a ValueError when finding duplicated cells.
+            "overwrite": write the first cell with that name, without warning.
+            None: write all duplicated cells (at your own risk!)
+    """
+    gdspath = pathlib.Path(gdspath)
+    gdspath.parent.mkdir(exist_ok=True, parents=True)
+
+    outfile = (
+        gzip.open(gdspath, "wb") if gdspath.suffix == ".gz" else open(gdspath, "wb")
+    )
+    try:
+        write_cells(
+            component,
+            outfile,
+            unit=unit,
+            precision=precision,
+            timestamp=timestamp,
+            on_duplicate_cell=on_duplicate_cell,
+        )
+    finally:
+        outfile.close()
+
+    component.path = gdspath
+    if logging:
+        logger.info(f"Write GDS to {str(gdspath)!r}")
+    return gdspath
+
+
+def test_to_gds(tmp_path) -> None:
+    import gdsfactory as gf
+
+    c = gf.components.mzi()
+    gdspath = to_gds(c, tmp_path / "mzi.gds")
+    lib = gdspy.GdsLibrary(infile=gdspath)
+    cells = {cell.name for cell in c.get_dependencies(recursive=True)} | {c.name}
+    assert set(lib.cells.keys()) == cells
+    assert lib.top_level()[0].name == c.name
+
+    gdspath_gz = to_gds(c, tmp_path / "mzi.gds.gz")
+    with gzip.open(gdspath_gz, "rb") as f:
+        lib_gz = gdspy.GdsLibrary(infile=f)
+    assert set(lib_gz.cells.keys()) == cells
+    assert gdspath.read_bytes() == gzip.decompress(gdspath_gz.read_bytes())
+
+
+def test_to_gds_bottom_up() -> None:
+    import gdsfactory as gf
+
+    c = gf.components.mzi()
+    seen = set()
+    for cell in iter_cells_bottom_up(c):
+        for reference in cell.references:
+            assert reference.ref_cell.name in seen
+        seen.add(cell.name)
+    assert cell is c
+
+
+if __name__ == "__main__":
+    import gdsfactory as gf
+
+    c = gf.components.mzi()
+    to_gds(c, "mzi.gds.gz")
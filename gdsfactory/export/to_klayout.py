@@ -0,0 +1,152 @@
+"""In-memory conversion from Component to klayout.db.Layout.
+
+The checks in `gdsfactory.geometry` run on klayout regions. Instead of writing
+the Component to a GDS file and reading it back, `to_klayout` writes the GDS
+stream of the hierarchy (bottom-up, as `to_gds`) to memory and klayout reads it
+with its C++ reader, which is much faster than inserting the polygons one by
+one from python.
+
+Layouts are cached per cell name and reused while the Component (and the cells
+it references) does not change, so many checks on one Component share a single
+layout. An entry is dropped when its Component is garbage collected.
+Changes are tracked with the spatial index: if you change the points of
+a polygon or the origin of a reference directly call
+`gdsfactory.spatial_index.invalidate(component)`.
+
+Needs klayout `pip install klayout`
+"""
+import io
+import pathlib
+import tempfile
+import weakref
+from typing import Any, Dict, Optional, Tuple
+
+from gdsfactory.component import Component
+from gdsfactory.export.to_gds import write_cells
+from gdsfactory.spatial_index import CellIndex, get_index
+from gdsfactory.types import ComponentOrPath
+
+# klayout Layout for each (cell name, precision), with the Component and its index
+LAYOUTS: Dict[Tuple[str, float], Tuple[weakref.ref, CellIndex, Any]] = {}
+
+
+def to_klayout(
+    component: Component,
+    unit: float = 1e-6,
+    precision: float = 1e-9,
+    cache: bool = True,
+    on_duplicate_cell: Optional[str] = "overwrite",
+):
+    """Returns klayout Layout with the hierarchy of component (top cell).
+
+    The layout is shared with other callers, do not modify it.
+
+    Args:
+        component: to convert.
+        unit: unit size for objects in library. 1um by default.
+        precision: database unit (m). 1nm by default.
+        cache: reuses the layout of the last conversion if component did not change.
+        on_duplicate_cell: how to resolve duplicate-named cells (see `write_cells`).
+    """
+    import klayout.db as pya
+
+    key = (component.name, precision)
+    index = get_index(component)
+    if cache and key in LAYOUTS:
+        component_ref, cached_index, layout = LAYOUTS[key]
+        if component_ref() is component and cached_index is index:
+            return layout
+
+    stream = io.BytesIO()
+    write_cells(
+        component,
+        stream,
+        unit=unit,
+        precision=precision,
+        on_duplicate_cell=on_duplicate_cell,
+    )
+    layout = pya.Layout()
+    if hasattr(layout, "read_bytes"):
+        layout.read_bytes(stream.getvalue())
+    else:
+        with tempfile.TemporaryDirectory() as dirpath:
+            gdspath = pathlib.Path(dirpath) / "layout.gds"
+            gdspath.write_bytes(stream.getvalue())
+            layout.read(str(gdspath))
+
+    if cache:
+        LAYOUTS[key] = (weakref.ref(component, _get_drop(key)), index, layout)
+    return layout
+
+
+def _get_drop(key: Tuple[str, float]):
+    """Returns weakref callback that drops the layout of a collected Component."""
+
+    def _drop(component_ref: weakref.ref) -> None:
+        entry = LAYOUTS.get(key)
+        if entry is not None and entry[0] is component_ref:
+            del LAYOUTS[key]
+
+    return _drop
+
+
+def get_layout(gdspath: ComponentOrPath, dbu: float = 1e3):
+    """Returns klayout Layout of a Component (cached) or of a GDS file.
+
+    Args:
+        gdspath: path to GDS or Component.
+        dbu: database units per um for the Component (1000 um/nm).
+    """
+    import klayout.db as pya
+
+    if isinstance(gdspath, Component):
+        return to_klayout(gdspath, precision=round(1e-6 / dbu, 15))
+
+    layout = pya.Layout()
+    layout.read(str(gdspath))
+    return layout
+
+
+def test_to_klayout() -> None:
+    import gc
+
+    import klayout.db as pya
+
+    import gdsfactory as gf
+
+    c = gf.Component("test_to_klayout")
+    c.add_array(gf.components.pad(), columns=3, rows=2, spacing=(150, 150))
+    mzi = c << gf.components.mzi()
+    mzi.rotate(90)
+
+    layout = to_klayout(c)
+    assert to_klayout(c) is layout
+    assert layout.top_cell().name == c.name
+    assert layout.cells() == len(c.get_dependencies(recursive=True)) + 1
+
+    reference = pya.Layout()
+    reference.read(str(c.write_gds(logging=False)))
+    for layer in [gf.LAYER.WG, gf.LAYER.M3]:
+        region1 = pya.Region(layout.top_cell().begin_shapes_rec(layout.layer(*layer)))
+        region2 = pya.Region(
+            reference.top_cell().begin_shapes_rec(reference.layer(*layer))
+        )
+        assert region1.area() > 0
+        assert (region1 ^ region2).is_empty()
+
+    c << gf.components.rectangle()
+    assert to_klayout(c) is not layout
+
+    key = (c.name, 1e-9)
+    assert key in LAYOUTS
+    del c, mzi
+    gc.collect()
+    assert key not in LAYOUTS
+
+
+if __name__ == "__main__":
+    import gdsfactory as gf
+
+    c = gf.components.mzi()
+    layout = to_klayout(c)
+    print(layout.top_cell().name, layout.cells())
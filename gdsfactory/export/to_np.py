@@ -32,20 +32,14 @@ def to_np(
         int(np.ceil(ymax - ymin) * pixels_per_um),
     )
     img = np.zeros(shape, dtype=float)
-    layer_to_polygons = component.get_polygons(by_spec=True, depth=None)
-
     values = values or [1] * len(layers)
 
     for layer, value in zip(layers, values):
-        if layer in layer_to_polygons:
-            polygons = layer_to_polygons[layer]
-            for polygon in polygons:
-                r = polygon[:, 0] - xmin
-                c = polygon[:, 1] - ymin
-                rr, cc = skdraw.polygon(
-                    r * pixels_per_um, c * pixels_per_um, shape=shape
-                )
-                img[rr, cc] = value
+        for _, polygon in component.iter_polygons(layers=[layer]):
+            r = polygon[:, 0] - xmin
+            c = polygon[:, 1] - ymin
+            rr, cc = skdraw.polygon(r * pixels_per_um, c * pixels_per_um, shape=shape)
+            img[rr, cc] = value
 
     return np.pad(img, pad_width=pad_width)
 
@@ -0,0 +1,100 @@
+"""OASIS export.
+
+OASIS files are usually 5-20x smaller than GDS. CellArrays are written as
+array instances and the OASIS writer compresses repeated shapes and instances
+into repetitions.
+
+The klayout Layout is built in memory with `to_klayout` (no temporary GDS
+file) and written directly as OASIS.
+
+Needs klayout `pip install klayout`
+"""
+import pathlib
+from typing import Optional
+
+from gdsfactory.component import Component
+from gdsfactory.config import logger
+from gdsfactory.export.to_klayout import to_klayout
+from gdsfactory.types import PathType
+
+
+def to_oas(
+    component: Component,
+    oaspath: PathType,
+    compression_level: int = 2,
+    write_cblocks: bool = True,
+    strict_mode: bool = True,
+    logging: bool = True,
+    unit: float = 1e-6,
+    precision: float = 1e-9,
+    on_duplicate_cell: Optional[str] = "warn",
+) -> pathlib.Path:
+    """Writes component to OASIS and returns oaspath.
+
+    Args:
+        component: to write.
+        oaspath: OASIS file path.
+        compression_level: repetition search depth (0 disables it, 10 is slow).
+        write_cblocks: compresses cell data blocks with deflate.
+        strict_mode: writes strict mode OASIS (cell names table).
+        logging: disable OASIS path logging.
+        unit: unit size for objects in library. 1um by default.
+        precision: database unit (m). 1nm by default.
+        on_duplicate_cell: how to resolve duplicate-named cells (see `write_cells`).
+    """
+    import klayout.db as pya
+
+    oaspath = pathlib.Path(oaspath)
+    oaspath.parent.mkdir(exist_ok=True, parents=True)
+
+    layout = to_klayout(
+        component,
+        unit=unit,
+        precision=precision,
+        cache=False,
+        on_duplicate_cell=on_duplicate_cell,
+    )
+
+    options = pya.SaveLayoutOptions()
+    options.format = "OASIS"
+    options.oasis_compression_level = compression_level
+    options.oasis_write_cblocks = write_cblocks
+    options.oasis_strict_mode = strict_mode
+    layout.write(str(oaspath), options)
+
+    component.path = oaspath
+    if logging:
+        logger.info(f"Write OASIS to {str(oaspath)!r}")
+    return oaspath
+
+
+def test_to_oas(tmp_path, monkeypatch) -> None:
+    import tempfile
+
+    import gdsfactory as gf
+
+    c = gf.Component("pad_array_oas")
+    c.add_array(gf.components.pad(), columns=30, rows=30, spacing=(150, 150))
+    c << gf.components.mzi()
+
+    gdspath = c.write_gds(tmp_path / "pad_array_oas.gds")
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("OASIS conversion through a temporary file")
+
+    monkeypatch.setattr(tempfile, "TemporaryDirectory", _fail)
+    oaspath = to_oas(c, tmp_path / "pad_array_oas.oas")
+    assert oaspath.stat().st_size < gdspath.stat().st_size
+
+    c2 = gf.import_oas(oaspath)
+    assert c2.name == c.name
+    assert (c2.bbox == c.bbox).all()
+
+
+if __name__ == "__main__":
+    import gdsfactory as gf
+
+    c = gf.components.mzi()
+    oaspath = c.write_oas()
+    c2 = gf.import_oas(oaspath)
+    c2.show()
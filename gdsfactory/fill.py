@@ -1,12 +1,25 @@
-"""Dummy fill to keep density constant."""
-from typing import Optional, Union
+"""Dummy fill to keep density constant.
 
+`fill_rectangle` wraps phidl, which flattens the component and places
+individual fill rectangles.
+
+`fill_density` computes the windowed density of a layer
+(`gf.geometry.get_density_map`) and only fills the windows below the target
+density. The fill of each window is a few CellArrays of a single fill cell,
+and windows with the same fill pattern and no geometry to avoid are merged
+into one CellArray, so the fill of a whole reticle stays small. The geometry to
+avoid in each window is queried with the spatial index
+(`Component.query_region`) instead of booleans on the flattened layout.
+"""
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
 from phidl.geometry import fill_rectangle as _fill_rectangle
 
 from gdsfactory.cell import cell
 from gdsfactory.component import Component
 from gdsfactory.read.from_phidl import from_phidl
-from gdsfactory.types import Float2, Floats, Layers
+from gdsfactory.types import Float2, Floats, Layer, Layers
 
 
 @cell
@@ -56,6 +69,401 @@ def fill_rectangle(
     return from_phidl(component_filled)
 
 
+@cell
+def fill_cell(size: Float2 = (2.0, 2.0), layers: Layers = ((1, 0),)) -> Component:
+    """Returns fill rectangle centered at (0, 0) on each layer.
+
+    Args:
+        size: (width, height) of the rectangle.
+        layers: of the rectangle.
+    """
+    c = Component()
+    w, h = size[0] / 2, size[1] / 2
+    for layer in layers:
+        c.add_polygon([(-w, -h), (w, -h), (w, h), (-w, h)], layer=layer)
+    return c
+
+
+def _get_shape(count: int, nx_max: int, ny_max: int) -> Tuple[int, int]:
+    """Returns (columns, rows) of a site grid with at least count sites."""
+    scale = np.sqrt(count / (nx_max * ny_max))
+    nx = int(min(nx_max, max(1, np.ceil(nx_max * scale))))
+    ny = int(min(ny_max, max(1, np.ceil(count / nx))))
+    return nx, ny
+
+
+def _sample_edges(polygons: List[np.ndarray], step: float) -> np.ndarray:
+    """Returns (N, 2) points along the polygon edges, at most step apart."""
+    points = []
+    for polygon in polygons:
+        edges = np.roll(polygon, -1, axis=0) - polygon
+        counts = np.maximum(1, np.ceil(np.hypot(*edges.T) / step).astype(int))
+        index = np.repeat(np.arange(len(polygon)), counts)
+        t = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        t = t / np.repeat(counts, counts)
+        points.append(polygon[index] + edges[index] * t[:, None])
+    return np.concatenate(points)
+
+
+def get_blocked_sites(
+    polygons: List[np.ndarray],
+    origin: Float2,
+    pitch: Float2,
+    shape: Tuple[int, int],
+    size: Float2,
+    margin: float,
+) -> np.ndarray:
+    """Returns (rows, columns) True for the sites that come within margin of polygons.
+
+    Site (row, column) is a rectangle of size centered at
+    origin + ((column + 0.5) * pitch[0], (row + 0.5) * pitch[1]).
+    A site is blocked if its center is inside a polygon or a polygon edge
+    crosses the site expanded by margin. Edges are sampled, so sites a
+    fraction of margin further away can also be blocked.
+
+    Args:
+        polygons: to avoid.
+        origin: (x, y) lower left corner of the site grid.
+        pitch: (x, y) distance between sites.
+        shape: (rows, columns) of the site grid.
+        size: (width, height) of each site.
+        margin: minimum distance from the polygons.
+    """
+    from matplotlib.path import Path
+
+    rows, columns = shape
+    blocked = np.zeros(shape, dtype=bool)
+    if not polygons:
+        return blocked
+
+    x0, y0 = origin
+    px, py = pitch
+    cx = x0 + (np.arange(columns) + 0.5) * px
+    cy = y0 + (np.arange(rows) + 0.5) * py
+    for polygon in polygons:
+        (xmin, ymin), (xmax, ymax) = polygon.min(axis=0), polygon.max(axis=0)
+        i = np.flatnonzero((cx >= xmin) & (cx <= xmax))
+        j = np.flatnonzero((cy >= ymin) & (cy <= ymax))
+        if not len(i) or not len(j):
+            continue
+        jj, ii = np.meshgrid(j, i, indexing="ij")
+        centers = np.stack([cx[ii.ravel()], cy[jj.ravel()]], axis=1)
+        inside = Path(polygon).contains_points(centers).reshape(ii.shape)
+        blocked[jj[inside], ii[inside]] = True
+
+    hx, hy = size[0] / 2 + margin, size[1] / 2 + margin
+    step = min(hx, hy)
+    hx, hy = hx + step / 2, hy + step / 2
+    x, y = _sample_edges(polygons, step).T
+    i0 = np.maximum(0, np.ceil((x - hx - x0) / px - 0.5)).astype(int)
+    i1 = np.minimum(columns - 1, np.floor((x + hx - x0) / px - 0.5)).astype(int)
+    j0 = np.maximum(0, np.ceil((y - hy - y0) / py - 0.5)).astype(int)
+    j1 = np.minimum(rows - 1, np.floor((y + hy - y0) / py - 0.5)).astype(int)
+    near = (i0 <= i1) & (j0 <= j1)
+    i0, i1, j0, j1 = i0[near], i1[near], j0[near], j1[near]
+    if not len(i0):
+        return blocked
+    for di in range(int((i1 - i0).max()) + 1):
+        for dj in range(int((j1 - j0).max()) + 1):
+            select = (i0 + di <= i1) & (j0 + dj <= j1)
+            blocked[j0[select] + dj, i0[select] + di] = True
+    return blocked
+
+
+def get_rectangles(mask: np.ndarray) -> List[Tuple[int, int, int, int]]:
+    """Returns (row, column, rows, columns) rectangles that cover the True cells of mask.
+
+    Runs of True cells in each row are merged with the same runs of the
+    rows below.
+    """
+    rectangles = []
+    active: Dict[Tuple[int, int], int] = {}
+    for row in range(mask.shape[0] + 1):
+        runs = {}
+        if row < mask.shape[0]:
+            edges = np.flatnonzero(np.diff(np.concatenate([[0], mask[row], [0]])))
+            runs = {(int(c0), int(c1)): row for c0, c1 in zip(edges[::2], edges[1::2])}
+        for run, first in active.items():
+            if run in runs:
+                runs[run] = first
+            else:
+                rectangles.append((first, run[0], row - first, run[1] - run[0]))
+        active = runs
+    return rectangles
+
+
+def _add_arrays(
+    component: Component,
+    cell: Component,
+    mask: np.ndarray,
+    origin: Float2,
+    pitch: Float2,
+) -> None:
+    """Adds CellArrays of cell that cover the True cells of mask.
+
+    Uses CellArrays of every cell or of every other row or column of mask,
+    whichever needs fewer CellArrays, so patterns that repeat every two
+    windows also become a few CellArrays.
+
+    Args:
+        component: to add the CellArrays to.
+        cell: to repeat.
+        mask: (rows, columns) True where to add cell.
+        origin: (x, y) position of cell for mask (0, 0).
+        pitch: (x, y) distance between cells.
+    """
+    placements = []
+    for sy, sx in [(1, 1), (1, 2), (2, 1), (2, 2)]:
+        strided = [
+            (py, px, sy, sx, rectangle)
+            for py in range(sy)
+            for px in range(sx)
+            for rectangle in get_rectangles(mask[py::sy, px::sx])
+        ]
+        if not placements or len(strided) < len(placements):
+            placements = strided
+
+    for py, px, sy, sx, (row, column, rows, columns) in placements:
+        ref = component.add_array(
+            cell, columns=columns, rows=rows, spacing=(sx * pitch[0], sy * pitch[1])
+        )
+        ref.move(
+            (
+                origin[0] + (px + column * sx) * pitch[0],
+                origin[1] + (py + row * sy) * pitch[1],
+            )
+        )
+
+
+@cell
+def fill_window(
+    fill: Component,
+    rectangles: Tuple[Tuple[int, int, int, int], ...],
+    pitch: Float2,
+) -> Component:
+    """Returns one CellArray of fill for each rectangle of sites.
+
+    Site (row, column) is centered at ((column + 0.5) * pitch[0], (row + 0.5) * pitch[1]).
+
+    Args:
+        fill: cell centered at (0, 0).
+        rectangles: (row, column, rows, columns) of sites.
+        pitch: (x, y) distance between sites.
+    """
+    c = Component()
+    for row, column, rows, columns in rectangles:
+        ref = c.add_array(fill, columns=columns, rows=rows, spacing=pitch)
+        ref.move(((column + 0.5) * pitch[0], (row + 0.5) * pitch[1]))
+    return c
+
+
+def _get_window_fill(
+    polygons: List[np.ndarray],
+    size: Float2,
+    needed: int,
+    shape: Tuple[int, int],
+    fill_size: Float2,
+    margin: float,
+) -> Tuple[Tuple[Tuple[int, int, int, int], ...], Float2]:
+    """Returns site rectangles and pitch of the fill of a window.
+
+    Args:
+        polygons: to avoid, relative to the window origin.
+        size: (width, height) of the window.
+        needed: number of fill sites to add.
+        shape: (columns, rows) of the densest site grid.
+        fill_size: (width, height) of the fill rectangle.
+        margin: minimum distance from the polygons.
+    """
+    nx_max, ny_max = shape
+    nx, ny = _get_shape(needed, nx_max, ny_max)
+    count = needed
+    for _ in range(8):
+        pitch = (size[0] / nx, size[1] / ny)
+        free = ~get_blocked_sites(polygons, (0, 0), pitch, (ny, nx), fill_size, margin)
+        available = int(free.sum())
+        if available >= needed or (nx, ny) == (nx_max, ny_max):
+            break
+        count = int(np.ceil(count * needed / max(available, 1)))
+        nx, ny = _get_shape(count, nx_max, ny_max)
+    return tuple(get_rectangles(free)), pitch
+
+
+@cell
+def fill_density(
+    component: Component,
+    layer: Layer = (1, 0),
+    target_density: float = 0.3,
+    window: Float2 = (50.0, 50.0),
+    fill_size: Float2 = (2.0, 2.0),
+    fill_layers: Optional[Layers] = None,
+    spacing: float = 1.0,
+    avoid_layers: Optional[Layers] = None,
+    margin: float = 2.0,
+    bbox: Optional[Tuple[Float2, Float2]] = None,
+) -> Component:
+    """Returns dummy fill that raises the density of layer in each window to target_density.
+
+    Only the windows below target_density are filled. Each window gets a
+    grid of fill cells with the pitch that adds the missing area (or the
+    densest grid allowed by spacing), without the sites that come within
+    margin of avoid_layers.
+
+    The fill of a window is a cell (`fill_window`) with CellArrays of a single
+    fill cell. Windows with the same fill (same missing area and same
+    geometry to avoid relative to the window) share that cell, and
+    neighbouring windows that share it are placed with one CellArray.
+
+    Args:
+        component: to fill.
+        layer: to compute the density of. Needs to be one of the fill_layers.
+        target_density: minimum fraction of each window covered by layer.
+        window: (width, height) of each density window (um).
+        fill_size: (width, height) of the fill rectangle.
+        fill_layers: of the fill rectangle. Defaults to (layer,).
+        spacing: minimum distance between fill rectangles.
+        avoid_layers: fill does not come within margin of these layers.
+            Defaults to all the layers in component.
+        margin: minimum distance between fill and the geometry to avoid.
+        bbox: ((xmin, ymin), (xmax, ymax)) region to fill.
+            Defaults to the component bbox.
+
+    .. code::
+
+        import gdsfactory as gf
+
+        c = gf.Component("mzi_filled")
+        mzi = c << gf.components.mzi()
+        c << gf.fill_density(mzi.parent, layer=(1, 0), target_density=0.2)
+        c.show()
+
+    """
+    from gdsfactory.geometry.density import get_density_map
+    from gdsfactory.geometry.tiling import get_bboxes
+
+    layer = (int(layer[0]), int(layer[1]))
+    fill_layers = fill_layers or (layer,)
+    if layer not in {(int(f[0]), int(f[1])) for f in fill_layers}:
+        raise ValueError(f"layer {layer} needs to be in fill_layers {fill_layers}")
+    avoid_layers = avoid_layers or tuple(component.get_layers())
+
+    density_map = get_density_map(component, layer=layer, window=window, bbox=bbox)
+    (xmin, ymin), (xmax, ymax) = component.bbox if bbox is None else bbox
+    (ox, oy), (width, height) = density_map.origin, density_map.window
+    rows, columns = density_map.area.shape
+    fill_area = fill_size[0] * fill_size[1]
+    pitch_min = (fill_size[0] + spacing, fill_size[1] + spacing)
+    missing = (target_density - density_map.density) * width * height
+    needed = np.ceil(missing / fill_area - 1e-9).astype(int)
+
+    windows: Dict[tuple, Tuple[tuple, Float2]] = {}
+    patterns: Dict[Tuple[tuple, Float2], np.ndarray] = {}
+    for row in np.flatnonzero((needed > 0).any(axis=1)).tolist():
+        y0, y1 = oy + row * height, min(oy + (row + 1) * height, ymax)
+        region = ((ox - margin, y0 - margin), (xmax + margin, y1 + margin))
+        polygons = [
+            polygon
+            for layer_polygons in component.query_region(
+                region, layers=avoid_layers
+            ).values()
+            for polygon in layer_polygons
+        ]
+        by_column: List[List[np.ndarray]] = [[] for _ in range(columns)]
+        bboxes = get_bboxes(polygons)
+        c0 = np.floor((bboxes[:, 0] - margin - ox) / width).astype(int)
+        c1 = np.floor((bboxes[:, 2] + margin - ox) / width).astype(int)
+        for polygon, first, last in zip(polygons, c0.tolist(), c1.tolist()):
+            for column in range(max(first, 0), min(last, columns - 1) + 1):
+                by_column[column].append(polygon)
+
+        for column in np.flatnonzero(needed[row] > 0).tolist():
+            x0, x1 = ox + column * width, min(ox + (column + 1) * width, xmax)
+            shape = (
+                int(np.floor((x1 - x0) / pitch_min[0] + 1e-9)),
+                int(np.floor((y1 - y0) / pitch_min[1] + 1e-9)),
+            )
+            if min(shape) < 1:
+                continue
+            local = [polygon - (x0, y0) for polygon in by_column[column]]
+            key = (
+                int(needed[row, column]),
+                round(x1 - x0, 6),
+                round(y1 - y0, 6),
+                tuple(sorted(polygon.round(6).tobytes() for polygon in local)),
+            )
+            if key not in windows:
+                windows[key] = _get_window_fill(
+                    local,
+                    size=(x1 - x0, y1 - y0),
+                    needed=key[0],
+                    shape=shape,
+                    fill_size=fill_size,
+                    margin=margin,
+                )
+            if windows[key] not in patterns:
+                patterns[windows[key]] = np.zeros((rows, columns), dtype=bool)
+            patterns[windows[key]][row, column] = True
+
+    c = Component()
+    fill = fill_cell(size=fill_size, layers=fill_layers)
+    for (rectangles, pitch), mask in patterns.items():
+        if rectangles:
+            window_fill = fill_window(fill, rectangles=rectangles, pitch=pitch)
+            _add_arrays(c, window_fill, mask, (ox, oy), (width, height))
+    return c
+
+
+def test_fill_density() -> None:
+    import gdspy
+
+    import gdsfactory as gf
+    from gdsfactory.geometry.density import get_density_map
+
+    c = gf.Component("test_fill_density")
+    c.add_array(
+        gf.components.ring(radius=10, width=0.5), columns=3, rows=2, spacing=(60, 60)
+    )
+    ref = c << gf.components.rectangle(size=(30, 80), layer=(1, 0))
+    ref.move((150, -20))
+    ref = c << gf.components.rectangle(size=(100, 3), layer=(2, 0))
+    ref.rotate(30)
+    ref.move((0, -60))
+
+    layer, target, window, margin = (1, 0), 0.25, (25.0, 25.0), 1.0
+    bbox = ((-40, -80), (210, 95))
+    fill = fill_density(
+        c, layer=layer, target_density=target, window=window, margin=margin, bbox=bbox
+    )
+    windows = {ref.parent for ref in fill.references}
+    assert {ref.parent.name for w in windows for ref in w.references} == {
+        fill_cell(layers=(layer,)).name
+    }
+    assert not fill.polygons and not any(w.polygons for w in windows)
+
+    filled = gf.Component("test_fill_density_filled")
+    filled << c
+    filled << fill
+    before = get_density_map(c, layer=layer, window=window, bbox=bbox)
+    after = get_density_map(filled, layer=layer, window=window, bbox=bbox)
+    assert np.all(after.area >= before.area - 1e-6)
+    empty = np.zeros(before.area.shape, dtype=bool)
+    for row, column in np.ndindex(*empty.shape):
+        (x0, y0), (x1, y1) = before.get_window_bbox(row, column)
+        region = ((x0 - margin, y0 - margin), (x1 + margin, y1 + margin))
+        empty[row, column] = not c.query_region(region)
+    assert empty.any() and not empty.all()
+    assert np.all(after.density[empty] >= target - 1e-9)
+    assert after.density.mean() > before.density.mean()
+
+    fill_polygons = fill.get_polygons()
+    (xmin, ymin), (xmax, ymax) = fill.bbox
+    assert xmin >= bbox[0][0] and ymin >= bbox[0][1]
+    assert xmax <= bbox[1][0] and ymax <= bbox[1][1]
+    avoid = gdspy.offset(fill_polygons, margin - 1e-3, join="miter")
+    assert gdspy.boolean(avoid, c.get_polygons(), "and") is None
+    assert len(fill.references) < len(fill_polygons) / 10
+
+
 if __name__ == "__main__":
     import gdsfactory as gf
 
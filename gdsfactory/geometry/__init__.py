@@ -6,10 +6,16 @@ from gdsfactory.geometry.check_exclusion import check_exclusion
 from gdsfactory.geometry.check_inclusion import check_inclusion
 from gdsfactory.geometry.check_space import check_space
 from gdsfactory.geometry.check_width import check_width
-from gdsfactory.geometry.compute_area import compute_area, compute_area_hierarchical
+from gdsfactory.geometry.compute_area import (
+    compute_area,
+    compute_area_hierarchical,
+    get_layer_area,
+)
+from gdsfactory.geometry.density import get_density_map
 from gdsfactory.geometry.invert import invert
 from gdsfactory.geometry.offset import offset
 from gdsfactory.geometry.outline import outline
+from gdsfactory.geometry.run_drc import run_drc
 from gdsfactory.geometry.union import union
 from gdsfactory.geometry.xor_diff import xor_diff
 
@@ -23,9 +29,12 @@ __all__ = (
     "check_width",
     "compute_area",
     "compute_area_hierarchical",
+    "get_density_map",
+    "get_layer_area",
     "invert",
     "offset",
     "outline",
+    "run_drc",
     "union",
     "xor_diff",
     "functions",
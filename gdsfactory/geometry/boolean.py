@@ -1,11 +1,38 @@
-from typing import Tuple, Union
+from typing import List, Optional, Tuple, Union
 
-import phidl.geometry as pg
+import gdspy
+import numpy as np
+from phidl.device_layout import Device, DeviceReference, Polygon
 
 import gdsfactory as gf
 from gdsfactory.component import Component
+from gdsfactory.geometry.tiling import boolean_polygons
 from gdsfactory.types import ComponentOrReference, Int2, Layer
 
+# clipper operation for each valid boolean operation (lowercase)
+operations = {
+    "not": "not",
+    "and": "and",
+    "or": "or",
+    "xor": "xor",
+    "a-b": "not",
+    "b-a": "not",
+    "a+b": "or",
+}
+
+
+def get_polygons(elements) -> List[np.ndarray]:
+    """Returns polygons of a Component(/Reference), Polygon or list of them."""
+    if not isinstance(elements, (list, tuple)):
+        elements = [elements]
+    polygons = []
+    for e in elements:
+        if isinstance(e, (Device, DeviceReference)):
+            polygons.extend(e.get_polygons())
+        elif isinstance(e, (Polygon, gdspy.PolygonSet)):
+            polygons.extend(e.polygons)
+    return polygons
+
 
 @gf.cell
 def boolean(
@@ -13,9 +40,10 @@ def boolean(
     B: Union[ComponentOrReference, Tuple[ComponentOrReference, ...]],
     operation: str,
     precision: float = 1e-4,
-    num_divisions: Union[int, Int2] = (1, 1),
+    num_divisions: Optional[Union[int, Int2]] = None,
     max_points: int = 4000,
     layer: Layer = (1, 0),
+    max_workers: Optional[int] = None,
 ) -> Component:
     """Performs boolean operations between 2 Component/Reference objects,
     or lists of Devices/DeviceReferences.
@@ -24,7 +52,7 @@ def boolean(
     Note that 'A+B' is equivalent to 'or', 'A-B' is equivalent to 'not', and
     'B-A' is equivalent to 'not' with the operands switched
 
-    gdsfactory wrapper for phidl.geometry.boolean
+    adapted from phidl.geometry.boolean, runs by tiles (gdsfactory.geometry.tiling)
 
     You can also use gdsfactory.drc.boolean that uses Klayout backend
 
@@ -36,8 +64,10 @@ def boolean(
         num_divisions: number of divisions with which the geometry is divided into
           multiple rectangular regions. This allows for each region to be
           processed sequentially, which is more computationally efficient.
+          None chooses the regions from the polygon density.
         max_points: The maximum number of vertices within the resulting polygon.
         layer: Specific layer to put polygon geometry on.
+        max_workers: processes for the regions. None uses all CPUs, 1 runs serially.
 
     Returns: Component with polygon(s) of the boolean operations between
       the 2 input Devices performed.
@@ -48,20 +78,28 @@ def boolean(
     'A-B' is equivalent to 'not'.
     'B-A' is equivalent to 'not' with the operands switched.
     """
-
-    A = list(A) if isinstance(A, tuple) else A
-    B = list(B) if isinstance(B, tuple) else B
-
-    c = pg.boolean(
-        A=A,
-        B=B,
-        operation=operation,
+    key = operation.lower().replace(" ", "")
+    if key not in operations:
+        valid = ["not", "and", "or", "xor", "A-B", "B-A", "A+B"]
+        raise ValueError(f"operation = {operation!r} not in {valid}")
+    A_polys = get_polygons(A)
+    B_polys = get_polygons(B)
+    if key == "b-a":
+        A_polys, B_polys = B_polys, A_polys
+
+    polygons = boolean_polygons(
+        A_polys,
+        B_polys,
+        operation=operations[key],
         precision=precision,
-        num_divisions=num_divisions,
         max_points=max_points,
-        layer=layer,
+        num_divisions=num_divisions,
+        max_workers=max_workers,
     )
-    return gf.read.from_phidl(component=c)
+    c = Component()
+    if polygons:
+        c.add_polygon(polygons, layer=layer)
+    return c
 
 
 def test_boolean() -> None:
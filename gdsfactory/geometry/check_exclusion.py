@@ -1,5 +1,6 @@
 from typing import Tuple
 
+from gdsfactory.export.to_klayout import get_layout
 from gdsfactory.types import ComponentOrPath
 
 
@@ -32,13 +33,7 @@ def check_exclusion(
     """
     import klayout.db as pya
 
-    from gdsfactory.component import Component
-
-    if isinstance(gdspath, Component):
-        gdspath.flatten()
-        gdspath = gdspath.write_gds()
-    layout = pya.Layout()
-    layout.read(str(gdspath))
+    layout = get_layout(gdspath, dbu=dbu)
     cell = layout.top_cell()
     a = pya.Region(cell.begin_shapes_rec(layout.layer(layer1[0], layer1[1])))
     b = pya.Region(cell.begin_shapes_rec(layout.layer(layer2[0], layer2[1])))
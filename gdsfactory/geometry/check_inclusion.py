@@ -1,5 +1,6 @@
 from typing import Tuple
 
+from gdsfactory.export.to_klayout import get_layout
 from gdsfactory.types import ComponentOrPath
 
 
@@ -32,13 +33,7 @@ def check_inclusion(
     """
     import klayout.db as pya
 
-    from gdsfactory.component import Component
-
-    if isinstance(gdspath, Component):
-        gdspath.flatten()
-        gdspath = gdspath.write_gds()
-    layout = pya.Layout()
-    layout.read(str(gdspath))
+    layout = get_layout(gdspath, dbu=dbu)
     cell = layout.top_cell()
     a = pya.Region(cell.begin_shapes_rec(layout.layer(layer_in[0], layer_in[1])))
     b = pya.Region(cell.begin_shapes_rec(layout.layer(layer_out[0], layer_out[1])))
@@ -1,6 +1,7 @@
 from typing import Tuple
 
 from gdsfactory.component import Component
+from gdsfactory.export.to_klayout import get_layout
 from gdsfactory.types import ComponentOrPath
 
 
@@ -45,11 +46,7 @@ def check_space(
     """
     import klayout.db as pya
 
-    if isinstance(gdspath, Component):
-        gdspath.flatten()
-        gdspath = gdspath.write_gds()
-    layout = pya.Layout()
-    layout.read(str(gdspath))
+    layout = get_layout(gdspath, dbu=dbu)
     cell = layout.top_cell()
     region = pya.Region(cell.begin_shapes_rec(layout.layer(layer[0], layer[1])))
 
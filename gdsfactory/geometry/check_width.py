@@ -2,6 +2,7 @@ from pathlib import Path
 from typing import Tuple, Union
 
 from gdsfactory.component import Component
+from gdsfactory.export.to_klayout import get_layout
 
 
 def check_width(
@@ -20,13 +21,7 @@ def check_width(
     """
     import klayout.db as pya
 
-    from gdsfactory.component import Component
-
-    if isinstance(gdspath, Component):
-        gdspath.flatten()
-        gdspath = gdspath.write_gds()
-    layout = pya.Layout()
-    layout.read(str(gdspath))
+    layout = get_layout(gdspath, dbu=dbu)
     cell = layout.top_cell()
     region = pya.Region(cell.begin_shapes_rec(layout.layer(layer[0], layer[1])))
     # print(region)
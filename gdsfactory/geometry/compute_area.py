@@ -1,38 +1,324 @@
-import gdspy as gp
-from numpy import float64
+"""Hierarchical layer area.
+
+`get_layer_area` computes the area of each cell on a layer only once (cached
+with the spatial index of the cell, `gdsfactory.spatial_index`): the area of
+the union of its own polygons plus the area of the cells it references,
+multiplied by the number of instances (each element of a CellArray) and the
+magnification of each reference.
+
+Where the bounding boxes of two instances (or of an instance and a polygon of
+the cell) intersect, only the polygons inside the intersection are flattened
+and merged, so overlapping shapes are counted once.
+"""
+import weakref
+from typing import Dict, List, Tuple
+
+import gdspy
+import numpy as np
+from gdspy import clipper
 
 from gdsfactory.component import Component
-from gdsfactory.geometry.functions import area
-from gdsfactory.types import Dict, Layer, Tuple
-
-
-def bucket_cells_by_rank(cells):
-    cells = list(cells)
-    rank = 0
-    rank_to_cells = {}
-    all_classified_cells = set()
-    prev_len_cells = -1
-    while cells:
-        classified_cells = set()
-        to_rm = []
-        for i, c in enumerate(cells):
-            _cells = c.get_dependencies(recursive=False)
-            unclassified_subcells = _cells - all_classified_cells
-            if len(unclassified_subcells) == 0:
-                classified_cells.update([c])
-                to_rm += [i]
-
-        if prev_len_cells == len(cells):
-            # print(cells)
-            raise ValueError("Error: some cells cannot be linked")
-        prev_len_cells = len(cells)
-        while to_rm:
-            cells.pop(to_rm.pop())
-
-        rank_to_cells[rank] = classified_cells
-        all_classified_cells.update(classified_cells)
-        rank += 1
-    return rank_to_cells
+from gdsfactory.geometry.tiling import (
+    boolean_polygons,
+    get_bboxes,
+    max_tile_points_boolean,
+)
+from gdsfactory.spatial_index import (
+    CellIndex,
+    _layer_key,
+    _transform_bbox,
+    get_index,
+    iter_polygons,
+)
+from gdsfactory.types import Layer
+
+precision = 1e-4
+
+# LayerArea of each cell index (valid while the cell does not change) and layer
+_AREAS: "weakref.WeakKeyDictionary[CellIndex, Dict[Layer, LayerArea]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def polygon_areas(polygons: List[np.ndarray]) -> np.ndarray:
+    """Returns the area of each polygon."""
+    if len(polygons) == 0:
+        return np.zeros(0)
+    points = np.concatenate(polygons)
+    sizes = np.array([len(p) for p in polygons])
+    starts = np.cumsum(sizes) - sizes
+    following = np.arange(1, len(points) + 1)
+    following[starts + sizes - 1] = starts
+    x, y = points[:, 0], points[:, 1]
+    cross = x * y[following] - x[following] * y
+    return np.abs(np.add.reduceat(cross, starts)) / 2
+
+
+def _clip(polygons: List[np.ndarray], rectangles: np.ndarray) -> List[np.ndarray]:
+    """Returns the union of polygons inside the union of (N, 4) rectangles."""
+    if not polygons or not len(rectangles):
+        return []
+    boxes = [
+        np.array([[x0, y0], [x1, y0], [x1, y1], [x0, y1]])
+        for x0, y0, x1, y1 in rectangles
+    ]
+    if sum(len(p) for p in polygons) < max_tile_points_boolean:
+        return [
+            np.array(p) for p in clipper.clip(polygons, boxes, "and", 1 / precision)
+        ]
+    return boolean_polygons(polygons, boxes, "and", precision=precision, max_points=0)
+
+
+def _overlapping_pairs(bboxes: np.ndarray, tol: float) -> np.ndarray:
+    """Returns (N, 2) index pairs i < j of bboxes that intersect more than tol."""
+    pairs = []
+    order = np.argsort(bboxes[:, 0], kind="stable")
+    xmin_sorted = bboxes[order, 0]
+    for k, i in enumerate(order):
+        end = np.searchsorted(xmin_sorted, bboxes[i, 2] - tol, side="left")
+        candidates = order[k + 1 : end]
+        candidates = candidates[
+            (np.minimum(bboxes[candidates, 3], bboxes[i, 3]) - tol)
+            > np.maximum(bboxes[candidates, 1], bboxes[i, 1])
+        ]
+        pairs += [(min(i, j), max(i, j)) for j in candidates]
+    return np.array(pairs, dtype=int).reshape(-1, 2)
+
+
+def _intersection(bboxes1: np.ndarray, bboxes2: np.ndarray) -> np.ndarray:
+    return np.concatenate(
+        [
+            np.maximum(bboxes1[:, :2], bboxes2[:, :2]),
+            np.minimum(bboxes1[:, 2:], bboxes2[:, 2:]),
+        ],
+        axis=1,
+    )
+
+
+def _overlaps(bboxes: np.ndarray, bbox: np.ndarray, tol: float) -> np.ndarray:
+    return (
+        np.minimum(bboxes[:, 2], bbox[2]) - tol > np.maximum(bboxes[:, 0], bbox[0])
+    ) & (np.minimum(bboxes[:, 3], bbox[3]) - tol > np.maximum(bboxes[:, 1], bbox[1]))
+
+
+def get_element_offsets(index: CellIndex, i: int) -> np.ndarray:
+    """Returns (columns * rows, 2) origin of each element of reference i."""
+    columns, rows = index.ref_shapes[i]
+    if columns == rows == 1:
+        return index.ref_origins[i][None]
+    rows_, columns_ = np.meshgrid(np.arange(rows), np.arange(columns))
+    return (
+        index.ref_origins[i]
+        + columns_.reshape(-1, 1) * index.ref_steps[i, 0]
+        + rows_.reshape(-1, 1) * index.ref_steps[i, 1]
+    )
+
+
+class LayerArea:
+    """Area of a cell on a layer, counting overlapping shapes once.
+
+    Use `get_layer_area` to reuse the areas of the cells.
+
+    Args:
+        cell: to compute.
+        layer: to compute.
+
+    Attributes:
+        area: of the cell on the layer (um2).
+        polygons: union of the polygons of the cell on the layer.
+        children: (reference position, LayerArea) for each reference with polygons.
+        added: polygons to add to the polygons and children to count overlaps once.
+        removed: polygons to remove from the polygons and children.
+    """
+
+    def __init__(self, cell: gdspy.Cell, layer: Layer) -> None:
+        index = get_index(cell)
+        self.layer = layer
+        own = [
+            index.polygons[i]
+            for i in np.flatnonzero(index.layer_keys == _layer_key(np.array([layer])))
+        ]
+        if len(own) > 1:
+            own = boolean_polygons(own, [], "or", precision=precision, max_workers=1)
+        self.polygons = [np.asarray(p) for p in own]
+        self.bboxes = get_bboxes(self.polygons)
+
+        cells = {id(child_index): child for child, child_index in index.children}
+        ref_bboxes = index.get_ref_bboxes(layer)
+        self.children: List[Tuple[int, LayerArea]] = []
+        area = polygon_areas(self.polygons).sum()
+        for i, child_index in enumerate(index.ref_indexes):
+            if np.isnan(ref_bboxes[i, 0]):
+                continue
+            child = get_layer_area(cells[id(child_index)], layer)
+            if child.area == 0:
+                continue
+            self.children.append((i, child))
+            columns, rows = index.ref_shapes[i]
+            area += (
+                abs(np.linalg.det(index.ref_matrices[i])) * columns * rows * child.area
+            )
+
+        self.added, self.removed = self._get_overlaps(index, cells, ref_bboxes)
+        self.area = float(
+            area + polygon_areas(self.added).sum() - polygon_areas(self.removed).sum()
+        )
+
+    def _get_element_bboxes(self, index: CellIndex, i: int) -> np.ndarray:
+        child = index.ref_indexes[i].layer_bboxes[self.layer]
+        bbox = _transform_bbox(child, index.ref_matrices[i], np.zeros(2))
+        return bbox + np.tile(get_element_offsets(index, i), 2)
+
+    def _get_overlaps(
+        self, index: CellIndex, cells: Dict[int, gdspy.Cell], ref_bboxes: np.ndarray
+    ) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        """Returns polygons to add and remove where the bboxes of instances intersect.
+
+        Items are the polygons of the cell and each element of the references.
+        Inside the intersections the union of all items is added and each item
+        is removed.
+        """
+        tol = 2 * precision
+        refs = [i for i, _ in self.children]
+        npolygons = len(self.polygons)
+        blocks = np.concatenate([self.bboxes, ref_bboxes[refs].reshape(-1, 4)])
+        element_bboxes: Dict[int, np.ndarray] = {}
+
+        def _get_items(block: int, bbox: np.ndarray) -> List[Tuple[int, int]]:
+            """Returns (reference or -1, element or polygon) items overlapping bbox."""
+            if block < npolygons:
+                return [(-1, block)]
+            i = refs[block - npolygons]
+            if i not in element_bboxes:
+                element_bboxes[i] = self._get_element_bboxes(index, i)
+            elements = np.flatnonzero(_overlaps(element_bboxes[i], bbox, tol))
+            return [(i, e) for e in elements.tolist()]
+
+        def _get_bbox(item: Tuple[int, int]) -> np.ndarray:
+            i, e = item
+            return self.bboxes[e] if i < 0 else element_bboxes[i][e]
+
+        pairs = set()
+        for a, b in _overlapping_pairs(blocks, tol).tolist():
+            items_a = _get_items(a, blocks[b])
+            items_b = _get_items(b, blocks[a])
+            if not items_a or not items_b:
+                continue
+            bboxes_b = np.array([_get_bbox(item) for item in items_b])
+            for item in items_a:
+                hits = np.flatnonzero(_overlaps(bboxes_b, _get_bbox(item), tol))
+                pairs.update((item, items_b[j]) for j in hits.tolist())
+
+        # elements of a CellArray that overlap each other
+        for block, i in enumerate(refs, npolygons):
+            columns, rows = index.ref_shapes[i]
+            if columns * rows == 1:
+                continue
+            _get_items(block, blocks[block])
+            first = element_bboxes[i][0]
+            dc, dr = np.meshgrid(np.arange(columns), np.arange(1 - rows, rows))
+            dc, dr = dc.ravel(), dr.ravel()
+            keep = (dc > 0) | (dr > 0)
+            dc, dr = dc[keep], dr[keep]
+            steps = index.ref_steps[i]
+            shifts = dc[:, None] * steps[0] + dr[:, None] * steps[1]
+            hits = _overlaps(first + np.tile(shifts, 2), first, tol)
+            column, row = np.divmod(np.arange(columns * rows), rows)
+            for c, r in zip(dc[hits].tolist(), dr[hits].tolist()):
+                valid = (column + c < columns) & (row + r >= 0) & (row + r < rows)
+                elements = np.flatnonzero(valid)
+                others = (column[valid] + c) * rows + row[valid] + r
+                pairs.update(
+                    ((i, e), (i, o)) for e, o in zip(elements.tolist(), others.tolist())
+                )
+
+        if not pairs:
+            return [], []
+
+        pairs = sorted(pairs)
+        rectangles = _intersection(
+            np.array([_get_bbox(a) for a, _ in pairs]),
+            np.array([_get_bbox(b) for _, b in pairs]),
+        )
+        items = sorted({item for pair in pairs for item in pair})
+        removed = []
+        polygons = []
+        for item in items:
+            item_rectangles = rectangles[_overlaps(rectangles, _get_bbox(item), tol)]
+            item_polygons = self._get_item_polygons(index, cells, item, item_rectangles)
+            polygons += item_polygons
+            removed += _clip(item_polygons, item_rectangles)
+        return _clip(polygons, rectangles), removed
+
+    def _get_item_polygons(
+        self,
+        index: CellIndex,
+        cells: Dict[int, gdspy.Cell],
+        item: Tuple[int, int],
+        rectangles: np.ndarray,
+    ) -> List[np.ndarray]:
+        """Returns the polygons of an item that overlap the rectangles."""
+        i, e = item
+        if i < 0:
+            return [self.polygons[e]]
+        bbox = np.concatenate(
+            [rectangles[:, :2].min(axis=0), rectangles[:, 2:].max(axis=0)]
+        )
+        matrix = index.ref_matrices[i]
+        column, row = divmod(e, index.ref_shapes[i][1])
+        offset = index.ref_origins[i] + index.ref_steps[i].T @ (column, row)
+        matrix_inv = np.linalg.inv(matrix)
+        local = _transform_bbox(bbox, matrix_inv, -matrix_inv @ offset)
+        cell = cells[id(index.ref_indexes[i])]
+        return [
+            points @ matrix.T + offset
+            for _, points in iter_polygons(
+                cell, layers=[self.layer], bbox=local.reshape(2, 2)
+            )
+        ]
+
+
+def get_layer_area(cell: gdspy.Cell, layer: Layer) -> LayerArea:
+    """Returns cached LayerArea, recomputed when the cell or its references change.
+
+    Args:
+        cell: to compute.
+        layer: to compute.
+    """
+    layer = (int(layer[0]), int(layer[1]))
+    areas = _AREAS.setdefault(get_index(cell), {})
+    if layer not in areas:
+        areas[layer] = LayerArea(cell, layer)
+    return areas[layer]
+
+
+def get_ranks(component: Component) -> Dict[str, int]:
+    """Returns {cell name: rank} for component and its dependencies.
+
+    Cells without references have rank 0, the others one more than the
+    highest rank of the cells they reference.
+    """
+    ranks: Dict[str, int] = {}
+
+    def _rank(cell: gdspy.Cell) -> int:
+        if cell.name not in ranks:
+            children = cell.get_dependencies(recursive=False)
+            ranks[cell.name] = 1 + max((_rank(c) for c in children), default=-1)
+        return ranks[cell.name]
+
+    _rank(component)
+    return ranks
+
+
+def bucket_cells_by_rank(cells) -> Dict[int, set]:
+    """Returns {rank: set of cells} (see get_ranks)."""
+    ranks: Dict[str, int] = {}
+    for cell in cells:
+        ranks.update(get_ranks(cell))
+    rank_to_cells: Dict[int, set] = {}
+    for cell in cells:
+        rank_to_cells.setdefault(ranks[cell.name], set()).add(cell)
+    return dict(sorted(rank_to_cells.items()))
 
 
 def get_polygons_on_layer(c, layer):
@@ -45,22 +331,9 @@ def get_polygons_on_layer(c, layer):
     return polygons
 
 
-def compute_area(component: Component, layer: Layer) -> float64:
+def compute_area(component: Component, layer: Layer) -> float:
     """Returns Computed area of the component for a given layer."""
-    c = component.copy()
-    c.flatten()
-    polys_by_spec = c.get_polygons(by_spec=True)
-    _area = 0
-    for layer_polygons, polys in polys_by_spec.items():
-        # print(layer)
-        if layer_polygons == layer:
-            joined_polys = gp.boolean(polys, None, operation="or")
-            # print(joined_polys)
-            try:
-                _area += sum(abs(area(p)) for p in joined_polys.polygons)
-            except BaseException:
-                print(f"Warning, {c.name} joinedpoly {joined_polys} could not be added")
-    return _area
+    return get_layer_area(component, layer).area
 
 
 def compute_area_hierarchical(
@@ -70,71 +343,39 @@ def compute_area_hierarchical(
     keep_zero_area_cells: bool = False,
 ) -> Dict[str, Tuple[float, int]]:
     """Compute area of the component on a given layer
-    Faster than `compute_area` but need to be careful if the cells overlap
-    Can pass a list of cells to flatten
+    Each cell area is computed once and reused by all its instances
+    (see get_layer_area), overlapping instances are counted once.
     Returns Dict[key of each cell, Tuple[area, rank (position in hierarchy)]
 
     Args:
         component:
         layer:
-        func_check_to_flatten:
+        func_check_to_flatten: cells where it returns True use the flat area
+          (compute_area_flat).
         keep_zero_area_cells:removes zero area cells
     """
-
     all_cells = component.get_dependencies(recursive=True)
     all_cells.update([component])
-    cells_by_rank = bucket_cells_by_rank(all_cells)
-    # print("Found the hierarchy...")
-
-    cell_to_area = {}
-    cell_to_rank = {}
-
-    if func_check_to_flatten is None:
-
-        def _has_polygons(cell):
-            polys = get_polygons_on_layer(cell, layer)
-            return len(polys)
-
-        func_check_to_flatten = _has_polygons
-
-    for rank, cells in cells_by_rank.items():
-        for cell in cells:
-            to_flatten = func_check_to_flatten(cell)
-            if to_flatten:
-                # print("CAH - TO FLATTEN", to_flatten)
-                _area = compute_area(cell, layer)
-            else:
-                # _cell_area_by_spec = cell.area(by_spec=True)
-                _area = 0
-                # _cell_area_by_spec[layer] if layer in _cell_area_by_spec else 0
-                # _area = 0
-
-                # print("CAH - ",cell.name)
-
-                for ref in cell.references:
-                    _area += cell_to_area[ref.ref_cell.name]
-                # print(
-                #     "CAH {} {:.1f} {}".format(cell.name, _area, len(cell.references))
-                # )
-
-            cell_to_area[cell.name] = _area
-            cell_to_rank[cell.name] = rank
-    to_rm = []
-    if not keep_zero_area_cells:
-        for k, v in cell_to_area.items():
-            if v == 0:
-                to_rm += [k]
-
-    while to_rm:
-        cell_to_area.pop(to_rm.pop())
+    ranks = get_ranks(component)
 
     cell_to_data = {}
-    for k, v in cell_to_area.items():
-        cell_to_data[k] = (v, cell_to_rank[k])
-
+    for cell in all_cells:
+        if func_check_to_flatten is not None and func_check_to_flatten(cell):
+            _area = compute_area_flat(cell, layer)
+        else:
+            _area = get_layer_area(cell, layer).area
+        if _area or keep_zero_area_cells:
+            cell_to_data[cell.name] = (_area, ranks[cell.name])
     return cell_to_data
 
 
+def compute_area_flat(component: Component, layer: Layer) -> float:
+    """Returns area of the component for a given layer flattening all polygons."""
+    polys = component.get_polygons(by_spec=True).get(tuple(layer), [])
+    joined_polys = gdspy.boolean(polys, None, operation="or", precision=precision)
+    return polygon_areas(joined_polys.polygons).sum() if joined_polys else 0.0
+
+
 def test_compute_area() -> None:
     import gdsfactory as gf
 
@@ -151,6 +392,30 @@ def test_compute_area_hierarchical() -> None:
     )
 
 
+def test_compute_area_overlaps() -> None:
+    import gdsfactory as gf
+
+    ring = gf.components.ring(radius=10, width=0.5)
+    square = gf.components.rectangle(size=(5, 5), layer=(1, 0))
+
+    c = gf.Component("test_compute_area_overlaps")
+    c.add_array(ring, columns=4, rows=3, spacing=(15, 21))
+    c.add_array(square, columns=3, rows=2, spacing=(4, 4)).rotate(30)
+    ref = c << ring
+    ref.movex(5)
+    c.add_polygon([(-12, -12), (40, -12), (40, -11), (-12, -11)], layer=(1, 0))
+    c2 = gf.Component("test_compute_area_overlaps_top")
+    c2 << c
+    c2.add(gf.ComponentReference(c, magnification=2, origin=(0, 30)))
+
+    for component in [c, c2]:
+        assert np.isclose(
+            compute_area(component, (1, 0)),
+            compute_area_flat(component, (1, 0)),
+            rtol=1e-5,
+        )
+
+
 if __name__ == "__main__":
     test_compute_area_hierarchical()
     # test_compute_area()
@@ -0,0 +1,294 @@
+"""Windowed layer density.
+
+`get_density_map` returns the area of a layer inside each window of a grid
+(for example 50 x 50 um windows over the whole die). Instances that fit
+inside one window add the area of their cell (`get_layer_area`, computed once
+per cell) without visiting their polygons. Only the instances that cross a
+window edge are visited, and only their polygons that cross a window edge
+are cut.
+"""
+from typing import Dict, List, Optional, Tuple
+
+import gdspy
+import numpy as np
+from gdspy import clipper
+from pydantic import BaseModel, Extra
+
+from gdsfactory.geometry.compute_area import (
+    get_element_offsets,
+    get_layer_area,
+    polygon_areas,
+    precision,
+)
+from gdsfactory.geometry.tiling import get_bboxes
+from gdsfactory.spatial_index import _transform_bbox, get_index
+from gdsfactory.types import Float2, Layer
+
+
+class DensityMap(BaseModel):
+    """Layer area in each window of a grid.
+
+    Args:
+        layer: of the area.
+        origin: (x, y) lower left corner of the first window (um).
+        window: (width, height) of each window (um).
+        area: (rows, columns) layer area inside each window (um2).
+    """
+
+    layer: Layer
+    origin: Tuple[float, float]
+    window: Tuple[float, float]
+    area: np.ndarray
+
+    class Config:
+        extra = Extra.forbid
+        arbitrary_types_allowed = True
+
+    @property
+    def density(self) -> np.ndarray:
+        """Returns (rows, columns) fraction of each window covered by the layer."""
+        return self.area / (self.window[0] * self.window[1])
+
+    def get_window_bbox(self, row: int, column: int) -> Tuple[Float2, Float2]:
+        """Returns ((xmin, ymin), (xmax, ymax)) of a window."""
+        width, height = self.window
+        xmin = self.origin[0] + column * width
+        ymin = self.origin[1] + row * height
+        return (xmin, ymin), (xmin + width, ymin + height)
+
+
+def _get_windows(
+    bboxes: np.ndarray, origin: Float2, window: Float2
+) -> Tuple[np.ndarray, ...]:
+    """Returns first and last column and row of the windows under each bbox."""
+    width, height = window
+    c0 = np.floor((bboxes[:, 0] - origin[0]) / width).astype(int)
+    r0 = np.floor((bboxes[:, 1] - origin[1]) / height).astype(int)
+    c1 = np.maximum(c0, np.ceil((bboxes[:, 2] - origin[0]) / width).astype(int) - 1)
+    r1 = np.maximum(r0, np.ceil((bboxes[:, 3] - origin[1]) / height).astype(int) - 1)
+    return c0, r0, c1, r1
+
+
+def _chop(polygon: np.ndarray, cuts: np.ndarray, axis: int) -> List[list]:
+    """Returns polygon pieces between each cut (len(cuts) + 1 lists)."""
+    if not len(cuts):
+        return [[polygon]]
+    return [
+        [np.array(piece) for piece in pieces]
+        for pieces in clipper._chop(polygon, cuts.tolist(), axis, 1 / precision)
+    ]
+
+
+def add_polygons(
+    area: np.ndarray,
+    polygons: List[np.ndarray],
+    origin: Float2,
+    window: Float2,
+    sign: float = 1,
+) -> None:
+    """Adds the area of the polygons inside each window to area.
+
+    Args:
+        area: (rows, columns) to add to.
+        polygons: to add.
+        origin: (x, y) lower left corner of window (0, 0).
+        window: (width, height).
+        sign: -1 subtracts the polygons.
+    """
+    if not len(polygons):
+        return
+    rows, columns = area.shape
+    c0, r0, c1, r1 = _get_windows(get_bboxes(polygons), origin, window)
+    inside = (c1 >= 0) & (r1 >= 0) & (c0 < columns) & (r0 < rows)
+    single = inside & (c0 == c1) & (r0 == r1)
+    areas = polygon_areas([polygons[k] for k in np.flatnonzero(single)])
+    np.add.at(area, (r0[single], c0[single]), sign * areas)
+
+    width, height = window
+    for k in np.flatnonzero(inside & ~single).tolist():
+        xs = origin[0] + width * np.arange(c0[k] + 1, c1[k] + 1)
+        ys = origin[1] + height * np.arange(r0[k] + 1, r1[k] + 1)
+        for column, slab in enumerate(_chop(polygons[k], xs, 0), c0[k]):
+            if not 0 <= column < columns:
+                continue
+            for piece in slab:
+                for row, pieces in enumerate(_chop(piece, ys, 1), r0[k]):
+                    if 0 <= row < rows and pieces:
+                        area[row, column] += sign * polygon_areas(pieces).sum()
+
+
+def _transform(
+    polygons: List[np.ndarray], matrix: np.ndarray, origin: np.ndarray
+) -> List[np.ndarray]:
+    if len(polygons) < 8:
+        return [polygon @ matrix.T + origin for polygon in polygons]
+    points = np.concatenate(polygons) @ matrix.T + origin
+    return np.split(points, np.cumsum([len(polygon) for polygon in polygons[:-1]]))
+
+
+def _add(
+    target: np.ndarray,
+    first: Tuple[int, int],
+    values: np.ndarray,
+    position: Tuple[int, int],
+) -> None:
+    """Adds values at window position to target that starts at window first."""
+    rows, columns = target.shape
+    r0, c0 = position[0] - first[0], position[1] - first[1]
+    r1, c1 = r0 + values.shape[0], c0 + values.shape[1]
+    if r1 <= 0 or c1 <= 0 or r0 >= rows or c0 >= columns:
+        return
+    target[max(r0, 0) : min(r1, rows), max(c0, 0) : min(c1, columns)] += values[
+        max(-r0, 0) : values.shape[0] - max(r1 - rows, 0),
+        max(-c0, 0) : values.shape[1] - max(c1 - columns, 0),
+    ]
+
+
+def _get_instance_area(
+    cell: gdspy.Cell,
+    layer: Layer,
+    matrix: np.ndarray,
+    offset: np.ndarray,
+    window: Float2,
+    cache: Dict[tuple, Tuple[Tuple[int, int], np.ndarray]],
+) -> Tuple[Tuple[int, int], np.ndarray]:
+    """Returns first window (row, column) and area in each window of an instance.
+
+    Windows are aligned to (0, 0). Instances of a cell with the same
+    transformation and offset inside a window have the same areas, so they
+    are cached by offset relative to the window of the instance origin.
+    """
+    base = np.floor(offset / window).astype(int)
+    shift = offset - base * window
+    key = (id(cell), matrix.round(12).tobytes(), shift.round(6).tobytes())
+    if key not in cache:
+        cache[key] = _compute_instance_area(cell, layer, matrix, shift, window, cache)
+    (row, column), area = cache[key]
+    return (row + base[1], column + base[0]), area
+
+
+def _compute_instance_area(
+    cell: gdspy.Cell,
+    layer: Layer,
+    matrix: np.ndarray,
+    offset: np.ndarray,
+    window: Float2,
+    cache: Dict[tuple, Tuple[Tuple[int, int], np.ndarray]],
+) -> Tuple[Tuple[int, int], np.ndarray]:
+    index = get_index(cell)
+    bbox = _transform_bbox(index.layer_bboxes[layer], matrix, offset)
+    c0, r0, c1, r1 = (int(v[0]) for v in _get_windows(bbox[None], (0, 0), window))
+    area = np.zeros((r1 - r0 + 1, c1 - c0 + 1))
+    origin = (c0 * window[0], r0 * window[1])
+
+    layer_area = get_layer_area(cell, layer)
+    for polygons, sign in [
+        (layer_area.polygons, 1),
+        (layer_area.added, 1),
+        (layer_area.removed, -1),
+    ]:
+        polygons = _transform(polygons, matrix, offset)
+        add_polygons(area, polygons, origin, window, sign=sign)
+
+    cells = {id(child_index): child for child, child_index in index.children}
+    for i, child in layer_area.children:
+        child_index = index.ref_indexes[i]
+        child_matrix = matrix @ index.ref_matrices[i]
+        offsets = get_element_offsets(index, i) @ matrix.T + offset
+        child_bbox = _transform_bbox(
+            child_index.layer_bboxes[layer], child_matrix, np.zeros(2)
+        )
+        cs0, rs0, cs1, rs1 = _get_windows(
+            child_bbox + np.tile(offsets, 2), origin, window
+        )
+        single = (cs0 == cs1) & (rs0 == rs1)
+        child_area = abs(np.linalg.det(child_matrix)) * child.area
+        rows, columns = rs0[single], cs0[single]
+        inside = (rows >= 0) & (columns >= 0)
+        inside &= (rows < area.shape[0]) & (columns < area.shape[1])
+        np.add.at(area, (rows[inside], columns[inside]), child_area)
+
+        child_cell = cells[id(child_index)]
+        for k in np.flatnonzero(~single).tolist():
+            first, values = _get_instance_area(
+                child_cell, layer, child_matrix, offsets[k], window, cache
+            )
+            _add(area, (r0, c0), values, first)
+    return (r0, c0), area
+
+
+def get_density_map(
+    component: gdspy.Cell,
+    layer: Layer,
+    window: Float2 = (50.0, 50.0),
+    bbox: Optional[Tuple[Float2, Float2]] = None,
+) -> DensityMap:
+    """Returns the area of a layer inside each window of a grid covering bbox.
+
+    Overlapping shapes are counted once (see `get_layer_area`).
+
+    Args:
+        component: to compute.
+        layer: to compute.
+        window: (width, height) of each window (um).
+        bbox: ((xmin, ymin), (xmax, ymax)) region covered by the windows.
+            Defaults to the component bbox.
+
+    .. code::
+
+        import gdsfactory as gf
+
+        c = gf.components.mzi()
+        d = gf.geometry.get_density_map(c, layer=(1, 0), window=(20, 20))
+        print(d.density.max())
+
+    """
+    layer = (int(layer[0]), int(layer[1]))
+    (xmin, ymin), (xmax, ymax) = component.bbox if bbox is None else bbox
+    origin = (float(xmin), float(ymin))
+    window = (float(window[0]), float(window[1]))
+    columns = max(1, int(np.ceil((xmax - xmin) / window[0] - 1e-9)))
+    rows = max(1, int(np.ceil((ymax - ymin) / window[1] - 1e-9)))
+    area = np.zeros((rows, columns))
+
+    if get_layer_area(component, layer).area:
+        first, values = _compute_instance_area(
+            component, layer, np.eye(2), -np.array(origin), np.array(window), {}
+        )
+        _add(area, (0, 0), values, first)
+    return DensityMap(layer=layer, origin=origin, window=window, area=area)
+
+
+def test_density_map() -> None:
+    import gdsfactory as gf
+
+    ring = gf.components.ring(radius=10, width=0.5)
+    c = gf.Component("test_density_map")
+    c.add_array(ring, columns=5, rows=3, spacing=(19, 27))
+    c.add_array(gf.components.mzi(), columns=2, rows=2, spacing=(80, 40)).move(
+        (-30, 70)
+    )
+    ref = c << gf.components.rectangle(size=(40, 3), layer=(1, 0))
+    ref.rotate(30)
+
+    layer = (1, 0)
+    d = get_density_map(c, layer=layer, window=(13, 17))
+    (xmin, ymin), (xmax, ymax) = c.bbox
+    assert d.area.shape == (np.ceil((ymax - ymin) / 17), np.ceil((xmax - xmin) / 13))
+
+    polygons = c.get_polygons(by_spec=True)[layer]
+    merged = gdspy.boolean(polygons, [], "or", precision=precision).polygons
+    area = np.zeros_like(d.area)
+    add_polygons(area, merged, d.origin, d.window)
+    assert np.allclose(d.area, area, atol=1e-3)
+    assert np.isclose(d.area.sum(), get_layer_area(c, layer).area)
+    assert 0 < d.density.max() <= 1
+
+
+if __name__ == "__main__":
+    import gdsfactory as gf
+
+    c = gf.Component("density_map")
+    c.add_array(gf.components.ring(), columns=5, rows=5, spacing=(30, 30))
+    d = get_density_map(c, layer=(1, 0), window=(50, 50))
+    print(d.density)
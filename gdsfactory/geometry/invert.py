@@ -1,9 +1,7 @@
-import phidl.geometry as pg
-
 import gdsfactory as gf
 from gdsfactory.component import Component
 from gdsfactory.geometry.boolean import boolean
-from gdsfactory.types import Int2, Layer, Union
+from gdsfactory.types import Int2, Layer, Optional, Union
 
 
 @gf.cell
@@ -11,9 +9,10 @@ def invert(
     elements,
     border: float = 10.0,
     precision: float = 1e-4,
-    num_divisions: Union[int, Int2] = (1, 1),
+    num_divisions: Optional[Union[int, Int2]] = None,
     max_points: int = 4000,
     layer: Layer = (1, 0),
+    max_workers: Optional[int] = None,
 ):
     """Creates an inverted version of the input shapes with an additional
     border around the edges. adapted from phidl.geometry.invert
@@ -31,10 +30,13 @@ def invert(
             The number of divisions with which the geometry is divided into
             multiple rectangular regions. This allows for each region to be
             processed sequentially, which is more computationally efficient.
+            None chooses the regions from the polygon density.
         max_points : int
             The maximum number of vertices within the resulting polygon.
         layer : int, array-like[2], or set
             Specific layer(s) to put polygon geometry on.
+        max_workers : int or None
+            Processes for the regions. None uses all CPUs, 1 runs serially.
 
     Returns
         D: A Component containing the inverted version of the input shape(s) and the
@@ -48,7 +50,6 @@ def invert(
             Temp.add_ref(e)
         else:
             Temp.add(e)
-    gds_layer, gds_datatype = pg._parse_layer(layer)
 
     # Build the rectangle around the Component D
     R = gf.components.rectangle(
@@ -63,6 +64,7 @@ def invert(
         num_divisions=num_divisions,
         max_points=max_points,
         layer=layer,
+        max_workers=max_workers,
     )
 
 
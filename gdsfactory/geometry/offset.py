@@ -1,17 +1,10 @@
-from typing import Tuple
+from typing import Optional, Tuple, Union
 
-import gdspy
-import numpy as np
-from phidl.geometry import (
-    Device,
-    DeviceReference,
-    Polygon,
-    _merge_floating_point_errors,
-    _offset_polygons_parallel,
-    _parse_layer,
-)
+from phidl.geometry import _merge_floating_point_errors
 
 import gdsfactory as gf
+from gdsfactory.geometry.boolean import get_polygons
+from gdsfactory.geometry.tiling import offset_polygons
 from gdsfactory.types import Component, Layer
 
 
@@ -21,11 +14,12 @@ def offset(
     distance: float = 0.1,
     join_first: bool = True,
     precision: float = 1e-4,
-    num_divisions: Tuple[int, int] = (1, 1),
+    num_divisions: Optional[Union[int, Tuple[int, int]]] = None,
     join: str = "miter",
     tolerance: int = 2,
     max_points: int = 4000,
     layer: Layer = (1, 0),
+    max_workers: Optional[int] = None,
 ) -> Component:
     """Returns an element containing all polygons with an offset
     Shrinks or expands a polygon or set of polygons.
@@ -40,6 +34,7 @@ def offset(
         num_divisions: The number of divisions with which the geometry is divided into
           multiple rectangular regions. This allows for each region to be
           processed sequentially, which is more computationally efficient.
+          None chooses the regions from the polygon density.
         join: {'miter', 'bevel', 'round'} Type of join used to create polygon offset
         tolerance: For miter joints, this number must be at least 2 represents the
           maximal distance in multiples of offset between new vertices and their
@@ -48,54 +43,33 @@ def offset(
           points per full circle.
         max_points: The maximum number of vertices within the resulting polygon.
         layer: Specific layer to put polygon geometry on.
+        max_workers: processes for the regions. None uses all CPUs, 1 runs serially.
 
     Returns
         Component containing a polygon(s) with the specified offset applied.
 
     """
-    if not isinstance(elements, list):
-        elements = [elements]
-    polygons_to_offset = []
-    for e in elements:
-        if isinstance(e, (Device, DeviceReference)):
-            polygons_to_offset += e.get_polygons(by_spec=False)
-        elif isinstance(e, (Polygon, gdspy.Polygon)):
-            polygons_to_offset.append(e)
+    polygons_to_offset = get_polygons(elements)
     if len(polygons_to_offset) == 0:
         return gf.Component("offset")
     polygons_to_offset = _merge_floating_point_errors(
         polygons_to_offset, tol=precision / 1000
     )
-    gds_layer, gds_datatype = _parse_layer(layer)
-    if all(np.array(num_divisions) == np.array([1, 1])):
-        p = gdspy.offset(
-            polygons_to_offset,
-            distance=distance,
-            join=join,
-            tolerance=tolerance,
-            precision=precision,
-            join_first=join_first,
-            max_points=max_points,
-            layer=gds_layer,
-            datatype=gds_datatype,
-        )
-    else:
-        p = _offset_polygons_parallel(
-            polygons_to_offset,
-            distance=distance,
-            num_divisions=num_divisions,
-            join_first=join_first,
-            precision=precision,
-            join=join,
-            tolerance=tolerance,
-        )
+    polygons = offset_polygons(
+        polygons_to_offset,
+        distance=distance,
+        join=join,
+        tolerance=tolerance,
+        precision=precision,
+        join_first=join_first,
+        max_points=max_points,
+        num_divisions=num_divisions,
+        max_workers=max_workers,
+    )
 
     component = gf.Component("offset")
-    polygons = component.add_polygon(p, layer=layer)
-    [
-        polygon.fracture(max_points=max_points, precision=precision)
-        for polygon in polygons
-    ]
+    if polygons:
+        component.add_polygon(polygons, layer=layer)
     return component
 
 
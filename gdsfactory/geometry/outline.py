@@ -1,15 +1,32 @@
+from typing import Optional, Union
+
 import phidl.geometry as pg
 
 import gdsfactory as gf
 from gdsfactory.component import Component
+from gdsfactory.geometry.boolean import boolean
+from gdsfactory.geometry.offset import offset
+from gdsfactory.types import Int2, Layer
 
 
 @gf.cell
-def outline(elements, **kwargs) -> Component:
+def outline(
+    elements,
+    distance: float = 1,
+    precision: float = 1e-4,
+    num_divisions: Optional[Union[int, Int2]] = None,
+    join: str = "miter",
+    tolerance: float = 2,
+    join_first: bool = True,
+    max_points: int = 4000,
+    open_ports: Union[bool, float] = False,
+    layer: Layer = (0, 0),
+    max_workers: Optional[int] = None,
+) -> Component:
     """
     Returns Component containing the outlined polygon(s).
 
-    wraps phidl.geometry.outline
+    adapted from phidl.geometry.outline, runs by tiles (gdsfactory.geometry.tiling)
 
     Creates an outline around all the polygons passed in the `elements`
     argument. `elements` may be a Device, Polygon, or list of Devices.
@@ -18,7 +35,6 @@ def outline(elements, **kwargs) -> Component:
         elements: Device(/Reference), list of Device(/Reference), or Polygon
             Polygons to outline or Device containing polygons to outline.
 
-    Keyword Args:
         distance: int or float
             Distance to offset polygons. Positive values expand, negative shrink.
         precision: float
@@ -27,6 +43,7 @@ def outline(elements, **kwargs) -> Component:
             The number of divisions with which the geometry is divided into
             multiple rectangular regions. This allows for each region to be
             processed sequentially, which is more computationally efficient.
+            None chooses the regions from the polygon density.
         join: {'miter', 'bevel', 'round'}
             Type of join used to create the offset polygon.
         tolerance: int or float
@@ -47,9 +64,58 @@ def outline(elements, **kwargs) -> Component:
             clearing the outline around the Ports for positive-tone processes
         layer: int, array-like[2], or set
             Specific layer(s) to put polygon geometry on.)
+        max_workers: int or None
+            Processes for the regions. None uses all CPUs, 1 runs serially.
 
     """
-    return gf.read.from_phidl(component=pg.outline(elements, **kwargs))
+    D = Component()
+    if not isinstance(elements, list):
+        elements = [elements]
+    port_list = []
+    for e in elements:
+        if isinstance(e, Component):
+            D.add_ref(e)
+            port_list += list(e.ports.values())
+        else:
+            D.add(e)
+
+    D_bloated = offset(
+        D,
+        distance=distance,
+        join_first=join_first,
+        num_divisions=num_divisions,
+        precision=precision,
+        max_points=max_points,
+        join=join,
+        tolerance=tolerance,
+        layer=layer,
+        max_workers=max_workers,
+    )
+
+    Trim = Component()
+    if open_ports is not False:
+        trim_width = 0 if open_ports is True else open_ports * 2
+        for port in port_list:
+            trim = pg.compass(size=(distance + 6 * precision, port.width + trim_width))
+            trim_ref = pg.DeviceReference(trim)
+            trim_ref.connect("E", port, overlap=2 * precision)
+            Trim.add_polygon(trim_ref.get_polygons(), layer=layer)
+
+    c = Component()
+    ref = c << boolean(
+        A=D_bloated,
+        B=[D, Trim],
+        operation="A-B",
+        num_divisions=num_divisions,
+        max_points=max_points,
+        precision=precision,
+        layer=layer,
+        max_workers=max_workers,
+    )
+    c.absorb(ref)
+    if open_ports is not False and len(elements) == 1:
+        c.add_ports(port_list)
+    return c
 
 
 def test_outline() -> None:
@@ -0,0 +1,244 @@
+"""Run a DRC rule deck in python with klayout.
+
+`run_drc` takes the same rules as `write_drc_deck` (built with `rule_width`,
+`rule_space`, `rule_separation` and `rule_enclosing`), loads the layout once,
+builds each layer region once and returns the violation markers of each rule.
+
+Regions are hierarchical (klayout deep mode), so cells repeated in the layout
+are only checked once, and klayout runs each check on `threads` threads.
+
+Needs klayout `pip install klayout`
+"""
+import os
+import re
+from dataclasses import asdict, is_dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel, Extra
+
+from gdsfactory.export.to_klayout import get_layout
+from gdsfactory.types import ComponentOrPath, Layer
+
+_number = r"([-+]?[\d.]+(?:[eE][-+]?\d+)?)"
+_output = r"\.output\('([^']*)', '[^']*'\)$"
+
+rule_patterns = {
+    "width": re.compile(
+        rf"^(\w+)\.width\({_number}, angle_limit\({_number}\)\){_output}"
+    ),
+    "space": re.compile(
+        rf"^(\w+)\.space\({_number}, angle_limit\({_number}\)\){_output}"
+    ),
+    "separation": re.compile(rf"^(\w+)\.separation\((\w+), {_number}\){_output}"),
+    "enclosing": re.compile(
+        rf"^(\w+)\.enclosing\((\w+), angle_limit\({_number}\), {_number}\){_output}"
+    ),
+}
+
+
+class RuleViolations(BaseModel):
+    """Violation markers of a DRC rule.
+
+    Args:
+        name: rule error message (as in the DRC deck output).
+        count: number of violations.
+        area: total marker area (um2).
+        polygons: marker polygons (um).
+        locations: (count, 2) marker centers (um).
+    """
+
+    name: str
+    count: int
+    area: float
+    polygons: List[np.ndarray]
+    locations: np.ndarray
+
+    class Config:
+        extra = Extra.forbid
+        arbitrary_types_allowed = True
+
+
+def parse_rule(rule: str) -> Tuple[str, str, Tuple[str, ...], float, float]:
+    """Returns name, category, layers, value (um) and angle_limit of a rule.
+
+    Args:
+        rule: string from rule_width, rule_space, rule_separation or rule_enclosing.
+    """
+    rule = rule.strip()
+    for category, pattern in rule_patterns.items():
+        match = pattern.match(rule)
+        if not match:
+            continue
+        groups = match.groups()
+        if category in {"width", "space"}:
+            layer, value, angle_limit, name = groups
+            return name, category, (layer,), float(value), float(angle_limit)
+        elif category == "separation":
+            layer1, layer2, value, name = groups
+            return name, category, (layer1, layer2), float(value), 90.0
+        layer1, layer2, angle_limit, value, name = groups
+        return name, category, (layer1, layer2), float(value), float(angle_limit)
+
+    raise ValueError(f"rule {rule!r} not supported. Valid: {list(rule_patterns)}")
+
+
+def _get_check(category: str, value: int, angle_limit: float) -> Callable:
+    import klayout.db as pya
+
+    metrics = pya.Region.Euclidian
+    if category == "width":
+        return lambda a: a.width_check(value, False, metrics, angle_limit, None, None)
+    elif category == "space":
+        return lambda a: a.space_check(value, False, metrics, angle_limit, None, None)
+    elif category == "separation":
+        return lambda a, b: a.separation_check(b, value)
+    return lambda a, b: a.enclosing_check(
+        b, value, False, metrics, angle_limit, None, None
+    )
+
+
+def _get_violations(name: str, edge_pairs, dbu: float) -> RuleViolations:
+    polygons = []
+    locations = []
+    for edge_pair in edge_pairs.each():
+        polygon = edge_pair.polygon(0)
+        points = np.array([(p.x, p.y) for p in polygon.each_point_hull()], dtype=float)
+        polygons.append(points * dbu)
+        center = edge_pair.bbox().center()
+        locations.append((center.x * dbu, center.y * dbu))
+
+    return RuleViolations(
+        name=name,
+        count=len(polygons),
+        area=edge_pairs.polygons().area() * dbu**2,
+        polygons=polygons,
+        locations=np.array(locations, dtype=float).reshape(-1, 2),
+    )
+
+
+def run_drc(
+    component_or_gds: ComponentOrPath,
+    rules: List[str],
+    layer_map: Optional[Dict[str, Layer]] = None,
+    threads: Optional[int] = None,
+    deep: bool = True,
+    dbu: float = 1e3,
+) -> Dict[str, RuleViolations]:
+    """Returns violation markers for each rule (keyed by rule error message).
+
+    Args:
+        component_or_gds: Component or path to GDS.
+        rules: list of rules (same as write_drc_deck).
+        layer_map: layer definitions can be dict or dataclass. Defaults to LAYER.
+        threads: number of klayout threads for each check. Defaults to the number of CPUs.
+        deep: hierarchical checks (each cell checked once). False flattens the layout.
+        dbu: database units per um for the Component (1000 um/nm).
+
+    .. code::
+
+        import gdsfactory as gf
+        from gdsfactory.geometry.write_drc import rule_space, rule_width
+
+        rules = [rule_width(layer="WG", value=0.2), rule_space(layer="WG", value=0.2)]
+        violations = gf.geometry.run_drc(gf.components.straight_array(spacing=0.1), rules)
+        for name, result in violations.items():
+            print(name, result.count, result.locations)
+
+    """
+    import klayout.db as pya
+
+    from gdsfactory.tech import LAYER
+
+    layer_map = layer_map or LAYER
+    layer_map = asdict(layer_map) if is_dataclass(layer_map) else dict(layer_map)
+
+    parsed = [parse_rule(rule) for rule in rules]
+    layer_names = {layer for _, _, layers, _, _ in parsed for layer in layers}
+    for layer_name in layer_names:
+        if layer_name not in layer_map:
+            raise ValueError(f"layer {layer_name!r} not in {list(layer_map)}")
+
+    layout = get_layout(component_or_gds, dbu=dbu)
+    cell = layout.top_cell()
+    dss = pya.DeepShapeStore() if deep else None
+    if dss:
+        dss.threads = threads or os.cpu_count() or 1
+
+    regions = {}
+    for layer_name in sorted(layer_names):
+        layer_index = layout.layer(*layer_map[layer_name])
+        shapes = cell.begin_shapes_rec(layer_index)
+        regions[layer_name] = pya.Region(shapes, dss) if dss else pya.Region(shapes)
+
+    violations = {}
+    for name, category, layers, value, angle_limit in parsed:
+        check = _get_check(category, round(value / layout.dbu), angle_limit)
+        edge_pairs = check(*[regions[layer] for layer in layers])
+        violations[name] = _get_violations(name, edge_pairs, layout.dbu)
+    return violations
+
+
+def test_run_drc() -> None:
+    import gdsfactory as gf
+    from gdsfactory.geometry import check_exclusion, check_space, check_width
+    from gdsfactory.geometry.write_drc import (
+        rule_enclosing,
+        rule_separation,
+        rule_space,
+        rule_width,
+    )
+
+    c = gf.Component("test_run_drc")
+    c << gf.components.straight_array(n=4, spacing=0.1)
+    r1 = c << gf.components.rectangle(size=(0.5, 0.5), layer=(1, 0))
+    r2 = c << gf.components.rectangle(size=(0.5, 0.5), layer=(2, 0))
+    r1.movex(-10)
+    r2.xmin = r1.xmax + 0.1
+    r2.y = r1.y
+    layer_map = dict(WG=(1, 0), SLAB150=(2, 0))
+
+    rules = [
+        rule_width(layer="WG", value=0.2),
+        rule_width(layer="WG", value=0.6),
+        rule_space(layer="WG", value=0.2),
+        rule_separation(layer1="WG", layer2="SLAB150", value=0.15),
+        rule_enclosing(layer1="SLAB150", layer2="WG", value=0.1),
+    ]
+    for deep in [True, False]:
+        violations = run_drc(c, rules, layer_map=layer_map, deep=deep)
+        assert list(violations) == [parse_rule(rule)[0] for rule in rules]
+
+        width, width_large, space, separation, enclosing = violations.values()
+        assert width.count == check_width(c, layer=(1, 0), min_width=0.2) == 0
+        assert width_large.count == check_width(c, layer=(1, 0), min_width=0.6) > 0
+        assert np.isclose(
+            space.area * 1e6,
+            check_space(
+                c, layer=(1, 0), min_space=0.2, metrics="Euclidian", ignore_angle_deg=90
+            ),
+        )
+        assert space.count == 3
+        assert separation.count == 1
+        assert np.allclose(separation.locations[0], (r1.xmax + 0.05, r1.y))
+        assert np.isclose(
+            separation.area * 1e6,
+            check_exclusion(
+                c, min_space=0.15, metrics="Euclidian", ignore_angle_deg=90
+            ),
+        )
+        assert enclosing.count == 0
+
+
+if __name__ == "__main__":
+    import gdsfactory as gf
+    from gdsfactory.geometry.write_drc import rule_space, rule_width
+
+    c = gf.components.straight_array(n=4, spacing=0.1)
+    rules = [
+        rule_width(layer="WG", value=0.2),
+        rule_space(layer="WG", value=0.2),
+    ]
+    violations = run_drc(c, rules, layer_map=dict(WG=(1, 0)))
+    for name, violation in violations.items():
+        print(name, violation.count, violation.area)
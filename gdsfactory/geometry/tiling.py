@@ -0,0 +1,435 @@
+"""Tiled polygon operations shared by boolean, invert, offset, outline and union.
+
+Clipper operations get slow on large layers (the time grows faster than the
+number of vertices), so the bbox of the polygons is split into tiles and each
+tile is processed independently (in a process pool for large layers):
+
+- `get_tiles` splits the bbox in two along its longest side until each tile
+  overlaps less than `max_tile_points` vertices, so dense regions get smaller
+  tiles than empty ones. You can also pass a fixed `num_divisions` grid.
+- each tile crops the polygons that cross its edges and runs the clipper
+  operation (offsets use a margin around the tile and crop the result).
+- the pieces of the polygons cut by the tile seams are merged back together
+  when the merged polygon has less than `max_points` vertices (bigger
+  polygons would be fractured anyway).
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+import gdspy
+import numpy as np
+from gdspy import clipper
+from phidl.geometry import _crop_edge_polygons
+
+from gdsfactory.types import Int2
+
+Tile = Tuple[float, float, float, float]
+
+# vertices per tile (clipper boolean time grows faster than the vertices)
+max_tile_points_boolean = 10_000
+max_tile_points_offset = 25_000
+# tiles and vertices needed to use a process pool
+min_parallel_tiles = 4
+min_parallel_points = 500_000
+
+
+def _as_array(polygons: Sequence[np.ndarray]) -> np.ndarray:
+    """Returns object array of polygons (numpy stacks same size polygons)."""
+    array = np.empty(len(polygons), dtype=object)
+    array[:] = [np.asarray(polygon) for polygon in polygons]
+    return array
+
+
+def get_bboxes(polygons: Sequence[np.ndarray]) -> np.ndarray:
+    """Returns (N, 4) xmin, ymin, xmax, ymax of each polygon."""
+    if len(polygons) == 0:
+        return np.empty((0, 4))
+    points = np.concatenate(polygons)
+    starts = np.cumsum([0] + [len(p) for p in polygons[:-1]])
+    return np.concatenate(
+        [np.minimum.reduceat(points, starts), np.maximum.reduceat(points, starts)],
+        axis=1,
+    )
+
+
+def _overlaps(bboxes: np.ndarray, tile: Tile) -> np.ndarray:
+    left, bottom, right, top = tile
+    return (
+        (bboxes[:, 0] <= right)
+        & (bboxes[:, 2] >= left)
+        & (bboxes[:, 1] <= top)
+        & (bboxes[:, 3] >= bottom)
+    )
+
+
+def get_tiles(
+    bboxes: np.ndarray,
+    npoints: np.ndarray,
+    bbox: Tile,
+    num_divisions: Optional[Int2] = None,
+    max_tile_points: int = max_tile_points_boolean,
+    min_tile_size: float = 1.0,
+) -> List[Tile]:
+    """Returns tiles (left, bottom, right, top) that cover bbox.
+
+    Args:
+        bboxes: (N, 4) polygon bboxes.
+        npoints: number of vertices of each polygon.
+        bbox: to split.
+        num_divisions: fixed (columns, rows) grid. None splits by density.
+        max_tile_points: max number of vertices overlapping a tile.
+        min_tile_size: in um.
+    """
+    left, bottom, right, top = bbox
+    if num_divisions is not None:
+        columns, rows = (
+            (num_divisions, num_divisions)
+            if isinstance(num_divisions, int)
+            else num_divisions
+        )
+        xs = np.linspace(left, right, columns + 1)
+        ys = np.linspace(bottom, top, rows + 1)
+        return [
+            (xs[i], ys[j], xs[i + 1], ys[j + 1])
+            for i in range(columns)
+            for j in range(rows)
+        ]
+
+    tiles = []
+    stack = [(bbox, np.arange(len(bboxes)))]
+    while stack:
+        tile, indices = stack.pop()
+        left, bottom, right, top = tile
+        width, height = right - left, top - bottom
+        if (
+            npoints[indices].sum() <= max_tile_points
+            or max(width, height) / 2 < min_tile_size
+        ):
+            tiles.append(tile)
+            continue
+
+        if width >= height:
+            middle = (left + right) / 2
+            halves = [(left, bottom, middle, top), (middle, bottom, right, top)]
+        else:
+            middle = (bottom + top) / 2
+            halves = [(left, bottom, right, middle), (left, middle, right, top)]
+        for half in halves:
+            stack.append((half, indices[_overlaps(bboxes[indices], half)]))
+    return tiles
+
+
+def _boolean_tile(
+    polygons1: np.ndarray,
+    bboxes1: np.ndarray,
+    polygons2: np.ndarray,
+    bboxes2: np.ndarray,
+    operation: str,
+    precision: float,
+    tile: Tile,
+) -> List[np.ndarray]:
+    """Returns boolean of polygons1 and polygons2 cropped to tile."""
+    polygons1 = _crop_edge_polygons(polygons1, bboxes1, *tile, precision=precision)
+    polygons2 = _crop_edge_polygons(polygons2, bboxes2, *tile, precision=precision)
+    if not polygons2:
+        if operation == "and" or not polygons1:
+            return []
+        # merge overlapping polygons1 as the boolean does
+        return clipper.clip(polygons1, [], "or", 1 / precision)
+    return clipper.clip(polygons1, polygons2, operation, 1 / precision)
+
+
+def _offset_tile(
+    polygons: np.ndarray,
+    bboxes: np.ndarray,
+    distance: float,
+    join: str,
+    tolerance: float,
+    precision: float,
+    join_first: bool,
+    tile: Tile,
+    margin: float,
+) -> List[np.ndarray]:
+    """Returns offset polygons cropped to tile."""
+    polygons = _crop_edge_polygons(polygons, bboxes, *_expand(tile, margin), precision)
+    if not polygons:
+        return []
+    polygons = _as_array(
+        clipper.offset(
+            polygons, distance, join, tolerance, 1 / precision, int(join_first)
+        )
+    )
+    return _crop_edge_polygons(polygons, get_bboxes(polygons), *tile, precision)
+
+
+def _expand(tile: Tile, margin: float) -> Tile:
+    """Returns tile expanded by margin on each side."""
+    left, bottom, right, top = tile
+    return left - margin, bottom - margin, right + margin, top + margin
+
+
+def _merge_seams(
+    polygons: List[np.ndarray],
+    bboxes: np.ndarray,
+    precision: float,
+    max_points: int,
+) -> List[np.ndarray]:
+    """Returns polygons cut by tile seams merged into groups below max_points."""
+    if len(polygons) < 2:
+        return polygons
+
+    tol = 2 * precision
+    npoints = np.array([len(p) for p in polygons])
+    parents = np.arange(len(polygons))
+
+    def _find(i: int) -> int:
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    # sweep along x, keeping the polygons that reach the current xmin
+    active = np.empty(0, dtype=int)
+    for i in np.argsort(bboxes[:, 0], kind="stable"):
+        xmin, ymin, _, ymax = bboxes[i]
+        active = active[bboxes[active, 2] >= xmin - tol]
+        touching = active[
+            (bboxes[active, 1] <= ymax + tol) & (bboxes[active, 3] >= ymin - tol)
+        ]
+        for j in touching:
+            root_i, root_j = _find(i), _find(j)
+            if root_i != root_j:
+                parents[root_j] = root_i
+        active = np.append(active, i)
+
+    roots = np.array([_find(i) for i in range(len(polygons))])
+    group_points = np.bincount(roots, weights=npoints, minlength=len(polygons))
+
+    merged = []
+    for root in np.unique(roots):
+        group = [polygons[i] for i in np.flatnonzero(roots == root)]
+        if len(group) == 1 or group_points[root] > max_points:
+            merged += group
+        else:
+            merged += clipper.clip(group, [], "or", 1 / precision)
+    return merged
+
+
+def _run(function, tasks: List[tuple], max_workers: Optional[int]) -> List[list]:
+    """Returns function(*task) for each task, in a process pool if worth it."""
+    max_workers = max_workers or os.cpu_count() or 1
+    npoints = sum(len(p) for task in tasks for p in task[0])
+    if (
+        max_workers == 1
+        or len(tasks) < min_parallel_tiles
+        or npoints < min_parallel_points
+    ):
+        return [function(*task) for task in tasks]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(function, *task) for task in tasks]
+        return [future.result() for future in futures]
+
+
+def _finish(
+    tiles: List[Tile],
+    results: List[List[np.ndarray]],
+    bbox: Tile,
+    precision: float,
+    max_points: int,
+) -> List[np.ndarray]:
+    """Returns tile results with the polygons cut by the seams merged."""
+    polygons = [polygon for tile_polygons in results for polygon in tile_polygons]
+    if not polygons:
+        return []
+
+    # polygons touching a tile edge that is not on the border of bbox
+    tol = 2 * precision
+    tile_index = np.repeat(np.arange(len(tiles)), [len(r) for r in results])
+    edges = np.array(tiles)[tile_index]
+    bboxes = get_bboxes(polygons)
+    inside = np.abs(edges - np.array(bbox)) > tol
+    touches = np.abs(bboxes - edges) <= tol
+    seam = (inside & touches).any(axis=1)
+
+    seams = [polygon for polygon, s in zip(polygons, seam) if s]
+    polygons = [polygon for polygon, s in zip(polygons, seam) if not s]
+    polygons += _merge_seams(
+        seams, bboxes[seam], precision=precision, max_points=max_points
+    )
+    return gdspy.PolygonSet(polygons).fracture(max_points, precision).polygons
+
+
+def _split(
+    polygons: np.ndarray, bboxes: np.ndarray, tile: Tile
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns polygons and bboxes overlapping tile."""
+    mask = _overlaps(bboxes, tile)
+    return polygons[mask], bboxes[mask]
+
+
+def boolean_polygons(
+    polygons1: Sequence[np.ndarray],
+    polygons2: Sequence[np.ndarray],
+    operation: str,
+    precision: float = 1e-4,
+    max_points: int = 4000,
+    num_divisions: Optional[Int2] = None,
+    max_workers: Optional[int] = None,
+    max_tile_points: int = max_tile_points_boolean,
+) -> List[np.ndarray]:
+    """Returns boolean operation between two lists of polygons computed by tiles.
+
+    Args:
+        polygons1: list of (N, 2) arrays.
+        polygons2: list of (N, 2) arrays.
+        operation: {'not', 'and', 'or', 'xor'}.
+        precision: for rounding vertex coordinates.
+        max_points: maximum number of vertices of the resulting polygons.
+        num_divisions: fixed (columns, rows) tiles. None chooses tiles by density.
+        max_workers: processes for the tiles. None uses all CPUs.
+        max_tile_points: vertices per tile when num_divisions is None.
+    """
+    polygons1 = _as_array(polygons1)
+    polygons2 = _as_array(polygons2)
+    bboxes1 = get_bboxes(polygons1)
+    bboxes2 = get_bboxes(polygons2)
+    bboxes = np.concatenate([bboxes1, bboxes2])
+    if len(bboxes) == 0:
+        return []
+
+    bbox = (*bboxes[:, :2].min(axis=0), *bboxes[:, 2:].max(axis=0))
+    npoints = np.array([len(p) for p in polygons1] + [len(p) for p in polygons2])
+    tiles = get_tiles(
+        bboxes,
+        npoints,
+        bbox,
+        num_divisions=num_divisions,
+        max_tile_points=max_tile_points,
+    )
+    tasks = [
+        (
+            *_split(polygons1, bboxes1, tile),
+            *_split(polygons2, bboxes2, tile),
+            operation,
+            precision,
+            tile,
+        )
+        for tile in tiles
+    ]
+    results = _run(_boolean_tile, tasks, max_workers=max_workers)
+    return _finish(tiles, results, bbox, precision=precision, max_points=max_points)
+
+
+def offset_polygons(
+    polygons: Sequence[np.ndarray],
+    distance: float,
+    join: str = "miter",
+    tolerance: float = 2,
+    precision: float = 1e-4,
+    join_first: bool = True,
+    max_points: int = 4000,
+    num_divisions: Optional[Int2] = None,
+    max_workers: Optional[int] = None,
+    max_tile_points: int = max_tile_points_offset,
+) -> List[np.ndarray]:
+    """Returns offset polygons computed by tiles.
+
+    Args:
+        polygons: list of (N, 2) arrays.
+        distance: to offset polygons. Positive values expand, negative shrink.
+        join: {'miter', 'bevel', 'round'} type of join used to create polygon offset.
+        tolerance: for miter joints, maximal distance in multiples of offset
+            between new vertices and their original position. For round joints,
+            number of points per full circle.
+        precision: for rounding vertex coordinates.
+        join_first: join all paths before offsetting.
+        max_points: maximum number of vertices of the resulting polygons.
+        num_divisions: fixed (columns, rows) tiles. None chooses tiles by density.
+        max_workers: processes for the tiles. None uses all CPUs.
+        max_tile_points: vertices per tile when num_divisions is None.
+    """
+    polygons = _as_array(polygons)
+    bboxes = get_bboxes(polygons)
+    if len(bboxes) == 0:
+        return []
+
+    # offset polygons move at most margin (miter joins up to tolerance * distance)
+    margin = abs(distance) * (max(tolerance, 1) if join == "miter" else 1)
+    margin = margin * 1.01 + precision
+    bbox = (*bboxes[:, :2].min(axis=0), *bboxes[:, 2:].max(axis=0))
+    if distance > 0:
+        bbox = _expand(bbox, margin)
+    npoints = np.array([len(p) for p in polygons])
+    tiles = get_tiles(
+        bboxes,
+        npoints,
+        bbox,
+        num_divisions=num_divisions,
+        max_tile_points=max_tile_points,
+    )
+    tasks = [
+        (
+            *_split(polygons, bboxes, _expand(tile, margin)),
+            distance,
+            join,
+            tolerance,
+            precision,
+            join_first,
+            tile,
+            margin,
+        )
+        for tile in tiles
+    ]
+    results = _run(_offset_tile, tasks, max_workers=max_workers)
+    return _finish(tiles, results, bbox, precision=precision, max_points=max_points)
+
+
+def test_tiling() -> None:
+    import gdsfactory as gf
+
+    ring = gf.components.ring(radius=10, width=0.5).get_polygons()
+    ellipse = gf.components.ellipse(radii=(12, 4)).get_polygons()
+
+    def _area(polygons) -> float:
+        return gdspy.PolygonSet(polygons).area() if polygons else 0
+
+    for operation in ["not", "and", "or", "xor"]:
+        untiled = boolean_polygons(ring, ellipse, operation, num_divisions=(1, 1))
+        tiled = boolean_polygons(ring, ellipse, operation, num_divisions=(3, 3))
+        assert np.isclose(_area(untiled), _area(tiled)), operation
+        assert len(tiled) == len(untiled), operation
+
+    # overlapping polygons are merged in tiles without polygons2
+    rings = [p + (7 * i, 7 * j) for i in range(4) for j in range(4) for p in ring]
+    merged = gdspy.boolean(rings, [], "or", precision=1e-4)
+    for operation in ["not", "xor"]:
+        tiled = boolean_polygons(rings, [], operation, num_divisions=(3, 3))
+        assert np.isclose(_area(tiled), merged.area()), operation
+
+    union = boolean_polygons(ring, [], "or", num_divisions=(3, 3))
+    assert len(union) == 1
+    assert boolean_polygons(ring, [], "and") == []
+
+    for distance in [0.5, -0.1]:
+        untiled = offset_polygons(ring, distance, num_divisions=(1, 1))
+        tiled = offset_polygons(ring, distance, num_divisions=(4, 2))
+        assert np.isclose(_area(untiled), _area(tiled)), distance
+
+    bboxes = get_bboxes(ring + ellipse)
+    npoints = np.array([len(p) for p in ring + ellipse])
+    tiles = get_tiles(bboxes, npoints, (-12, -10, 12, 10), max_tile_points=100)
+    assert len(tiles) > 1
+    assert np.isclose(sum((t[2] - t[0]) * (t[3] - t[1]) for t in tiles), 24 * 20)
+
+
+if __name__ == "__main__":
+    import gdsfactory as gf
+
+    ring = gf.components.ring(radius=10, width=0.5).get_polygons()
+    ellipse = gf.components.ellipse(radii=(12, 4)).get_polygons()
+    polygons = boolean_polygons(ring, ellipse, "not", num_divisions=(3, 3))
+    c = gf.Component("tiling")
+    c.add_polygon(polygons)
+    c.show()
@@ -1,8 +1,9 @@
-import phidl.geometry as pg
+from typing import Optional, Union
 
 import gdsfactory as gf
 from gdsfactory.component import Component
-from gdsfactory.types import Layer
+from gdsfactory.geometry.tiling import boolean_polygons
+from gdsfactory.types import Int2, Layer
 
 
 @gf.cell
@@ -13,6 +14,8 @@ def union(
     join_first: bool = True,
     max_points: int = 4000,
     layer: Layer = (1, 0),
+    num_divisions: Optional[Union[int, Int2]] = None,
+    max_workers: Optional[int] = None,
 ) -> Component:
     """Creates an inverted version of the input shapes with an additional
     border around the edges.
@@ -28,25 +31,37 @@ def union(
         join_first: before offsetting to avoid unnecessary joins in adjacent polygon
         max_points: The maximum number of vertices within the resulting polygon.
         layer : Specific layer to put polygon geometry on.
+        num_divisions: number of regions (columns, rows) processed independently.
+            None chooses the regions from the polygon density.
+        max_workers: processes for the regions. None uses all CPUs, 1 runs serially.
 
     Returns
         Component containing the  union of the polygons
     """
     U = Component()
 
+    def _union(polygons):
+        return boolean_polygons(
+            polygons,
+            [],
+            operation="or",
+            precision=precision,
+            max_points=max_points,
+            num_divisions=num_divisions,
+            max_workers=max_workers,
+        )
+
     if by_layer:
         all_polygons = component.get_polygons(by_spec=True)
         for layer, polygons in all_polygons.items():
-            unioned_polygons = pg._union_polygons(
-                polygons, precision=precision, max_points=max_points
-            )
-            U.add_polygon(unioned_polygons, layer=layer)
+            unioned_polygons = _union(polygons)
+            if unioned_polygons:
+                U.add_polygon(unioned_polygons, layer=layer)
     else:
         all_polygons = component.get_polygons(by_spec=False)
-        unioned_polygons = pg._union_polygons(
-            all_polygons, precision=precision, max_points=max_points
-        )
-        U.add_polygon(unioned_polygons, layer=layer)
+        unioned_polygons = _union(all_polygons)
+        if unioned_polygons:
+            U.add_polygon(unioned_polygons, layer=layer)
     return U
 
 
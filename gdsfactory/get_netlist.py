@@ -15,8 +15,9 @@ Assumes two ports are connected when they have same width, x, y
 
 """
 
-from typing import Callable, Dict, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+import numpy as np
 import omegaconf
 
 from gdsfactory.component import Component, ComponentReference
@@ -61,11 +62,44 @@ def get_instance_name(
     return text
 
 
+def get_instance_names(
+    component: Component,
+    layer_label: Tuple[int, int] = LAYER.LABEL_INSTANCE,
+) -> List[str]:
+    """Returns the instance name of each reference (same as get_instance_name).
+
+    Reads all the labels once instead of once per reference.
+
+    Args:
+        component: with labels.
+        layer_label: ignores layer_label[1].
+    """
+    labels = [label for label in component.labels if label.layer == layer_label[0]]
+    texts = {}
+    if labels:
+        positions = snap_to_grid(np.array([label.position for label in labels]))
+        for label, (x, y) in zip(labels, positions.tolist()):
+            texts.setdefault((x, y), label.text)
+
+    references = component.references
+    if not references:
+        return []
+    centers = snap_to_grid(np.array([(ref.x, ref.y) for ref in references]))
+    names = []
+    for reference, (x, y) in zip(references, centers.tolist()):
+        name = texts.get((x, y))
+        names.append(
+            clean_name(f"{reference.parent.name}_{x}_{y}") if name is None else name
+        )
+    return names
+
+
 def get_netlist(
     component: Component,
     full_settings: bool = False,
     layer_label: Tuple[int, int] = LAYER.LABEL_INSTANCE,
     tolerance: int = 1,
+    instance_names: Optional[List[str]] = None,
 ) -> omegaconf.DictConfig:
     """From a component returns instances, connections and placements dict. It
     assumes that ports with same width, x, y are connected.
@@ -75,6 +109,7 @@ def get_netlist(
          full_settings: True returns all, false changed settings.
          layer_label: label to read instanceNames from (if any).
          tolerance: tolerance in nm to consider two ports connected.
+         instance_names: for each reference. Defaults to get_instance_names.
 
      Returns:
          instances: Dict of instance name and settings.
@@ -83,20 +118,58 @@ def get_netlist(
          port: Dict portName: ComponentName,port.
          name: name of component.
     """
+    return omegaconf.DictConfig(
+        get_netlist_dict(
+            component,
+            full_settings=full_settings,
+            layer_label=layer_label,
+            tolerance=tolerance,
+            instance_names=instance_names,
+        )
+    )
+
+
+def get_netlist_dict(
+    component: Component,
+    full_settings: bool = False,
+    layer_label: Tuple[int, int] = LAYER.LABEL_INSTANCE,
+    tolerance: int = 1,
+    instance_names: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Returns netlist as a plain dict (faster than get_netlist DictConfig).
+
+    Args:
+        component: to extract netlist.
+        full_settings: True returns all, false changed settings.
+        layer_label: label to read instanceNames from (if any).
+        tolerance: tolerance in nm to consider two ports connected.
+        instance_names: for each reference. Defaults to get_instance_names.
+
+    Returns:
+        instances: Dict of instance name and settings.
+        connections: Dict of Instance1Name,portName: Instace2Name,portName.
+        placements: Dict of instance names and placements (x, y, rotation).
+        port: Dict portName: ComponentName,port.
+        name: name of component.
+    """
     placements = {}
     instances = {}
     connections = {}
     top_ports = {}
 
-    for reference in component.references:
-        c = reference.parent
-        origin = reference.origin
-        x = float(snap_to_grid(origin[0]))
-        y = float(snap_to_grid(origin[1]))
-        reference_name = get_instance_name(
-            component, reference, layer_label=layer_label
-        )
+    references = component.references
+    if instance_names is None:
+        instance_names = get_instance_names(component, layer_label=layer_label)
+    origins = (
+        snap_to_grid(np.array([reference.origin for reference in references]))
+        if references
+        else []
+    )
 
+    for reference, reference_name, (x, y) in zip(
+        references, instance_names, np.asarray(origins).tolist()
+    ):
+        c = reference.parent
         instance = {}
 
         if c.info:
@@ -120,68 +193,64 @@ def get_netlist(
             mirror=reference.x_reflection,
         )
 
-    # store where ports are located
+    # port name -> (x, y, width)
     name2port = {}
 
-    # Initialize a dict of port locations to Instance1Name,PortNames
-    port_locations = {}
-
     # TOP level ports
     ports = component.get_ports(depth=0)
     top_ports_list = set()
     for port in ports:
         src = port.name
-        name2port[src] = port
+        name2port[src] = (*port.midpoint, port.width)
         top_ports_list.add(src)
 
     # lower level ports
-    for reference in component.references:
+    for reference, reference_name in zip(references, instance_names):
         for port in reference.ports.values():
-            reference_name = get_instance_name(
-                component, reference, layer_label=layer_label
-            )
             src = f"{reference_name},{port.name}"
-            name2port[src] = port
-
-    # build connectivity port_locations = Dict[Tuple(x,y,width), set of portNames]
-    for name, port in name2port.items():
-        xyw = tuple(
-            round(1000 * snap_to_grid(v, nm=tolerance))
-            for v in (port.x, port.y, port.width)
+            name2port[src] = (*port.midpoint, port.width)
+
+    if not name2port:
+        names = []
+        groups = []
+    else:
+        # group ports by location (x, y, width) snapped to the tolerance
+        names = list(name2port)
+        xyw = np.round(
+            1000 * snap_to_grid(np.array(list(name2port.values())), nm=tolerance)
+        )
+        _, first, inverse, counts = np.unique(
+            xyw, axis=0, return_index=True, return_inverse=True, return_counts=True
         )
-        if xyw not in port_locations:
-            port_locations[xyw] = set()
-        port_locations[xyw].add(name)
+        inverse = inverse.ravel()
+        members = np.split(np.argsort(inverse, kind="stable"), np.cumsum(counts)[:-1])
+        groups = [members[group] for group in np.argsort(first) if counts[group] > 1]
 
-    for xyw, names_set in port_locations.items():
-        if len(names_set) > 2:
-            x, y, w = (v / 1000 for v in xyw)
+    for group in groups:
+        if len(group) > 2:
+            x, y, w = (v / 1000 for v in xyw[group[0]])
             raise ValueError(
-                f"more than 2 connections at {x, y} {list(names_set)}, width  = {w} "
+                f"more than 2 connections at {x, y} "
+                f"{[names[i] for i in group]}, width  = {w} "
             )
-        if len(names_set) == 2:
-            names_list = list(names_set)
-            src = names_list[0]
-            dst = names_list[1]
-            if src in top_ports_list:
-                top_ports[src] = dst
-            elif dst in top_ports_list:
-                top_ports[dst] = src
-            else:
-                src_dest = sorted([src, dst])
-                connections[src_dest[0]] = src_dest[1]
+        src, dst = (names[i] for i in group)
+        if src in top_ports_list:
+            top_ports[src] = dst
+        elif dst in top_ports_list:
+            top_ports[dst] = src
+        else:
+            src_dest = sorted([src, dst])
+            connections[src_dest[0]] = src_dest[1]
 
     connections_sorted = {k: connections[k] for k in sorted(list(connections.keys()))}
     placements_sorted = {k: placements[k] for k in sorted(list(placements.keys()))}
     instances_sorted = {k: instances[k] for k in sorted(list(instances.keys()))}
-    return omegaconf.DictConfig(
-        dict(
-            connections=connections_sorted,
-            instances=instances_sorted,
-            placements=placements_sorted,
-            ports=top_ports,
-            name=component.name,
-        )
+    return dict(
+        connections=connections_sorted,
+        instances=instances_sorted,
+        placements=placements_sorted,
+        ports=top_ports,
+        name=component.name,
     )
 
 
@@ -193,6 +262,8 @@ def get_netlist_recursive(
 ) -> Dict[str, omegaconf.DictConfig]:
     """Returns recursive netlist for a component and subcomponents.
 
+    Extracts the netlist of each cell only once, even if it has many references.
+
     Args:
         component: to extract netlist.
         component_suffix: suffix to append to each component name.
@@ -208,24 +279,33 @@ def get_netlist_recursive(
         Dictionary of netlists, keyed by the name of each component.
     """
     all_netlists = {}
-
-    # only components with references (subcomponents) warrant a netlist
-    if component.references:
-        netlist = get_netlist_func(component, **kwargs)
-        all_netlists[f"{component.name}{component_suffix}"] = netlist
+    layer_label = kwargs.get("layer_label", LAYER.LABEL_INSTANCE)
+
+    def _add_netlists(component: Component) -> None:
+        # only components with references (subcomponents) warrant a netlist
+        name = f"{component.name}{component_suffix}"
+        if not component.references or name in all_netlists:
+            return
+
+        instance_names = get_instance_names(component, layer_label=layer_label)
+        netlist = (
+            get_netlist(component, instance_names=instance_names, **kwargs)
+            if get_netlist_func is get_netlist
+            else get_netlist_func(component, **kwargs)
+        )
+        all_netlists[name] = netlist
 
         # for each reference, expand the netlist
-        for ref in component.references:
+        for ref, inst_name in zip(component.references, instance_names):
             rcell = ref.parent
-            grandchildren = get_netlist_recursive(rcell)
-            all_netlists.update(grandchildren)
+            _add_netlists(rcell)
             if ref.ref_cell.references:
-                inst_name = get_instance_name(component, ref)
                 netlist["instances"][inst_name] = {
                     "component": f"{rcell.name}{component_suffix}",
                     "settings": rcell.settings.full,
                 }
 
+    _add_netlists(component)
     return all_netlists
 
 
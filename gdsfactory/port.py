@@ -31,7 +31,9 @@ from __future__ import annotations
 
 import csv
 import functools
+import threading
 import typing
+from collections.abc import Mapping
 from copy import deepcopy
 from functools import partial
 from typing import Any, Callable, Dict, List, Optional, Tuple
@@ -51,6 +53,9 @@ if typing.TYPE_CHECKING:
 
 Layer = Tuple[int, int]
 
+# guards the read and increment of Port._next_uid
+_uid_lock = threading.Lock()
+
 
 class PortNotOnGridError(ValueError):
     pass
@@ -101,7 +106,6 @@ class Port(PortPhidl):
         self.orientation = np.mod(orientation, 360) if orientation else orientation
         self.parent = parent
         self.info: Dict[str, Any] = {}
-        self.uid = Port._next_uid
         self.layer = layer
         self.port_type = port_type
         self.cross_section = cross_section
@@ -115,7 +119,9 @@ class Port(PortPhidl):
 
         if self.width < 0:
             raise ValueError("[PHIDL] Port width must be >=0")
-        Port._next_uid += 1
+        with _uid_lock:
+            self.uid = Port._next_uid
+            Port._next_uid += 1
 
     def to_dict(self) -> Dict[str, Any]:
         d = dict(
@@ -245,7 +251,6 @@ class Port(PortPhidl):
         new_port.info = deepcopy(self.info)
         if not new_uid:
             new_port.uid = self.uid
-            Port._next_uid -= 1
         return new_port
 
     def get_extended_midpoint(self, length: float = 1.0) -> ndarray:
@@ -363,6 +368,11 @@ def sort_ports_clockwise(ports: Dict[str, Port]) -> Dict[str, Port]:
              |   |
              8   7
     """
+    from gdsfactory.port_table import PortTable
+
+    if isinstance(ports, PortTable):
+        return ports.select(clockwise=True)
+
     port_list = list(ports.values())
     direction_ports: PortsMap = {x: [] for x in ["E", "N", "W", "S"]}
 
@@ -406,6 +416,11 @@ def sort_ports_counter_clockwise(ports: Dict[str, Port]) -> Dict[str, Port]:
              |   |
              7   8
     """
+    from gdsfactory.port_table import PortTable
+
+    if isinstance(ports, PortTable):
+        return ports.select(clockwise=False)
+
     port_list = list(ports.values())
     direction_ports: PortsMap = {x: [] for x in ["E", "N", "W", "S"]}
 
@@ -465,11 +480,24 @@ def select_ports(
     """
 
     from gdsfactory.component import Component, ComponentReference
+    from gdsfactory.port_table import PortTable
 
     # Make it accept Component or ComponentReference
     if isinstance(ports, (Component, ComponentReference)):
         ports = ports.ports
 
+    if isinstance(ports, PortTable):
+        return ports.select(
+            layer=layer,
+            prefix=prefix,
+            suffix=suffix,
+            orientation=orientation,
+            width=width,
+            layers_excluded=layers_excluded,
+            port_type=port_type,
+            clockwise=clockwise,
+        )
+
     if layer:
         ports = {p_name: p for p_name, p in ports.items() if p.layer == layer}
     if prefix:
@@ -531,7 +559,7 @@ def get_ports_facing(ports: List[Port], direction: str = "W") -> List[Port]:
     if direction not in valid_directions:
         raise PortOrientationError(f"{direction} must be in {valid_directions} ")
 
-    if isinstance(ports, dict):
+    if isinstance(ports, Mapping):
         ports = list(ports.values())
     elif isinstance(ports, (Component, ComponentReference)):
         ports = list(ports.ports.values())
@@ -0,0 +1,451 @@
+"""Array-backed port storage for Components with many ports.
+
+A `PortTable` behaves like the `Dict[str, Port]` in `Component.ports` but
+stores midpoints, orientations, widths, layers and port types in numpy arrays.
+`Port` objects are created only when you access them (`TablePort` reads and
+writes its row of the table), so a pad array with thousands of ports only uses
+a few tens of bytes per port, and `select_ports`, `get_ports_list` and port
+sorting run vectorized.
+
+Components switch to a PortTable when they reach `port_table_min_ports` ports
+(see config, disabled by default). A Port returned by `add_port` before the switch is detached
+from the component, so access ports through `component.ports` after that.
+"""
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from gdsfactory.port import Port
+
+Layer = Tuple[int, int]
+
+PORT_DTYPE = np.dtype(
+    [
+        ("orientation", "f8"),
+        ("width", "f8"),
+        ("shear_angle", "f8"),
+        ("uid", "i8"),
+        ("layer", "i4"),
+        ("port_type", "i4"),
+        ("cross_section", "i4"),
+    ]
+)
+
+
+def _float_or_none(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+
+class TablePort(Port):
+    """Port that reads and writes its attributes from a row of a PortTable.
+
+    `midpoint` is a view of the table, so in place updates
+    (`port.midpoint += (1, 0)`) also change the table. The port looks up its
+    row by key, so it stays valid when the table is compacted. Two TablePorts
+    are equal if they point to the same key of the same table.
+    """
+
+    __slots__ = ("_table", "_key")
+
+    def __init__(self, table: "PortTable", key) -> None:
+        self._table = table
+        self._key = key
+
+    @property
+    def _row(self) -> int:
+        return self._table._index[self._key]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, TablePort):
+            return self._table is other._table and self._key == other._key
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash((id(self._table), self._key))
+
+    def __reduce__(self):
+        return TablePort, (self._table, self._key)
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> Port:
+        """Returns a Port with a copy of this row, not of the whole table.
+
+        If the table is being copied too (deepcopy of the Component), returns
+        the TablePort of the same row in the new table.
+        """
+        table = memo.get(id(self._table))
+        if table is not None:
+            return TablePort(table, self._key)
+        return self.copy(new_uid=False)
+
+    @property
+    def name(self):
+        return self._table._names.get(self._row, self._table._keys[self._row])
+
+    @name.setter
+    def name(self, value) -> None:
+        if value == self._table._keys[self._row]:
+            self._table._names.pop(self._row, None)
+        else:
+            self._table._names[self._row] = value
+
+    @property
+    def midpoint(self) -> np.ndarray:
+        return self._table._xy[self._row]
+
+    @midpoint.setter
+    def midpoint(self, value) -> None:
+        self._table._xy[self._row] = value
+
+    @property
+    def orientation(self) -> Optional[float]:
+        return _float_or_none(self._table._data["orientation"][self._row])
+
+    @orientation.setter
+    def orientation(self, value: Optional[float]) -> None:
+        self._table._data["orientation"][self._row] = np.nan if value is None else value
+
+    @property
+    def width(self) -> float:
+        return float(self._table._data["width"][self._row])
+
+    @width.setter
+    def width(self, value: float) -> None:
+        self._table._data["width"][self._row] = value
+
+    @property
+    def shear_angle(self) -> Optional[float]:
+        return _float_or_none(self._table._data["shear_angle"][self._row])
+
+    @shear_angle.setter
+    def shear_angle(self, value: Optional[float]) -> None:
+        self._table._data["shear_angle"][self._row] = np.nan if value is None else value
+
+    @property
+    def uid(self) -> int:
+        return int(self._table._data["uid"][self._row])
+
+    @uid.setter
+    def uid(self, value: int) -> None:
+        self._table._data["uid"][self._row] = value
+
+    @property
+    def layer(self) -> Optional[Layer]:
+        return self._table._layers[self._table._data["layer"][self._row]]
+
+    @layer.setter
+    def layer(self, value: Optional[Layer]) -> None:
+        self._table._data["layer"][self._row] = self._table._get_layer_index(value)
+
+    @property
+    def port_type(self) -> str:
+        return self._table._port_types[self._table._data["port_type"][self._row]]
+
+    @port_type.setter
+    def port_type(self, value: str) -> None:
+        index = self._table._get_port_type_index(value)
+        self._table._data["port_type"][self._row] = index
+
+    @property
+    def cross_section(self):
+        index = self._table._data["cross_section"][self._row]
+        return self._table._cross_sections[index]
+
+    @cross_section.setter
+    def cross_section(self, value) -> None:
+        index = self._table._get_cross_section_index(value)
+        self._table._data["cross_section"][self._row] = index
+
+    @property
+    def parent(self):
+        return self._table._parents.get(self._row, self._table.parent)
+
+    @parent.setter
+    def parent(self, value) -> None:
+        if value is self._table.parent:
+            self._table._parents.pop(self._row, None)
+        else:
+            self._table._parents[self._row] = value
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        return self._table._info.setdefault(self._row, {})
+
+    @info.setter
+    def info(self, value: Dict[str, Any]) -> None:
+        self._table._info[self._row] = value
+
+
+class PortTable(MutableMapping):
+    """Dict of ports {port key: Port} stored in numpy arrays.
+
+    Args:
+        ports: initial ports (dict or list).
+        parent: Component that owns the ports.
+    """
+
+    def __init__(
+        self,
+        ports: Union[Dict[str, Port], Iterable[Port], None] = None,
+        parent=None,
+    ) -> None:
+        self.parent = parent
+        self._index: Dict[Any, int] = {}
+        self._n = 0
+        self._xy = np.empty((0, 2), dtype="float64")
+        self._data = np.empty(0, dtype=PORT_DTYPE)
+        self._alive = np.empty(0, dtype=bool)
+        self._keys: List[Any] = []
+        self._names: Dict[int, Any] = {}
+        self._layers: List[Optional[Layer]] = []
+        self._layer_index: Dict[Optional[Layer], int] = {}
+        self._port_types: List[str] = []
+        self._port_type_index: Dict[str, int] = {}
+        self._cross_sections: List[Any] = [None]
+        self._cross_section_index: Dict[int, int] = {id(None): 0}
+        self._parents: Dict[int, Any] = {}
+        self._info: Dict[int, Dict[str, Any]] = {}
+        self._views: Dict[Any, TablePort] = {}
+
+        if ports is not None:
+            items = ports.items() if hasattr(ports, "items") else ports
+            for item in items:
+                key, port = item if isinstance(item, tuple) else (item.name, item)
+                self[key] = port
+
+    def _get_layer_index(self, layer: Optional[Layer]) -> int:
+        layer = tuple(layer) if layer is not None else None
+        if layer not in self._layer_index:
+            self._layer_index[layer] = len(self._layers)
+            self._layers.append(layer)
+        return self._layer_index[layer]
+
+    def _get_port_type_index(self, port_type: str) -> int:
+        if port_type not in self._port_type_index:
+            self._port_type_index[port_type] = len(self._port_types)
+            self._port_types.append(port_type)
+        return self._port_type_index[port_type]
+
+    def _get_cross_section_index(self, cross_section) -> int:
+        if id(cross_section) not in self._cross_section_index:
+            self._cross_section_index[id(cross_section)] = len(self._cross_sections)
+            self._cross_sections.append(cross_section)
+        return self._cross_section_index[id(cross_section)]
+
+    def _add_row(self, key) -> int:
+        if self._n == len(self._data):
+            capacity = max(16, 2 * self._n)
+            xy = np.empty((capacity, 2), dtype="float64")
+            xy[: self._n] = self._xy[: self._n]
+            data = np.empty(capacity, dtype=PORT_DTYPE)
+            data[: self._n] = self._data[: self._n]
+            alive = np.zeros(capacity, dtype=bool)
+            alive[: self._n] = self._alive[: self._n]
+            self._xy, self._data, self._alive = xy, data, alive
+        self._keys.append(key)
+        self._alive[self._n] = True
+        self._index[key] = self._n
+        self._n += 1
+        return self._n - 1
+
+    def __setitem__(self, key, port: Port) -> None:
+        # replacing a port keeps its row, so the table stays in insertion order
+        row = self._index[key] if key in self._index else self._add_row(key)
+        name = port.name
+        self._xy[row] = port.midpoint
+        self._data[row] = (
+            np.nan if port.orientation is None else port.orientation,
+            port.width,
+            np.nan if port.shear_angle is None else port.shear_angle,
+            port.uid,
+            self._get_layer_index(port.layer),
+            self._get_port_type_index(port.port_type),
+            self._get_cross_section_index(port.cross_section),
+        )
+        self._names.pop(row, None)
+        if name != key:
+            self._names[row] = name
+        self._parents.pop(row, None)
+        if port.parent is not self.parent:
+            self._parents[row] = port.parent
+        self._info.pop(row, None)
+        if port.info:
+            self._info[row] = port.info
+
+    def _get_port(self, key) -> TablePort:
+        port = self._views.get(key)
+        if port is None:
+            port = self._views[key] = TablePort(self, key)
+        return port
+
+    def get_port(self, key, cache: bool = True) -> TablePort:
+        """Returns port.
+
+        Args:
+            key: port key.
+            cache: keeps the Port object to return the same object next time.
+                False saves memory when building components with many ports.
+        """
+        if key not in self._index:
+            raise KeyError(key)
+        return self._get_port(key) if cache else TablePort(self, key)
+
+    def __getitem__(self, key) -> TablePort:
+        if key not in self._index:
+            raise KeyError(key)
+        return self._get_port(key)
+
+    def __delitem__(self, key) -> None:
+        row = self._index[key]
+        view = self._views.pop(key, None)
+        if view is not None:
+            # ports popped from the table keep their data in a table of their own
+            table = PortTable(parent=self.parent)
+            table[key] = view
+            view._table = table
+
+        del self._index[key]
+        self._alive[row] = False
+        self._names.pop(row, None)
+        self._parents.pop(row, None)
+        self._info.pop(row, None)
+        if 2 * len(self._index) < self._n:
+            self._compact()
+
+    def _compact(self) -> None:
+        """Removes the rows of deleted ports from the arrays."""
+        rows = self._rows()
+        new_rows = {row: i for i, row in enumerate(rows.tolist())}
+        self._xy = self._xy[rows]
+        self._data = self._data[rows]
+        self._alive = np.ones(len(rows), dtype=bool)
+        self._keys = [self._keys[row] for row in new_rows]
+        self._index = {key: i for i, key in enumerate(self._keys)}
+        self._names = {new_rows[row]: name for row, name in self._names.items()}
+        self._parents = {new_rows[row]: p for row, p in self._parents.items()}
+        self._info = {new_rows[row]: info for row, info in self._info.items()}
+        self._n = len(rows)
+
+    def __iter__(self) -> Iterator:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key) -> bool:
+        return key in self._index
+
+    def __repr__(self) -> str:
+        return f"PortTable({list(self._index.keys())})"
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state["_views"] = {}
+        state["_alive"] = self._alive[: self._n].copy()
+        state["_xy"] = self._xy[: self._n].copy()
+        state["_data"] = self._data[: self._n].copy()
+        state["_cross_section_index"] = None
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._cross_section_index = {
+            id(cross_section): i for i, cross_section in enumerate(self._cross_sections)
+        }
+
+    def copy(self) -> Dict[str, Port]:
+        return dict(self.items())
+
+    @property
+    def nbytes(self) -> int:
+        """Returns the memory used by the port arrays."""
+        return self._xy.nbytes + self._data.nbytes
+
+    def _rows(self) -> np.ndarray:
+        return np.flatnonzero(self._alive[: self._n])
+
+    def sort(self, rows: np.ndarray, clockwise: bool = True) -> np.ndarray:
+        """Returns rows sorted clockwise (or counter-clockwise).
+
+        Same order as `sort_ports_clockwise` and `sort_ports_counter_clockwise`.
+        """
+        orientation = self._data["orientation"][rows]
+        angle = np.where(np.isnan(orientation), 0, orientation) % 360
+        x = self._xy[rows, 0]
+        y = self._xy[rows, 1]
+
+        east = (angle <= 45) | (angle >= 315)
+        north = ~east & (angle <= 135)
+        west = ~east & ~north & (angle <= 225)
+        south = ~east & ~north & ~west
+
+        if clockwise:
+            group = np.select([west, north, east, south], [0, 1, 2, 3])
+            value = np.select([west, north, east, south], [y, x, -y, -x])
+        else:
+            group = np.select([east, north, west, south], [0, 1, 2, 3])
+            value = np.select([east, north, west, south], [y, -x, -y, x])
+        return rows[np.lexsort((value, group))]
+
+    def select(
+        self,
+        layer: Optional[Layer] = None,
+        prefix: Optional[str] = None,
+        suffix: Optional[str] = None,
+        orientation: Optional[int] = None,
+        width: Optional[float] = None,
+        layers_excluded: Optional[Tuple[Layer, ...]] = None,
+        port_type: Optional[str] = None,
+        clockwise: bool = True,
+    ) -> Dict[str, Port]:
+        """Returns a dict of ports, vectorized version of `select_ports`."""
+        rows = self._rows()
+        keys = [self._keys[row] for row in rows.tolist()] if prefix or suffix else []
+        data = self._data
+        mask = np.ones(len(rows), dtype=bool)
+
+        if layer:
+            index = self._layer_index.get(tuple(layer), -1)
+            mask &= data["layer"][rows] == index
+        if prefix:
+            mask &= np.array([str(key).startswith(prefix) for key in keys], dtype=bool)
+        if suffix:
+            mask &= np.array([str(key).endswith(suffix) for key in keys], dtype=bool)
+        if orientation is not None:
+            mask &= data["orientation"][rows] == orientation
+        if layers_excluded:
+            indices = [
+                self._layer_index.get(tuple(layer), -1) for layer in layers_excluded
+            ]
+            mask &= ~np.isin(data["layer"][rows], indices)
+        if width:
+            mask &= data["width"][rows] == width
+        if port_type:
+            index = self._port_type_index.get(port_type, -1)
+            mask &= data["port_type"][rows] == index
+
+        rows = self.sort(rows[mask], clockwise=clockwise)
+        ports = [self._get_port(self._keys[row]) for row in rows.tolist()]
+        return {port.name: port for port in ports}
+
+
+def test_port_table() -> None:
+    import gdsfactory as gf
+
+    c = gf.components.pad_array(columns=4, rows=3)
+    ports = PortTable(c.ports, parent=c)
+
+    assert list(ports.keys()) == list(c.ports.keys())
+    assert ports.select(clockwise=True).keys() == c.get_ports_dict().keys()
+    assert (
+        ports.select(clockwise=False).keys() == c.get_ports_dict(clockwise=False).keys()
+    )
+
+    port = ports["e11"]
+    assert port.layer == c.ports["e11"].layer
+    port.move((1, 0))
+    assert ports["e11"].x == c.ports["e11"].x + 1
+
+
+if __name__ == "__main__":
+    test_port_table()
@@ -46,17 +46,20 @@ routes:
             radius: 10
 
 """
+import copy
 import importlib
 import io
+import json
 import pathlib
 import warnings
-from typing import IO, Any, Callable, Dict, List, Optional, Union
+from typing import IO, Any, Callable, Dict, Hashable, List, Optional, Tuple, Union
 
 import numpy as np
+import yaml
 from omegaconf import OmegaConf
 
 from gdsfactory.add_pins import add_instance_label
-from gdsfactory.cell import cell
+from gdsfactory.cell import CACHE, cell
 from gdsfactory.component import Component, ComponentReference
 from gdsfactory.routing.factories import routing_strategy as routing_strategy_factories
 from gdsfactory.types import Route
@@ -121,6 +124,154 @@ valid_route_keys = [
 # Recognized keys within a YAML route definition
 
 
+# parsed YAML of each top level entry (keyed by its text)
+YAML_CACHE: Dict[str, Dict[str, Any]] = {}
+YAML_CACHE_SIZE = 100_000
+
+# route bundles of the last build of each named YAML circuit (keyed by circuit name)
+# a changed YAML reuses the bundles that route the same ports with the same settings
+# cleared with the cell CACHE (`gf.clear_cache`)
+ROUTES_CACHE: Dict[str, Dict[Hashable, Any]] = {}
+
+
+def _split_yaml(yaml_text: str) -> Optional[List[str]]:
+    """Returns YAML text split into top level blocks and their entries.
+
+    Each chunk holds a top level key and one of its entries, so it can be parsed
+    on its own. Returns None for YAML that can not be split safely, or with a
+    repeated top level key (so the YAML loader reports it).
+    """
+    lines = yaml_text.splitlines()
+    if any(line.startswith(("---", "...", "%", "\t")) for line in lines):
+        return None
+
+    chunks = []
+    keys = set()
+    header = None
+    indent = None
+    for line in lines:
+        stripped = line.lstrip(" ")
+        if not stripped or stripped.startswith("#"):
+            if chunks:
+                chunks[-1].append(line)
+            continue
+
+        line_indent = len(line) - len(stripped)
+        if line_indent == 0:
+            key = line.split(":", 1)[0].strip()
+            if key in keys:
+                return None
+            keys.add(key)
+            header = line if line.rstrip().endswith(":") else None
+            indent = None
+            chunks.append([line])
+        elif not chunks:
+            return None
+        elif header is not None and indent is None and stripped[0] not in "-[{":
+            indent = line_indent
+            chunks[-1].append(line)
+        elif header is not None and line_indent == indent:
+            chunks.append([header, line])
+        else:
+            chunks[-1].append(line)
+    return ["\n".join(chunk) + "\n" for chunk in chunks]
+
+
+def _load_yaml(yaml_text: str) -> Dict[str, Any]:
+    """Returns YAML text as a dict, parsing only the entries not seen before."""
+    from omegaconf._utils import get_yaml_loader
+
+    chunks = _split_yaml(yaml_text)
+    if chunks is None:
+        return OmegaConf.to_container(OmegaConf.load(io.StringIO(yaml_text)))
+
+    if len(YAML_CACHE) > YAML_CACHE_SIZE:
+        YAML_CACHE.clear()
+
+    conf: Dict[str, Any] = {}
+    for chunk in chunks:
+        if chunk not in YAML_CACHE:
+            try:
+                YAML_CACHE[chunk] = yaml.load(chunk, Loader=get_yaml_loader())
+            except yaml.YAMLError:
+                YAML_CACHE[chunk] = None
+        parsed = YAML_CACHE[chunk]
+        if not isinstance(parsed, dict) or len(parsed) != 1:
+            return OmegaConf.to_container(OmegaConf.load(io.StringIO(yaml_text)))
+
+        [(key, value)] = parsed.items()
+        if key not in conf:
+            conf[key] = value
+        elif isinstance(conf[key], dict) and isinstance(value, dict):
+            if set(conf[key]) & set(value):
+                # let the loader report duplicated keys
+                return OmegaConf.to_container(OmegaConf.load(io.StringIO(yaml_text)))
+            conf[key] = {**conf[key], **value}
+        else:
+            return OmegaConf.to_container(OmegaConf.load(io.StringIO(yaml_text)))
+    return copy.deepcopy(conf)
+
+
+def _get_port_key(port) -> Tuple:
+    x, y = np.round(port.midpoint, 6)
+    return (
+        port.name,
+        float(x),
+        float(y),
+        port.orientation,
+        port.width,
+        tuple(port.layer) if port.layer else None,
+        port.port_type,
+        getattr(port.cross_section, "name", None),
+    )
+
+
+def _get_routes_key(
+    routing_strategy_name: str,
+    routing_function: Callable,
+    settings: Dict[str, Any],
+    ports1,
+    ports2,
+) -> Hashable:
+    """Returns key for a route bundle that only depends on its inputs."""
+    from gdsfactory.pdk import get_active_pdk
+
+    return (
+        routing_strategy_name,
+        routing_function,
+        get_active_pdk().name,
+        json.dumps(settings, sort_keys=True, default=str),
+        tuple(_get_port_key(port) for port in ports1),
+        tuple(_get_port_key(port) for port in ports2),
+    )
+
+
+def _copy_routes(routes: List[Route]) -> Optional[List[Route]]:
+    """Returns routes with new references (None if any component changed)."""
+    for route in routes:
+        for ref in route.references:
+            if CACHE.get(ref.parent.name) is not ref.parent:
+                return None
+    return [
+        Route(
+            references=[
+                ComponentReference(
+                    ref.parent,
+                    origin=ref.origin,
+                    rotation=ref.rotation,
+                    magnification=ref.magnification,
+                    x_reflection=ref.x_reflection,
+                )
+                for ref in route.references
+            ],
+            labels=route.labels,
+            ports=route.ports,
+            length=route.length,
+        )
+        for route in routes
+    ]
+
+
 def _get_anchor_point_from_name(
     ref: ComponentReference, anchor_name: str
 ) -> Optional[np.ndarray]:
@@ -467,6 +618,7 @@ def from_yaml(
     label_instance_function: Callable = add_instance_label,
     name: Optional[str] = None,
     prefix: Optional[str] = None,
+    max_workers: Optional[int] = 1,
     **kwargs,
 ) -> Component:
     """Returns a Component defined in YAML string or file.
@@ -478,6 +630,8 @@ def from_yaml(
         label_instance_function: to label each instance.
         name: Optional name.
         prefix: name prefix.
+        max_workers: number of processes that build the distinct instances
+            before placing them. None uses all CPUs, 1 builds them serially.
         kwargs: function settings. Overwrite settings from YAML.
 
     .. code::
@@ -548,18 +702,19 @@ def from_yaml(
 
     """
 
-    yaml_str = (
-        io.StringIO(yaml_str)
-        if isinstance(yaml_str, str) and "\n" in yaml_str
-        else yaml_str
-    )
+    if isinstance(yaml_str, str) and "\n" in yaml_str:
+        yaml_text = yaml_str
+    elif isinstance(yaml_str, (str, pathlib.Path)):
+        yaml_text = pathlib.Path(yaml_str).read_text()
+    else:
+        yaml_text = yaml_str.read()
 
-    conf = OmegaConf.load(yaml_str)  # nicer loader than conf = yaml.safe_load(yaml_str)
+    conf = _load_yaml(yaml_text)
     for key in conf.keys():
         if key not in valid_top_level_keys:
             raise ValueError(f"{key!r} not in {list(valid_top_level_keys)}")
 
-    settings = conf.get("settings", {})
+    settings = conf.get("settings") or {}
 
     for key, value in kwargs.items():
         if key not in settings:
@@ -567,8 +722,27 @@ def from_yaml(
         else:
             conf["settings"][key] = value
 
+    if "${" in yaml_text or any("${" in str(value) for value in kwargs.values()):
+        conf = OmegaConf.to_container(OmegaConf.create(conf), resolve=True)
+
+    if max_workers != 1:
+        from gdsfactory.build_parallel import build_components_parallel
+
+        _set_active_pdk(conf.get("pdk"))
+        build_components_parallel(
+            [
+                {
+                    "component": instance_conf["component"],
+                    "settings": instance_conf.get("settings", {}),
+                }
+                for instance_conf in conf.get("instances", {}).values()
+            ],
+            max_workers=max_workers,
+            progress=False,
+        )
+
     return _from_yaml(
-        conf=OmegaConf.to_container(conf, resolve=True),
+        conf=conf,
         routing_strategy=routing_strategy,
         label_instance_function=label_instance_function,
         prefix=prefix or conf.get("name", "Unnamed"),
@@ -576,6 +750,21 @@ def from_yaml(
     )
 
 
+def _set_active_pdk(pdk: Optional[str]) -> None:
+    """Activates the generic PDK or the PDK of a module (`from module import PDK`)."""
+    from gdsfactory.pdk import GENERIC, set_active_pdk
+
+    if pdk and pdk == "generic":
+        set_active_pdk(GENERIC)
+
+    elif pdk:
+        module = importlib.import_module(pdk)
+        pdk = getattr(module, "PDK")
+        if pdk is None:
+            raise ValueError(f"'from {pdk} import PDK' failed")
+        set_active_pdk(pdk)
+
+
 @cell
 def _from_yaml(
     conf,
@@ -589,30 +778,23 @@ def _from_yaml(
         routing_strategy: for each route.
         label_instance_function: to label each instance.
     """
-    from gdsfactory.pdk import GENERIC, get_active_pdk, set_active_pdk
+    from gdsfactory.pdk import get_active_pdk
 
     c = Component()
     instances = {}
     routes = {}
+    circuit_name = conf.get("name")
+    previous_routes = ROUTES_CACHE.get(circuit_name, {}) if circuit_name else {}
+    routes_cache = {}
 
     placements_conf = conf.get("placements")
     routes_conf = conf.get("routes")
     ports_conf = conf.get("ports")
     connections_conf = conf.get("connections")
     instances_dict = conf["instances"]
-    pdk = conf.get("pdk")
     c.info = conf.get("info", {})
 
-    if pdk and pdk == "generic":
-        set_active_pdk(GENERIC)
-
-    elif pdk:
-        module = importlib.import_module(pdk)
-        pdk = getattr(module, "PDK")
-        if pdk is None:
-            raise ValueError(f"'from {pdk} import PDK' failed")
-        set_active_pdk(pdk)
-
+    _set_active_pdk(conf.get("pdk"))
     pdk = get_active_pdk()
 
     for instance_name in instances_dict:
@@ -784,11 +966,21 @@ def _from_yaml(
                     route_names.append(route_name)
 
             routing_function = routing_strategy[routing_strategy_name]
-            route_or_route_list = routing_function(
-                ports1=ports1,
-                ports2=ports2,
-                **settings,
+            routes_key = _get_routes_key(
+                routing_strategy_name, routing_function, settings, ports1, ports2
             )
+            previous = previous_routes.get(routes_key)
+            route_or_route_list = (
+                _copy_routes(previous) if isinstance(previous, list) else None
+            )
+            if route_or_route_list is None:
+                route_or_route_list = routing_function(
+                    ports1=ports1,
+                    ports2=ports2,
+                    **settings,
+                )
+            if isinstance(route_or_route_list, list):
+                routes_cache[routes_key] = route_or_route_list
 
             # FIXME, be more consistent
             if isinstance(route_or_route_list, list):
@@ -823,6 +1015,8 @@ def _from_yaml(
                 c.add_port(port_name, port=instance.ports[instance_port_name])
             else:
                 c.add_port(**instance_comma_port)
+    if circuit_name:
+        ROUTES_CACHE[circuit_name] = routes_cache
     c.routes = routes
     c.instances = instances
     return c
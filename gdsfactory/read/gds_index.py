@@ -0,0 +1,208 @@
+"""Index GDS cell offsets to read only some cells from large GDS libraries.
+
+`get_gds_index` scans the GDS records once and stores for each cell its byte
+offset, size and the cells it references. The index is cached in memory and
+on disk (keyed by file path, size and modification time), so reading another
+cell from the same file does not scan it again.
+
+`read_gds_cells` returns a valid GDS stream with only one cell and its
+dependencies, which you can pass to `gdspy.GdsLibrary.read_gds`.
+"""
+import hashlib
+import io
+import json
+import mmap
+import pathlib
+import struct
+from typing import Any, Dict, List, Optional
+
+from gdsfactory.config import CONFIG, logger
+from gdsfactory.types import PathType
+
+INDEX_VERSION = 1
+
+# record types (record type << 8 | data type)
+BGNSTR = 0x0502
+STRNAME = 0x0606
+ENDSTR = 0x0700
+SNAME = 0x1206
+ENDLIB = 0x0400
+ENDLIB_RECORD = struct.pack(">2H", 4, ENDLIB)
+
+_INDEX_CACHE: Dict[str, Dict[str, Any]] = {}
+dirpath_index = pathlib.Path(CONFIG["cache_directory"]) / "gds_index"
+
+
+def _decode(data: bytes) -> str:
+    return data.rstrip(b"\0").decode("ascii", errors="replace")
+
+
+def scan_gds(gdspath: PathType) -> Dict[str, Any]:
+    """Returns GDS index without caching.
+
+    Returns:
+        header: size of the library header (bytes before the first cell).
+        cells: dict cell name -> [offset, size, list of referenced cell names].
+    """
+    gdspath = pathlib.Path(gdspath)
+    cells: Dict[str, List[Any]] = {}
+    header_size = None
+
+    with open(gdspath, "rb") as f, mmap.mmap(
+        f.fileno(), 0, access=mmap.ACCESS_READ
+    ) as data:
+        size = len(data)
+        offset = 0
+        cell_offset = 0
+        name = None
+        dependencies: List[str] = []
+
+        while offset + 4 <= size:
+            length, record = struct.unpack_from(">2H", data, offset)
+            if length < 4:
+                break
+            if record == BGNSTR:
+                if header_size is None:
+                    header_size = offset
+                cell_offset = offset
+                dependencies = []
+            elif record == STRNAME:
+                name = _decode(data[offset + 4 : offset + length])
+            elif record == SNAME:
+                dependencies.append(_decode(data[offset + 4 : offset + length]))
+            elif record == ENDSTR:
+                cells[name] = [
+                    cell_offset,
+                    offset + length - cell_offset,
+                    sorted(set(dependencies)),
+                ]
+            elif record == ENDLIB:
+                break
+            offset += length
+
+    return dict(
+        version=INDEX_VERSION,
+        header=header_size or 0,
+        cells=cells,
+    )
+
+
+def _get_key(gdspath: pathlib.Path) -> str:
+    stat = gdspath.stat()
+    key = f"{gdspath.resolve()}_{stat.st_size}_{stat.st_mtime_ns}_{INDEX_VERSION}"
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def get_gds_index(gdspath: PathType, cache: bool = True) -> Dict[str, Any]:
+    """Returns GDS index (cell offsets and dependencies).
+
+    Args:
+        gdspath: GDS file path.
+        cache: reuse the index from memory or disk if the file did not change.
+    """
+    gdspath = pathlib.Path(gdspath)
+    key = _get_key(gdspath)
+    filepath = dirpath_index / f"{key}.json"
+
+    if cache and key in _INDEX_CACHE:
+        return _INDEX_CACHE[key]
+
+    if cache and filepath.exists():
+        try:
+            index = json.loads(filepath.read_text())
+            _INDEX_CACHE[key] = index
+            return index
+        except ValueError:
+            logger.warning(f"Ignoring corrupted GDS index {str(filepath)!r}")
+
+    index = scan_gds(gdspath)
+    _INDEX_CACHE[key] = index
+    if cache:
+        dirpath_index.mkdir(parents=True, exist_ok=True)
+        filepath.write_text(json.dumps(index))
+    return index
+
+
+def get_top_cells(index: Dict[str, Any]) -> List[str]:
+    """Returns the names of the cells not referenced by other cells."""
+    cells = index["cells"]
+    referenced = {dep for cell in cells.values() for dep in cell[2]}
+    return [name for name in cells if name not in referenced]
+
+
+def get_dependencies(index: Dict[str, Any], cellname: str) -> List[str]:
+    """Returns cellname and all the cells it references (recursively)."""
+    cells = index["cells"]
+    names = [cellname]
+    visited = {cellname}
+    for name in names:
+        for dep in cells[name][2]:
+            if dep not in visited and dep in cells:
+                visited.add(dep)
+                names.append(dep)
+    return names
+
+
+def read_gds_cells(
+    gdspath: PathType, cellname: Optional[str] = None, cache: bool = True
+) -> io.BytesIO:
+    """Returns GDS stream with only cellname and its dependencies.
+
+    Args:
+        gdspath: GDS file path.
+        cellname: cell to read. None reads the top cell (if there is only one).
+        cache: reuse the cached index.
+    """
+    gdspath = pathlib.Path(gdspath)
+    index = get_gds_index(gdspath, cache=cache)
+    cells = index["cells"]
+
+    if cellname is None:
+        top_cells = get_top_cells(index)
+        if len(top_cells) != 1:
+            raise ValueError(
+                f"There are multiple top-level cells in {gdspath!r}, "
+                f"you must specify `cellname` to select of one of them among {top_cells}"
+            )
+        cellname = top_cells[0]
+    elif cellname not in cells:
+        raise ValueError(
+            f"cell {cellname!r} is not in file {gdspath} with cells {get_top_cells(index)}"
+        )
+
+    stream = io.BytesIO()
+    with open(gdspath, "rb") as f:
+        stream.write(f.read(index["header"]))
+        for name in reversed(get_dependencies(index, cellname)):
+            offset, size, _ = cells[name]
+            f.seek(offset)
+            stream.write(f.read(size))
+    stream.write(ENDLIB_RECORD)
+    stream.seek(0)
+    return stream
+
+
+def test_read_gds_cells(tmp_path) -> None:
+    import gdspy
+
+    import gdsfactory as gf
+
+    c = gf.Component("lazy_top")
+    c << gf.components.mzi()
+    c << gf.components.straight(length=33)
+    gdspath = c.write_gds(tmp_path / "lazy.gds")
+
+    index = get_gds_index(gdspath)
+    assert get_top_cells(index) == [c.name]
+    assert len(index["cells"]) == len(c.get_dependencies(recursive=True)) + 1
+
+    mzi = gf.components.mzi()
+    lib = gdspy.GdsLibrary().read_gds(read_gds_cells(gdspath, cellname=mzi.name))
+    names = {cell.name for cell in mzi.get_dependencies(recursive=True)}
+    assert set(lib.cells.keys()) == names | {mzi.name}
+
+
+if __name__ == "__main__":
+    gdspath = CONFIG["gdsdir"] / "mzi2x2.gds"
+    index = get_gds_index(gdspath)
+    print(get_top_cells(index))
@@ -11,43 +11,47 @@ from gdsfactory.component import Component
 from gdsfactory.component_reference import ComponentReference
 from gdsfactory.config import CONFIG, logger
 from gdsfactory.name import get_name_short
+from gdsfactory.read.gds_index import read_gds_cells
 from gdsfactory.snap import snap_to_grid
 
 
-@cell
-def import_gds(
-    gdspath: Union[str, Path],
+def read_metadata_yaml(component: Component, metadata_filepath: Path) -> None:
+    """Loads settings and ports from a YAML metadata file into component."""
+    logger.info(f"Read YAML metadata from {metadata_filepath}")
+    metadata = OmegaConf.load(metadata_filepath)
+
+    if "settings" in metadata:
+        component.settings = OmegaConf.to_container(metadata.settings)
+
+    if "ports" in metadata:
+        for port_name, port in metadata.ports.items():
+            if port_name not in component.ports:
+                component.add_port(
+                    name=port_name,
+                    midpoint=port.midpoint,
+                    width=port.width,
+                    orientation=port.orientation,
+                    layer=tuple(port.layer),
+                    port_type=port.port_type,
+                )
+
+
+def import_library(
+    gdsii_lib: gdspy.GdsLibrary,
     cellname: Optional[str] = None,
     snap_to_grid_nm: Optional[int] = None,
-    gdsdir: Optional[Union[str, Path]] = None,
-    read_metadata: bool = True,
     hashed_name: bool = True,
-    **kwargs,
+    gdspath: Optional[Path] = None,
 ) -> Component:
-    """Returns a Componenent from a GDS file.
-
-    Adapted from phidl/geometry.py
-
-    if any cell names are found on the component CACHE we append a $ with a
-    number to the name
+    """Returns the unlocked Component of a cell from a gdspy library.
 
     Args:
-        gdspath: path of GDS file.
+        gdsii_lib: library read with gdspy.
         cellname: cell of the name to import (None) imports top cell.
         snap_to_grid_nm: snap to different nm grid (does not snap if False)
-        gdsdir: optional GDS directory.
-        read_metadata: loads metadata if it exists.
         hashed_name: appends a hash to a shortened component name
-        kwargs: extra info for the imported component (polarization, wavelength ...).
+        gdspath: file of the library, for error messages.
     """
-    gdspath = Path(gdsdir) / Path(gdspath) if gdsdir else Path(gdspath)
-    if not gdspath.exists():
-        raise FileNotFoundError(f"No file {gdspath!r} found")
-
-    metadata_filepath = gdspath.with_suffix(".yml")
-
-    gdsii_lib = gdspy.GdsLibrary()
-    gdsii_lib.read_gds(str(gdspath))
     top_level_cells = gdsii_lib.top_level()
     cellnames = [c.name for c in top_level_cells]
 
@@ -134,26 +138,57 @@ def import_gds(
                 )
             D.add_polygon(p)
     component = cell_to_device[topcell]
-    cast(Component, component)
+    return cast(Component, component)
+
+
+@cell
+def import_gds(
+    gdspath: Union[str, Path],
+    cellname: Optional[str] = None,
+    snap_to_grid_nm: Optional[int] = None,
+    gdsdir: Optional[Union[str, Path]] = None,
+    read_metadata: bool = True,
+    hashed_name: bool = True,
+    lazy: bool = False,
+    **kwargs,
+) -> Component:
+    """Returns a Componenent from a GDS file.
+
+    Adapted from phidl/geometry.py
+
+    if any cell names are found on the component CACHE we append a $ with a
+    number to the name
+
+    Args:
+        gdspath: path of GDS file.
+        cellname: cell of the name to import (None) imports top cell.
+        snap_to_grid_nm: snap to different nm grid (does not snap if False)
+        gdsdir: optional GDS directory.
+        read_metadata: loads metadata if it exists.
+        hashed_name: appends a hash to a shortened component name
+        lazy: only reads cellname and its dependencies, using a cached index
+            of the cell offsets in the file (see gdsfactory.read.gds_index).
+            Much faster for large libraries.
+        kwargs: extra info for the imported component (polarization, wavelength ...).
+    """
+    gdspath = Path(gdsdir) / Path(gdspath) if gdsdir else Path(gdspath)
+    if not gdspath.exists():
+        raise FileNotFoundError(f"No file {gdspath!r} found")
+
+    metadata_filepath = gdspath.with_suffix(".yml")
+
+    gdsii_lib = gdspy.GdsLibrary()
+    gdsii_lib.read_gds(read_gds_cells(gdspath, cellname) if lazy else str(gdspath))
+    component = import_library(
+        gdsii_lib,
+        cellname=cellname,
+        snap_to_grid_nm=snap_to_grid_nm,
+        hashed_name=hashed_name,
+        gdspath=gdspath,
+    )
 
     if read_metadata and metadata_filepath.exists():
-        logger.info(f"Read YAML metadata from {metadata_filepath}")
-        metadata = OmegaConf.load(metadata_filepath)
-
-        if "settings" in metadata:
-            component.settings = OmegaConf.to_container(metadata.settings)
-
-        if "ports" in metadata:
-            for port_name, port in metadata.ports.items():
-                if port_name not in component.ports:
-                    component.add_port(
-                        name=port_name,
-                        midpoint=port.midpoint,
-                        width=port.width,
-                        orientation=port.orientation,
-                        layer=tuple(port.layer),
-                        port_type=port.port_type,
-                    )
+        read_metadata_yaml(component, metadata_filepath)
 
     component.info.update(**kwargs)
     component.imported_gds = True
@@ -0,0 +1,86 @@
+import io
+from pathlib import Path
+from typing import Optional, Union
+
+import gdspy
+
+from gdsfactory.cell import cell
+from gdsfactory.component import Component
+from gdsfactory.read.import_gds import import_library, read_metadata_yaml
+
+
+@cell
+def import_oas(
+    oaspath: Union[str, Path],
+    cellname: Optional[str] = None,
+    oasdir: Optional[Union[str, Path]] = None,
+    read_metadata: bool = True,
+    snap_to_grid_nm: Optional[int] = None,
+    hashed_name: bool = True,
+    **kwargs,
+) -> Component:
+    """Returns a Componenent from an OASIS file. Needs klayout.
+
+    klayout reads the OASIS file and converts it to a GDS stream in memory,
+    that gdspy reads without any temporary file.
+
+    Args:
+        oaspath: path of OASIS file.
+        cellname: cell of the name to import (None) imports top cell.
+        oasdir: optional OASIS directory.
+        read_metadata: loads metadata (YAML file with the same name) if it exists.
+        snap_to_grid_nm: snap to different nm grid (does not snap if False)
+        hashed_name: appends a hash to a shortened component name
+        kwargs: extra info for the imported component (polarization, wavelength ...).
+    """
+    import klayout.db as pya
+
+    oaspath = Path(oasdir) / Path(oaspath) if oasdir else Path(oaspath)
+    if not oaspath.exists():
+        raise FileNotFoundError(f"No file {oaspath!r} found")
+
+    layout = pya.Layout()
+    layout.read(str(oaspath))
+    options = pya.SaveLayoutOptions()
+    options.format = "GDS2"
+    stream = io.BytesIO(layout.write_bytes(options))
+    del layout
+
+    gdsii_lib = gdspy.GdsLibrary()
+    gdsii_lib.read_gds(stream)
+    component = import_library(
+        gdsii_lib,
+        cellname=cellname,
+        snap_to_grid_nm=snap_to_grid_nm,
+        hashed_name=hashed_name,
+        gdspath=oaspath,
+    )
+
+    metadata_filepath = oaspath.with_suffix(".yml")
+    if read_metadata and metadata_filepath.exists():
+        read_metadata_yaml(component, metadata_filepath)
+
+    component.info.update(**kwargs)
+    component.imported_gds = True
+    component.lock()
+    return component
+
+
+def test_import_oas_metadata(tmp_path) -> None:
+    import gdsfactory as gf
+
+    c = gf.components.mzi()
+    oaspath = c.write_oas_with_metadata(tmp_path / "mzi.oas")
+    c2 = import_oas(oaspath)
+    assert c2.name == c.name
+    assert set(c2.ports.keys()) == set(c.ports.keys())
+    assert c2.settings["full"]["delta_length"] == c.settings.full["delta_length"]
+
+
+if __name__ == "__main__":
+    import gdsfactory as gf
+
+    c = gf.components.mzi()
+    oaspath = c.write_oas_with_metadata()
+    c2 = import_oas(oaspath)
+    c2.show()
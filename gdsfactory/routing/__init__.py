@@ -31,7 +31,9 @@ from gdsfactory.routing.get_route import (
     get_route_from_waypoints,
     get_route_from_waypoints_electrical,
     get_route_from_waypoints_electrical_multilayer,
+    get_routes,
 )
+from gdsfactory.routing.get_route_astar import get_route_astar, get_routes_astar
 from gdsfactory.routing.get_route_from_steps import (
     get_route_from_steps,
     get_route_from_steps_electrical,
@@ -39,6 +41,10 @@ from gdsfactory.routing.get_route_from_steps import (
 )
 from gdsfactory.routing.get_route_sbend import get_route_sbend
 from gdsfactory.routing.get_routes_bend180 import get_routes_bend180
+from gdsfactory.routing.get_routes_pathfinder import (
+    get_routes_pathfinder,
+    get_routes_pathfinder_multilayer,
+)
 from gdsfactory.routing.get_routes_straight import get_routes_straight
 from gdsfactory.routing.route_ports_to_side import route_ports_to_side
 from gdsfactory.routing.route_quad import route_quad
@@ -62,9 +68,14 @@ __all__ = [
     "get_bundle_from_waypoints_electrical",
     "get_bundle_from_waypoints_electrical_multilayer",
     "get_route",
+    "get_route_astar",
     "get_route_electrical",
     "get_route_electrical_multilayer",
+    "get_routes",
+    "get_routes_astar",
     "get_routes_bend180",
+    "get_routes_pathfinder",
+    "get_routes_pathfinder_multilayer",
     "get_routes_straight",
     "get_route_sbend",
     "get_bundle_sbend",
@@ -26,8 +26,15 @@ from gdsfactory.cross_section import strip
 from gdsfactory.port import Port
 from gdsfactory.routing.get_bundle_corner import get_bundle_corner
 from gdsfactory.routing.get_bundle_u import get_bundle_udirect, get_bundle_uindirect
-from gdsfactory.routing.get_route import get_route, get_route_from_waypoints
-from gdsfactory.routing.manhattan import generate_manhattan_waypoints
+from gdsfactory.routing.get_route import (
+    get_route,
+    get_route_from_waypoints,
+    get_routes,
+)
+from gdsfactory.routing.manhattan import (
+    generate_manhattan_waypoints_batch,
+    route_cache,
+)
 from gdsfactory.routing.sort_ports import get_port_x, get_port_y
 from gdsfactory.routing.sort_ports import sort_ports as sort_ports_function
 from gdsfactory.types import (
@@ -41,6 +48,7 @@ from gdsfactory.types import (
 METAL_MIN_SEPARATION = TECH.metal_spacing
 
 
+@route_cache()
 def get_bundle(
     ports1: List[Port],
     ports2: List[Port],
@@ -321,16 +329,14 @@ def _get_bundle_waypoints(
 
     axis = "X" if ports1[0].orientation in [0, 180] else "Y"
     if len(ports1) == 1 and len(ports2) == 1:
-        return [
-            generate_manhattan_waypoints(
-                ports1[0],
-                ports2[0],
-                start_straight_length=start_straight_length,
-                end_straight_length=end_straight_length,
-                cross_section=cross_section,
-                **kwargs,
-            )
-        ]
+        return generate_manhattan_waypoints_batch(
+            ports1,
+            ports2,
+            start_straight_length=start_straight_length,
+            end_straight_length=end_straight_length,
+            cross_section=cross_section,
+            **kwargs,
+        )
 
     # Contains end_straight of tracks which need to be adjusted together
     end_straights_in_group = []
@@ -394,19 +400,15 @@ def _get_bundle_waypoints(
 
     end_straights += [max(x - L, 0) + Le for x in end_straights_in_group]
 
-    # Second pass - route the ports pairwise
-    N = len(ports1)
-    return [
-        generate_manhattan_waypoints(
-            ports1[i],
-            ports2[i],
-            start_straight_length=start_straight_length,
-            end_straight_length=end_straights[i],
-            cross_section=cross_section,
-            **kwargs,
-        )
-        for i in range(N)
-    ]
+    # Second pass - route all the ports at once
+    return generate_manhattan_waypoints_batch(
+        ports1,
+        ports2,
+        start_straight_length=start_straight_length,
+        end_straight_length=end_straights,
+        cross_section=cross_section,
+        **kwargs,
+    )
 
 
 def compute_ports_max_displacement(ports1: List[Port], ports2: List[Port]) -> Number:
@@ -467,6 +469,7 @@ def get_min_spacing(
     return (max_j - min_j) * sep + 2 * radius + 1.0
 
 
+@route_cache()
 def get_bundle_same_axis_no_grouping(
     ports1: List[Port],
     ports2: List[Port],
@@ -571,6 +574,8 @@ def get_bundle_same_axis_no_grouping(
     end_straight_length += -min_j * sep
 
     # Do case with wire direct if the ys are close to each other
+    s_straights = []
+    e_straights = []
     for i, _ in enumerate(ports1):
 
         if axis in {"X", "x"}:
@@ -580,24 +585,35 @@ def get_bundle_same_axis_no_grouping(
             x1 = ports1[i].position[0]
             x2 = ports2[i].position[0]
 
-        s_straight = start_straight_length - j * sep
-        e_straight = j * sep + end_straight_length
+        s_straights.append(start_straight_length - j * sep)
+        e_straights.append(j * sep + end_straight_length)
+
+        if x2 >= x1:
+            j += 1
+        else:
+            j -= 1
+
+    if route_filter is get_route:
+        return get_routes(
+            ports1,
+            ports2,
+            start_straight_length=s_straights,
+            end_straight_length=e_straights,
+            cross_section=cross_section,
+            **kwargs,
+        )
 
+    for i, _ in enumerate(ports1):
         elems += [
             route_filter(
                 ports1[i],
                 ports2[i],
-                start_straight_length=s_straight,
-                end_straight_length=e_straight,
+                start_straight_length=s_straights[i],
+                end_straight_length=e_straights[i],
                 cross_section=cross_section,
                 **kwargs,
             )
         ]
-
-        if x2 >= x1:
-            j += 1
-        else:
-            j -= 1
     return elems
 
 
@@ -33,7 +33,7 @@ To generate a straight route:
 
 """
 from functools import partial
-from typing import Callable, Optional, Union
+from typing import Callable, Dict, List, Optional, Union
 
 import numpy as np
 
@@ -46,11 +46,17 @@ from gdsfactory.components.via_corner import via_corner
 from gdsfactory.components.wire import wire_corner
 from gdsfactory.cross_section import metal2, metal3, strip
 from gdsfactory.port import Port
-from gdsfactory.routing.manhattan import round_corners, route_manhattan
+from gdsfactory.routing.manhattan import (
+    _cached,
+    generate_manhattan_waypoints_batch,
+    round_corners,
+    route_cache,
+)
 from gdsfactory.types import (
     ComponentSpec,
     Coordinates,
     CrossSectionSpec,
+    Floats,
     MultiCrossSectionAngleSpec,
     Route,
 )
@@ -100,12 +106,58 @@ def get_route(
 
     """
 
+    return get_routes(
+        [input_port],
+        [output_port],
+        bend=bend,
+        straight=straight,
+        taper=taper,
+        start_straight_length=start_straight_length,
+        end_straight_length=end_straight_length,
+        min_straight_length=min_straight_length,
+        cross_section=cross_section,
+        **kwargs,
+    )[0]
+
+
+@route_cache()
+def get_routes(
+    ports1: List[Port],
+    ports2: List[Port],
+    bend: ComponentSpec = bend_euler,
+    straight: ComponentSpec = straight_function,
+    taper: Optional[ComponentSpec] = None,
+    start_straight_length: Union[float, Floats] = 0.01,
+    end_straight_length: Union[float, Floats] = 0.01,
+    min_straight_length: Union[float, Floats] = 0.01,
+    cross_section: Union[CrossSectionSpec, MultiCrossSectionAngleSpec] = "strip",
+    **kwargs,
+) -> List[Route]:
+    """Returns Manhattan Routes between each pair of ports.
+
+    Same as `get_route` for each pair of ports, but resolves the bend,
+    tapers and cross_section once and computes all the waypoints at once.
+
+    Args:
+        ports1: start ports.
+        ports2: end ports.
+        bend: function that return bends
+        straight: function that returns straights
+        taper:
+        start_straight_length: length of starting straight (float or one per route).
+        end_straight_length: length of end straight (float or one per route).
+        min_straight_length: min length of straight for any intermediate segment.
+        cross_section:
+        kwargs: cross_section settings
+
+    """
     bend90 = (
         bend
         if isinstance(bend, Component)
         else gf.get_component(bend, cross_section=cross_section, **kwargs)
     )
 
+    tapers: Dict[float, Optional[Component]] = {}
     if taper:
         if isinstance(cross_section, list):
             raise ValueError(
@@ -114,31 +166,42 @@ def get_route(
         x = gf.get_cross_section(cross_section, **kwargs)
 
         taper_length = x.taper_length
-        width1 = input_port.width
         auto_widen = x.auto_widen
-        width2 = x.width_wide if auto_widen else width1
+        for width1 in {port.width for port in ports1}:
+            width2 = x.width_wide if auto_widen else width1
+            tapers[width1] = gf.get_component(
+                taper,
+                length=taper_length,
+                width1=width1,
+                width2=width2,
+                cross_section=cross_section,
+                **kwargs,
+            )
 
-        taper = gf.get_component(
-            taper,
-            length=taper_length,
-            width1=input_port.width,
-            width2=width2,
-            cross_section=cross_section,
-            **kwargs,
-        )
+    if isinstance(cross_section, list):
+        x = [gf.get_cross_section(xsection[0], **kwargs) for xsection in cross_section]
+    else:
+        x = gf.get_cross_section(cross_section, **kwargs)
 
-    return route_manhattan(
-        input_port=input_port,
-        output_port=output_port,
-        straight=straight,
-        taper=taper,
+    waypoints = generate_manhattan_waypoints_batch(
+        ports1,
+        ports2,
         start_straight_length=start_straight_length,
         end_straight_length=end_straight_length,
         min_straight_length=min_straight_length,
         bend=bend90,
-        cross_section=cross_section,
-        **kwargs,
+        cross_section=x,
     )
+    return [
+        round_corners(
+            points=points,
+            straight=straight,
+            taper=tapers.get(port.width),
+            bend=bend90,
+            cross_section=x,
+        )
+        for port, points in zip(ports1, waypoints)
+    ]
 
 
 get_route_electrical = partial(
@@ -223,14 +286,15 @@ def get_route_from_waypoints(
     if isinstance(cross_section, list):
         taper = None
     elif taper:
-        x = gf.get_cross_section(cross_section, **kwargs)
+        x = _cached(gf.get_cross_section, cross_section, **kwargs)
         auto_widen = x.auto_widen
         width1 = x.width
         width2 = x.width_wide if auto_widen else width1
         taper_length = x.taper_length
         if auto_widen:
             taper = (
-                taper(
+                _cached(
+                    taper,
                     length=taper_length,
                     width1=width1,
                     width2=width2,
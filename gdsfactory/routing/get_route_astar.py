@@ -0,0 +1,558 @@
+"""Obstacle-aware routing with A* over an occupancy grid.
+
+The polygons of the parent Component (in `avoid_layers`) are rasterized into a
+grid with `resolution` um cells and grown by `distance` plus half the route
+width. A* searches the grid for a Manhattan path where every turn is followed
+by at least two bend sizes of straight (so the bends fit), and the path
+corners become the waypoints of a normal `Route`.
+
+`get_routes_astar` routes many nets on the same grid and adds each route to
+the grid before routing the next one.
+"""
+import heapq
+import itertools
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import skimage.draw as skdraw
+from scipy.ndimage import binary_dilation, label
+
+import gdsfactory as gf
+from gdsfactory.component import Component
+from gdsfactory.components.bend_euler import bend_euler
+from gdsfactory.port import Port
+from gdsfactory.routing.get_route import get_route_from_waypoints
+from gdsfactory.routing.manhattan import RouteError, _get_bend_size
+from gdsfactory.types import ComponentSpec, CrossSectionSpec, Layers, Route
+
+DIRECTIONS = ((1, 0), (0, 1), (-1, 0), (0, -1))  # east, north, west, south
+
+
+class OccupancyGrid:
+    """Grid of blocked cells for routing.
+
+    Args:
+        bbox: ((xmin, ymin), (xmax, ymax)) area to route in.
+        resolution: cell size (um).
+    """
+
+    def __init__(self, bbox, resolution: float) -> None:
+        (xmin, ymin), (xmax, ymax) = bbox
+        self.resolution = resolution
+        self.origin = np.array([xmin, ymin], dtype=float)
+        self.shape = (
+            int(math.ceil((xmax - xmin) / resolution)) + 1,
+            int(math.ceil((ymax - ymin) / resolution)) + 1,
+        )
+        # number of shapes blocking each cell
+        self.blocked = np.zeros(self.shape, dtype=np.int32)
+
+    def to_cell(self, point) -> Tuple[int, int]:
+        i, j = np.round((np.asarray(point) - self.origin) / self.resolution)
+        return int(i), int(j)
+
+    def to_point(self, cell: Tuple[int, int]) -> np.ndarray:
+        return self.origin + np.asarray(cell, dtype=float) * self.resolution
+
+    def add_polygons(
+        self, polygons: Iterable[np.ndarray], margin: float, count: int = 1
+    ) -> None:
+        """Blocks the cells within margin of the polygons.
+
+        Args:
+            polygons: to block.
+            margin: distance around the polygons.
+            count: -1 unblocks polygons that were blocked before.
+        """
+        polygons = [(p - self.origin) / self.resolution for p in polygons]
+        if not polygons:
+            return
+        r = int(math.ceil(margin / self.resolution))
+        points = np.concatenate(polygons)
+        imin, jmin = np.maximum(np.floor(points.min(axis=0)).astype(int) - r, 0)
+        imax, jmax = np.minimum(
+            np.ceil(points.max(axis=0)).astype(int) + r + 1, self.shape
+        )
+        if imin >= imax or jmin >= jmax:
+            return
+
+        shape = (imax - imin, jmax - jmin)
+        mask = np.zeros(shape, dtype=bool)
+        for polygon in polygons:
+            rows = polygon[:, 0] - imin
+            columns = polygon[:, 1] - jmin
+            mask[skdraw.polygon(rows, columns, shape=shape)] = True
+
+        # thin polygons may not cover any cell center, so also block the edges
+        starts = points - (imin, jmin)
+        ends = np.concatenate([np.roll(p, -1, axis=0) for p in polygons]) - (
+            imin,
+            jmin,
+        )
+        samples = np.ceil(np.abs(ends - starts).max(axis=1)).astype(int) + 1
+        edges = np.repeat(np.arange(len(samples)), samples)
+        offsets = np.arange(samples.sum()) - np.repeat(
+            np.cumsum(samples) - samples, samples
+        )
+        t = offsets / np.maximum(samples - 1, 1)[edges]
+        cells = np.round(starts[edges] + t[:, None] * (ends - starts)[edges])
+        mask[tuple(cells.astype(int).T)] = True
+        if r:
+            mask = binary_dilation(mask, structure=np.ones((2 * r + 1, 2 * r + 1)))
+        self.blocked[imin:imax, jmin:jmax] += count * mask
+
+
+def get_occupancy_grid(
+    component: Component,
+    resolution: float = 1.0,
+    avoid_layers: Optional[Layers] = None,
+    margin: float = 1.0,
+    extension: float = 50.0,
+) -> OccupancyGrid:
+    """Returns OccupancyGrid with the component polygons blocked.
+
+    Args:
+        component: with the obstacles.
+        resolution: grid cell size (um).
+        avoid_layers: layers to avoid. None avoids all layers.
+        margin: minimum distance from the route centerline to the polygons.
+        extension: routing area around the component bbox.
+    """
+    (xmin, ymin), (xmax, ymax) = component.bbox
+    grid = OccupancyGrid(
+        bbox=(
+            (xmin - extension, ymin - extension),
+            (xmax + extension, ymax + extension),
+        ),
+        resolution=resolution,
+    )
+    grid.add_polygons(
+        (points for _, points in component.iter_polygons(layers=avoid_layers)),
+        margin=margin,
+    )
+    return grid
+
+
+def _direction(port: Port) -> int:
+    if port.orientation is None or port.orientation % 90:
+        raise ValueError(f"port {port.name!r} needs a manhattan orientation")
+    return int(round(port.orientation / 90)) % 4
+
+
+def _get_end_cells(bend_size: float, resolution: float) -> int:
+    return int(math.ceil(bend_size / resolution)) + 1
+
+
+def _get_stub(
+    port: Port, bend_size: float, resolution: float, width: float
+) -> np.ndarray:
+    """Returns rectangle from the port to the first cell of its route."""
+    direction = np.array(DIRECTIONS[_direction(port)], dtype=float)
+    normal = np.array([-direction[1], direction[0]]) * width / 2
+    length = _get_end_cells(bend_size, resolution) * resolution
+    p0 = np.array(port.midpoint, dtype=float)
+    p1 = p0 + length * direction
+    return np.array([p0 - normal, p1 - normal, p1 + normal, p0 + normal])
+
+
+def _free_runs(blocked: np.ndarray) -> List[List[int]]:
+    """Returns for each direction the number of free cells from each cell.
+
+    The runs stop at the blocked cells and at the edges, so `runs[d][k] > n`
+    means that the n cells after cell k in direction d are free.
+    Runs are flat python lists (faster to index than numpy arrays).
+    """
+    runs = []
+    for axis in (0, 1):
+        n = blocked.shape[axis]
+        index = np.arange(n).reshape((-1, 1) if axis == 0 else (1, -1))
+        index = np.broadcast_to(index, blocked.shape)
+        next_blocked = np.flip(
+            np.minimum.accumulate(
+                np.flip(np.where(blocked, index, n), axis=axis), axis=axis
+            ),
+            axis=axis,
+        )
+        previous_blocked = np.maximum.accumulate(
+            np.where(blocked, index, -1), axis=axis
+        )
+        runs.append((next_blocked - index).ravel().tolist())
+        runs.append((index - previous_blocked).ravel().tolist())
+    # east, north, west, south
+    return [runs[0], runs[2], runs[1], runs[3]]
+
+
+def _search(
+    grid: OccupancyGrid,
+    start: Tuple[int, int],
+    start_direction: int,
+    goal: Tuple[int, int],
+    goal_direction: int,
+    turn_cells: int,
+    bend_cost: float,
+    window_margin: int,
+) -> List[Tuple[int, int, int]]:
+    """Returns the A* path as a list of (i, j, direction) states.
+
+    Turning jumps turn_cells in the new direction, so there is always room for
+    the bends between two corners.
+
+    The search starts in the bbox of start and goal extended by window_margin
+    cells and grows the window until it finds a path or covers the whole grid,
+    so nets that can not be routed fail fast in congested areas.
+    """
+    nx, ny = grid.shape
+    if not (0 <= start[0] < nx and 0 <= start[1] < ny):
+        return []
+    if not (0 <= goal[0] < nx and 0 <= goal[1] < ny):
+        return []
+
+    while True:
+        i0 = max(min(start[0], goal[0]) - window_margin, 0)
+        j0 = max(min(start[1], goal[1]) - window_margin, 0)
+        i1 = min(max(start[0], goal[0]) + window_margin + 1, nx)
+        j1 = min(max(start[1], goal[1]) + window_margin + 1, ny)
+        blocked = grid.blocked[i0:i1, j0:j1] > 0
+        labels, _ = label(~blocked)
+        connected = (
+            labels[start[0] - i0, start[1] - j0] == labels[goal[0] - i0, goal[1] - j0]
+        )
+        path = connected and _search_window(
+            blocked,
+            start=(start[0] - i0, start[1] - j0),
+            start_direction=start_direction,
+            goal=(goal[0] - i0, goal[1] - j0),
+            goal_direction=goal_direction,
+            turn_cells=turn_cells,
+            bend_cost=bend_cost,
+        )
+        if path:
+            return [(i + i0, j + j0, d) for i, j, d in path]
+        if i0 == 0 and j0 == 0 and i1 == nx and j1 == ny:
+            return []
+        window_margin *= 2
+
+
+def _search_window(
+    blocked: np.ndarray,
+    start: Tuple[int, int],
+    start_direction: int,
+    goal: Tuple[int, int],
+    goal_direction: int,
+    turn_cells: int,
+    bend_cost: float,
+) -> List[Tuple[int, int, int]]:
+    ny = blocked.shape[1]
+    runs = _free_runs(blocked)
+    gi, gj = goal
+
+    if blocked[start] or blocked[goal]:
+        return []
+
+    def heuristic(i: int, j: int, d: int) -> float:
+        dx, dy = gi - i, gj - j
+        h = abs(dx) + abs(dy)
+        ux, uy = DIRECTIONS[d]
+        straight_ahead = (
+            d == goal_direction and dx * uy == dy * ux and dx * ux + dy * uy >= 0
+        )
+        return h if straight_ahead else h + bend_cost
+
+    state = (start[0], start[1], start_direction)
+    g_score: Dict[Tuple[int, int, int], float] = {state: 0.0}
+    parents: Dict[Tuple[int, int, int], Optional[Tuple[int, int, int]]] = {state: None}
+    counter = itertools.count()
+    heap = [(heuristic(*state), 0.0, next(counter), state)]
+    goal_state = (gi, gj, goal_direction)
+
+    while heap:
+        _, g, _, state = heapq.heappop(heap)
+        if state == goal_state:
+            path = []
+            while state is not None:
+                path.append(state)
+                state = parents[state]
+            return path[::-1]
+        g = -g
+        if g > g_score[state]:
+            continue
+        i, j, d = state
+        k = i * ny + j
+
+        neighbors = []
+        if runs[d][k] > 1:
+            ux, uy = DIRECTIONS[d]
+            neighbors.append(((i + ux, j + uy, d), 1.0))
+        for new_direction in ((d + 1) % 4, (d + 3) % 4):
+            run = runs[new_direction][k]
+            vx, vy = DIRECTIONS[new_direction]
+            if new_direction == goal_direction:
+                dx, dy = gi - i, gj - j
+                distance = dx * vx + dy * vy
+                if dx * vy == dy * vx and 0 <= distance < min(turn_cells, run):
+                    # last bend: the goal is already one bend size from the port
+                    neighbors.append((goal_state, distance + bend_cost))
+            if run > turn_cells:
+                neighbors.append(
+                    (
+                        (i + turn_cells * vx, j + turn_cells * vy, new_direction),
+                        turn_cells + bend_cost,
+                    )
+                )
+
+        for neighbor, cost in neighbors:
+            new_g = g + cost
+            if new_g < g_score.get(neighbor, math.inf):
+                g_score[neighbor] = new_g
+                parents[neighbor] = state
+                heapq.heappush(
+                    heap,
+                    (new_g + heuristic(*neighbor), -new_g, next(counter), neighbor),
+                )
+    return []
+
+
+def _route_astar(
+    grid: OccupancyGrid,
+    port1: Port,
+    port2: Port,
+    bend_size: float,
+    bend_cost: float,
+) -> np.ndarray:
+    """Returns waypoints from port1 to port2 avoiding the blocked cells."""
+    resolution = grid.resolution
+    d1 = _direction(port1)
+    d2 = _direction(port2)
+    end_cells = _get_end_cells(bend_size, resolution)
+    turn_cells = int(math.ceil(2 * bend_size / resolution)) + 1
+
+    start = np.array(port1.midpoint) + end_cells * resolution * np.array(DIRECTIONS[d1])
+    goal = np.array(port2.midpoint) + end_cells * resolution * np.array(DIRECTIONS[d2])
+    path = _search(
+        grid,
+        start=grid.to_cell(start),
+        start_direction=d1,
+        goal=grid.to_cell(goal),
+        goal_direction=(d2 + 2) % 4,
+        turn_cells=turn_cells,
+        bend_cost=bend_cost / resolution,
+        window_margin=4 * turn_cells,
+    )
+    if not path:
+        raise RouteError(
+            f"No route found from {port1.name!r} {port1.midpoint} "
+            f"to {port2.name!r} {port2.midpoint}"
+        )
+
+    corners = [
+        grid.to_point(state[:2])
+        for state, next_state in zip(path, path[1:])
+        if state[2] != next_state[2]
+    ]
+    p1 = np.array(port1.midpoint, dtype=float)
+    p2 = np.array(port2.midpoint, dtype=float)
+    if not corners:
+        offset = abs(p2[1 - d1 % 2] - p1[1 - d1 % 2])
+        if np.isclose(offset, 0):
+            return np.array([p1, p2])
+        if offset < 2 * bend_size:
+            raise RouteError(
+                f"Ports {port1.name!r} {port1.midpoint} and {port2.name!r} "
+                f"{port2.midpoint} are offset by {offset}, less than the "
+                f"{2 * bend_size} needed for a jog with two bends"
+            )
+        # ports snapped to the same track: jog in the middle
+        middle = (p1[d1 % 2] + p2[d1 % 2]) / 2
+        corner1, corner2 = p1.copy(), p2.copy()
+        corner1[d1 % 2] = corner2[d1 % 2] = middle
+        return np.array([p1, corner1, corner2, p2])
+
+    # align the first and last segments with the ports
+    corners[0][1 - d1 % 2] = p1[1 - d1 % 2]
+    corners[-1][1 - d2 % 2] = p2[1 - d2 % 2]
+    return np.array([p1] + corners + [p2])
+
+
+def get_routes_astar(
+    component: Component,
+    ports1: List[Port],
+    ports2: List[Port],
+    resolution: float = 1.0,
+    avoid_layers: Optional[Layers] = None,
+    distance: float = 1.0,
+    bend: ComponentSpec = bend_euler,
+    bend_cost: float = 10.0,
+    cross_section: CrossSectionSpec = "strip",
+    grid: Optional[OccupancyGrid] = None,
+    **kwargs,
+) -> List[Route]:
+    """Returns routes avoiding the component polygons and the previous routes.
+
+    Each route is added to the occupancy grid before routing the next one.
+
+    Args:
+        component: with the obstacles (usually the parent of the ports).
+        ports1: start ports.
+        ports2: end ports.
+        resolution: grid cell size (um).
+        avoid_layers: layers to avoid. None avoids all the component layers.
+        distance: minimum spacing between the route and the obstacles.
+        bend: bend spec.
+        bend_cost: extra length (um) that a bend costs.
+        cross_section: spec.
+        grid: reuse an occupancy grid (updated with the new routes).
+        kwargs: cross_section settings.
+    """
+    if len(ports1) != len(ports2):
+        raise ValueError(f"ports1={len(ports1)} and ports2={len(ports2)} must be equal")
+
+    x = gf.get_cross_section(cross_section, **kwargs)
+    bend90 = (
+        bend
+        if isinstance(bend, Component)
+        else gf.get_component(bend, cross_section=cross_section, **kwargs)
+    )
+    bend_size = _get_bend_size(bend90)
+    margin = distance + x.width / 2
+    grid = grid or get_occupancy_grid(
+        component,
+        resolution=resolution,
+        avoid_layers=avoid_layers,
+        margin=margin,
+        extension=4 * bend_size + margin,
+    )
+
+    # reserve the straight next to each port for its own route
+    stubs = [
+        [_get_stub(port, bend_size, grid.resolution, x.width) for port in ports]
+        for ports in zip(ports1, ports2)
+    ]
+    for stub in stubs:
+        grid.add_polygons(stub, margin=margin)
+
+    routes = []
+    for port1, port2, stub in zip(ports1, ports2, stubs):
+        grid.add_polygons(stub, margin=margin, count=-1)
+        waypoints = _route_astar(
+            grid, port1, port2, bend_size=bend_size, bend_cost=bend_cost
+        )
+        route = get_route_from_waypoints(
+            waypoints, bend=bend90, cross_section=cross_section, **kwargs
+        )
+        grid.add_polygons(
+            (
+                points
+                for reference in route.references
+                for points in reference.get_polygons()
+            ),
+            margin=margin,
+        )
+        routes.append(route)
+    return routes
+
+
+def get_route_astar(
+    component: Component,
+    port1: Port,
+    port2: Port,
+    resolution: float = 1.0,
+    avoid_layers: Optional[Layers] = None,
+    distance: float = 1.0,
+    bend: ComponentSpec = bend_euler,
+    bend_cost: float = 10.0,
+    cross_section: CrossSectionSpec = "strip",
+    **kwargs,
+) -> Route:
+    """Returns a Manhattan route that avoids the component polygons.
+
+    Args:
+        component: with the obstacles (usually the parent of the ports).
+        port1: start port.
+        port2: end port.
+        resolution: grid cell size (um).
+        avoid_layers: layers to avoid. None avoids all the component layers.
+        distance: minimum spacing between the route and the obstacles.
+        bend: bend spec.
+        bend_cost: extra length (um) that a bend costs.
+        cross_section: spec.
+        kwargs: cross_section settings.
+
+    .. plot::
+        :include-source:
+
+        import gdsfactory as gf
+
+        c = gf.Component("get_route_astar")
+        w = gf.components.straight()
+        left = c << w
+        right = c << w
+        right.move((100, 80))
+        obstacle = c << gf.components.rectangle(size=(100, 10), layer=(2, 0))
+        obstacle.move((-20, 40))
+
+        route = gf.routing.get_route_astar(c, left.ports["o2"], right.ports["o2"])
+        c.add(route.references)
+        c.plot()
+
+    """
+    return get_routes_astar(
+        component,
+        [port1],
+        [port2],
+        resolution=resolution,
+        avoid_layers=avoid_layers,
+        distance=distance,
+        bend=bend,
+        bend_cost=bend_cost,
+        cross_section=cross_section,
+        **kwargs,
+    )[0]
+
+
+def test_get_route_astar() -> None:
+    import pytest
+
+    c = gf.Component("test_get_route_astar")
+    w = gf.components.straight()
+    left = c << w
+    right = c << w
+    right.move((100, 80))
+    obstacle = c << gf.components.rectangle(size=(100, 10), layer=(2, 0))
+    obstacle.move((-20, 40))
+
+    route = get_route_astar(c, left.ports["o2"], right.ports["o2"])
+    c.add(route.references)
+
+    rectangle = obstacle.bbox
+    for reference in route.references:
+        (xmin, ymin), (xmax, ymax) = reference.bbox
+        assert (
+            xmax < rectangle[0, 0]
+            or xmin > rectangle[1, 0]
+            or ymax < rectangle[0, 1]
+            or ymin > rectangle[1, 1]
+        )
+
+    # facing ports offset by less than one grid cell
+    for dy in [0.3, 0.6]:
+        c = gf.Component()
+        left = c << w
+        right = c << w
+        right.move((200, dy))
+        with pytest.raises(RouteError):
+            get_route_astar(c, left.ports["o2"], right.ports["o1"], resolution=1.0)
+
+
+if __name__ == "__main__":
+    c = gf.Component("get_route_astar")
+    w = gf.components.straight()
+    left = c << w
+    right = c << w
+    right.move((100, 80))
+    obstacle = c << gf.components.rectangle(size=(100, 10), layer=(2, 0))
+    obstacle.move((-20, 40))
+
+    route = get_route_astar(c, left.ports["o2"], right.ports["o2"])
+    c.add(route.references)
+    c.show()
@@ -1,3 +1,4 @@
+from collections.abc import Mapping
 from typing import Dict, List, Optional, Union
 
 import gdsfactory as gf
@@ -26,7 +27,7 @@ def get_routes_bend180(
         bend_port2:
         **kwargs: bend settings
     """
-    ports = list(ports.values()) if isinstance(ports, dict) else ports
+    ports = list(ports.values()) if isinstance(ports, Mapping) else ports
     bend = bend(angle=180, cross_section=cross_section, **kwargs)
 
     bend_ports = bend.get_ports_list()
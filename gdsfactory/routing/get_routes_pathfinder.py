@@ -0,0 +1,515 @@
+"""Route many electrical nets at once with negotiated congestion (PathFinder).
+
+Routing nets one by one (like `add_electrical_pads_top` or `get_route_astar`)
+depends on the net order: the first nets take the shortest tracks and the last
+ones cross them or find no room. PathFinder (McMurchie and Ebeling, 1995)
+routes all nets with shortest paths that are allowed to share tracks, and then
+routes them again making shared tracks more expensive each iteration (present
+congestion) and remembering which tracks were shared before (history), until
+each track is used by only one net.
+
+The routing grid has one track every `pitch` um (wire width plus spacing).
+Each cell has a horizontal and a vertical node, and switching between them is
+a corner. With one metal layer both nodes share the cell, so nets can not
+cross. With two metal layers (`get_routes_pathfinder_multilayer`) horizontal
+tracks are on one layer and vertical tracks on the other one, so nets can
+cross and each corner is a via (`via_corner`).
+"""
+import math
+from typing import List, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+import gdsfactory as gf
+from gdsfactory.component import Component
+from gdsfactory.components.via_corner import via_corner
+from gdsfactory.components.wire import wire_corner
+from gdsfactory.cross_section import metal2, metal3
+from gdsfactory.port import Port
+from gdsfactory.routing.get_route import get_route_from_waypoints
+from gdsfactory.routing.get_route_astar import DIRECTIONS, OccupancyGrid, _direction
+from gdsfactory.routing.manhattan import RouteError
+from gdsfactory.types import ComponentSpec, CrossSectionSpec, Layers, Route
+
+HORIZONTAL, VERTICAL = 0, 1
+
+
+class RoutingGraph:
+    """Horizontal and vertical track nodes of an OccupancyGrid.
+
+    Node `layer * ncells + i * ny + j` is cell (i, j) on the horizontal (0) or
+    vertical (1) tracks. Each node uses a resource (the cell with one metal
+    layer or the node with two layers) that only one net can use.
+
+    Args:
+        grid: with the blocked cells.
+        corner_cost: cost of switching between horizontal and vertical (cells).
+        multilayer: horizontal and vertical tracks are on different layers.
+    """
+
+    def __init__(
+        self, grid: OccupancyGrid, corner_cost: float, multilayer: bool
+    ) -> None:
+        nx, ny = grid.shape
+        self.shape = (nx, ny)
+        self.corner_cost = corner_cost
+        self.node_i, self.node_j = np.divmod(np.arange(2 * nx * ny) % (nx * ny), ny)
+        self.ncells = ncells = nx * ny
+        self.nodes = 2 * ncells
+        self.resources = np.arange(self.nodes) % (self.nodes if multilayer else ncells)
+
+        free = ~(grid.blocked > 0).ravel()
+        cells = np.arange(ncells).reshape(nx, ny)
+        horizontal = np.stack([cells[:-1, :].ravel(), cells[1:, :].ravel()])
+        vertical = np.stack([cells[:, :-1].ravel(), cells[:, 1:].ravel()]) + ncells
+        corners = np.stack([np.arange(ncells), np.arange(ncells) + ncells])
+        edges = np.concatenate([horizontal, vertical, corners], axis=1)
+        extra = np.concatenate(
+            [
+                np.zeros(horizontal.shape[1] + vertical.shape[1]),
+                np.full(ncells, corner_cost),
+            ]
+        )
+        keep = free[edges[0] % ncells] & free[edges[1] % ncells]
+        edges, extra = edges[:, keep], extra[keep]
+
+        # both directions, sorted by source node to build the csr matrix
+        sources = np.concatenate([edges[0], edges[1]])
+        targets = np.concatenate([edges[1], edges[0]])
+        extra = np.concatenate([extra, extra])
+        order = np.lexsort((targets, sources))
+        self.targets = targets[order]
+        self.extra = extra[order]
+        self.indptr = np.concatenate(
+            [[0], np.cumsum(np.bincount(sources, minlength=self.nodes))]
+        )
+
+    def get_subgraph(self, node_cost: np.ndarray, nodes: np.ndarray) -> csr_matrix:
+        """Returns graph of the edges between nodes (local node indices).
+
+        Each edge costs its target node cost. Only the edges of the nodes are
+        visited, so the cost does not depend on the grid size.
+
+        Args:
+            node_cost: cost of each node.
+            nodes: sorted nodes of the subgraph.
+        """
+        starts = self.indptr[nodes]
+        counts = self.indptr[nodes + 1] - starts
+        rows = np.repeat(np.arange(len(nodes)), counts)
+        edges = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(
+            counts.sum()
+        )
+        targets = self.targets[edges]
+        columns = np.searchsorted(nodes, targets)
+        keep = nodes[np.minimum(columns, len(nodes) - 1)] == targets
+        data = node_cost[targets[keep]] + self.extra[edges[keep]]
+        return csr_matrix(
+            (data, (rows[keep], columns[keep])), shape=(len(nodes), len(nodes))
+        )
+
+    def get_cost(self, node_cost: np.ndarray, path: List[int]) -> float:
+        """Returns path cost."""
+        layers = np.asarray(path) // self.ncells
+        corners = np.count_nonzero(layers[1:] != layers[:-1])
+        return node_cost[path[1:]].sum() + corners * self.corner_cost
+
+    def shortest_path(
+        self,
+        node_cost: np.ndarray,
+        source: int,
+        target: int,
+        limit: float = np.inf,
+        margin: int = 8,
+    ) -> List[int]:
+        """Returns list of nodes from source to target (empty if unreachable).
+
+        Searches first in the bbox of source and target extended by margin
+        cells, and doubles the margin while there is no path, until the window
+        covers the whole grid.
+
+        Args:
+            node_cost: cost of each node.
+            source: start node.
+            target: end node.
+            limit: only search nodes closer than limit (cost of a known path).
+            margin: initial window margin (cells).
+        """
+        nx, ny = self.shape
+        i = self.node_i[[source, target]]
+        j = self.node_j[[source, target]]
+        while True:
+            i0, i1 = max(i.min() - margin, 0), min(i.max() + margin, nx - 1)
+            j0, j1 = max(j.min() - margin, 0), min(j.max() + margin, ny - 1)
+            full = i0 == 0 and j0 == 0 and i1 == nx - 1 and j1 == ny - 1
+            cells = (
+                np.arange(i0, i1 + 1)[:, None] * ny + np.arange(j0, j1 + 1)
+            ).ravel()
+            nodes = np.concatenate([cells, cells + self.ncells])
+            local_source, local_target = np.searchsorted(nodes, [source, target])
+
+            distances, predecessors = dijkstra(
+                self.get_subgraph(node_cost, nodes),
+                indices=local_source,
+                return_predecessors=True,
+                limit=limit,
+            )
+            path = []
+            if np.isfinite(distances[local_target]):
+                path = [local_target]
+                while path[-1] != local_source:
+                    path.append(predecessors[path[-1]])
+                path = [int(node) for node in nodes[path[::-1]]]
+            if path or full:
+                return path
+            margin *= 2
+
+
+def _get_terminal(
+    grid: OccupancyGrid, port: Port, width: float, slack: float, max_cells: int = 1000
+) -> Tuple[int, List[int], np.ndarray, int]:
+    """Returns terminal for the route of the port.
+
+    Returns:
+        node: first free node in front of the port.
+        stub: cells between the port and the node.
+        point: where the route starts, on the track if the port is wide enough.
+        side: -1 or 1 if the route is too close to that neighbor track, else 0.
+    """
+    d = _direction(port)
+    ux, uy = DIRECTIONS[d]
+    nx, ny = grid.shape
+    i, j = grid.to_cell(port.midpoint)
+
+    # slide along the port to the track
+    axis = 1 - d % 2
+    point = np.array(port.midpoint, dtype=float)
+    offset = grid.to_point((i, j))[axis] - point[axis]
+    slide = min(abs(offset), max(port.width - width, 0) / 2)
+    point[axis] += math.copysign(slide, offset)
+    error = point[axis] - grid.to_point((i, j))[axis]
+    side = int(np.sign(error)) if abs(error) > slack + 1e-6 else 0
+
+    stub = []
+    for _ in range(max_cells):
+        i, j = i + ux, j + uy
+        if not (0 <= i < nx and 0 <= j < ny):
+            break
+        cell = i * ny + j
+        if not grid.blocked[i, j]:
+            layer = HORIZONTAL if d % 2 == 0 else VERTICAL
+            return layer * nx * ny + cell, stub, point, side
+        stub.append(cell)
+    raise RouteError(f"No routing space in front of port {port.name!r}")
+
+
+def _get_neighbors(grid: OccupancyGrid, nodes: List[int], side: int) -> List[int]:
+    """Returns the nodes next to a straight run of nodes on one side."""
+    if not side or not nodes:
+        return []
+    nx, ny = grid.shape
+    ncells = nx * ny
+    layer = nodes[0] // ncells
+    neighbors = []
+    for node in nodes:
+        i, j = divmod(node % ncells, ny)
+        if layer == HORIZONTAL:
+            j += side
+        else:
+            i += side
+        if 0 <= i < nx and 0 <= j < ny:
+            neighbors.append(layer * ncells + i * ny + j)
+    return neighbors
+
+
+def _get_runs(path: List[int], ncells: int) -> Tuple[List[int], List[int]]:
+    """Returns the first and last straight runs of the path."""
+    layers = [node // ncells for node in path]
+    first = next((k for k, layer in enumerate(layers) if layer != layers[0]), None)
+    last = next(
+        (k for k, layer in enumerate(reversed(layers)) if layer != layers[-1]), None
+    )
+    if first is None:
+        return path, path
+    return path[:first], path[len(path) - last :]
+
+
+def _get_waypoints(
+    grid: OccupancyGrid,
+    path: List[int],
+    p1: np.ndarray,
+    p2: np.ndarray,
+    axis1: int,
+    axis2: int,
+) -> np.ndarray:
+    """Returns waypoints from p1 to p2 with a corner at each layer change.
+
+    Args:
+        grid: routing grid.
+        path: nodes.
+        p1: start point.
+        p2: end point.
+        axis1: 0 if the route starts horizontal, 1 if vertical.
+        axis2: 0 if the route ends horizontal, 1 if vertical.
+    """
+    ncells = grid.shape[0] * grid.shape[1]
+    ny = grid.shape[1]
+    corners = [
+        grid.to_point(divmod(node % ncells, ny))
+        for node, next_node in zip(path, path[1:])
+        if node // ncells != next_node // ncells
+    ]
+
+    if not corners:
+        if np.isclose(p1[1 - axis1], p2[1 - axis1]):
+            return np.array([p1, p2])
+        # ports snapped to the same track: jog in the middle
+        middle = (p1[axis1] + p2[axis1]) / 2
+        corner1, corner2 = p1.copy(), p2.copy()
+        corner1[axis1] = corner2[axis1] = middle
+        return np.array([p1, corner1, corner2, p2])
+
+    # align the first and last segments with the ports
+    corners[0][1 - axis1] = p1[1 - axis1]
+    corners[-1][1 - axis2] = p2[1 - axis2]
+    return np.array([p1] + corners + [p2])
+
+
+def get_routes_pathfinder(
+    component: Component,
+    ports1: List[Port],
+    ports2: List[Port],
+    spacing: Optional[float] = None,
+    pitch: Optional[float] = None,
+    avoid_layers: Optional[Layers] = None,
+    bend: ComponentSpec = wire_corner,
+    cross_section: CrossSectionSpec = metal3,
+    corner_cost: float = 2.0,
+    max_iterations: int = 30,
+    present_factor: float = 0.5,
+    present_factor_multiplier: float = 1.5,
+    history_factor: float = 1.0,
+    **kwargs,
+) -> List[Route]:
+    """Returns routes between ports1 and ports2 negotiating the shared tracks.
+
+    Args:
+        component: with the obstacles (usually the parent of the ports).
+        ports1: start ports.
+        ports2: end ports.
+        spacing: minimum spacing between wires. Defaults to the wire width.
+        pitch: track pitch. Defaults to width + spacing.
+        avoid_layers: layers to avoid. None avoids all the component layers.
+        bend: corner spec.
+        cross_section: spec or list of (spec, orientations) for two layers.
+        corner_cost: extra cost of a corner or via (tracks).
+        max_iterations: rip up and reroute iterations before raising RouteError.
+        present_factor: initial cost of sharing a track with another net.
+        present_factor_multiplier: present_factor growth for each iteration.
+        history_factor: cost added to a track each iteration that it is shared.
+        kwargs: cross_section settings.
+
+    .. plot::
+        :include-source:
+
+        import gdsfactory as gf
+
+        c = gf.Component("get_routes_pathfinder")
+        pads1 = c << gf.components.pad_array(columns=4, orientation=90)
+        pads2 = c << gf.components.pad_array(columns=4, orientation=270)
+        pads2.move((300, 500))
+
+        ports1 = list(pads1.ports.values())
+        ports2 = list(pads2.ports.values())
+        routes = gf.routing.get_routes_pathfinder(c, ports1, ports2)
+        for route in routes:
+            c.add(route.references)
+        c.plot()
+
+    """
+    if len(ports1) != len(ports2):
+        raise ValueError(f"ports1={len(ports1)} and ports2={len(ports2)} must be equal")
+    if not ports1:
+        return []
+
+    multilayer = isinstance(cross_section, list)
+    cross_sections = (
+        [gf.get_cross_section(x, **kwargs) for x, _ in cross_section]
+        if multilayer
+        else [gf.get_cross_section(cross_section, **kwargs)]
+    )
+    width = max(x.width for x in cross_sections)
+    spacing = width if spacing is None else spacing
+    pitch = pitch or width + spacing
+
+    # align the tracks with the first port
+    (xmin, ymin), (xmax, ymax) = component.bbox
+    x0, y0 = ports1[0].midpoint
+    extension = 2 * pitch + spacing
+    xmin = x0 - pitch * math.ceil((x0 - xmin + extension) / pitch)
+    ymin = y0 - pitch * math.ceil((y0 - ymin + extension) / pitch)
+    grid = OccupancyGrid(
+        bbox=((xmin, ymin), (xmax + extension, ymax + extension)), resolution=pitch
+    )
+    grid.add_polygons(
+        (points for _, points in component.iter_polygons(layers=avoid_layers)),
+        margin=spacing + width / 2,
+    )
+
+    slack = pitch - width - spacing
+    terminals = [
+        [_get_terminal(grid, port, width=width, slack=slack) for port in ports]
+        for ports in zip(ports1, ports2)
+    ]
+    blocked = grid.blocked.ravel()
+    for terminal1, terminal2 in terminals:
+        blocked[terminal1[1] + terminal2[1]] += 1
+
+    graph = RoutingGraph(grid, corner_cost=corner_cost, multilayer=multilayer)
+    resources = graph.resources
+    ncells = graph.ncells
+    occupancy = np.zeros(resources.max() + 1, dtype=int)
+    history = np.zeros(resources.max() + 1)
+
+    # each net always uses its terminals and the tracks too close to its stubs
+    fixed_resources = []
+    for terminal1, terminal2 in terminals:
+        nodes = [terminal1[0], terminal2[0]]
+        for node, stub, _, side in (terminal1, terminal2):
+            layer = node // ncells
+            nodes += _get_neighbors(grid, [layer * ncells + c for c in stub], side)
+        fixed_resources.append(np.unique(resources[nodes]))
+    net_resources = list(fixed_resources)
+    for net_resource in net_resources:
+        occupancy[net_resource] += 1
+
+    paths: List[List[int]] = [[] for _ in terminals]
+    nets = list(range(len(terminals)))
+    for _ in range(max_iterations):
+        for net in nets:
+            terminal1, terminal2 = terminals[net]
+            occupancy[net_resources[net]] -= 1
+            cost = ((1 + history) * (1 + present_factor * occupancy))[resources]
+            # the previous path bounds the search
+            limit = (
+                graph.get_cost(cost, paths[net]) * (1 + 1e-9) + 1e-9
+                if paths[net]
+                else np.inf
+            )
+            path = graph.shortest_path(
+                cost,
+                terminal1[0],
+                terminal2[0],
+                limit=limit,
+            )
+            if not path:
+                raise RouteError(
+                    f"No route found from {ports1[net].name!r} {ports1[net].midpoint} "
+                    f"to {ports2[net].name!r} {ports2[net].midpoint}"
+                )
+            paths[net] = path
+            first, last = _get_runs(path, ncells)
+            nodes = (
+                path
+                + _get_neighbors(grid, first, terminal1[3])
+                + _get_neighbors(grid, last, terminal2[3])
+            )
+            net_resources[net] = np.union1d(resources[nodes], fixed_resources[net])
+            occupancy[net_resources[net]] += 1
+
+        overused = occupancy > 1
+        if not overused.any():
+            break
+        history[overused] += history_factor * (occupancy[overused] - 1)
+        present_factor *= present_factor_multiplier
+        # only rip up and reroute the nets that share tracks
+        nets = [
+            net for net in range(len(terminals)) if overused[net_resources[net]].any()
+        ]
+    else:
+        names = [ports1[net].name for net in nets]
+        raise RouteError(
+            f"Nets starting at {names} still share tracks after "
+            f"{max_iterations} iterations"
+        )
+
+    return [
+        get_route_from_waypoints(
+            _get_waypoints(
+                grid,
+                path,
+                p1=terminal1[2],
+                p2=terminal2[2],
+                axis1=_direction(port1) % 2,
+                axis2=_direction(port2) % 2,
+            ),
+            bend=bend,
+            cross_section=cross_section,
+            **kwargs,
+        )
+        for path, (terminal1, terminal2), port1, port2 in zip(
+            paths, terminals, ports1, ports2
+        )
+    ]
+
+
+get_routes_pathfinder_multilayer = gf.partial(
+    get_routes_pathfinder,
+    bend=via_corner,
+    cross_section=[(metal2, (0, 180)), (metal3, (90, 270))],
+)
+
+
+def _get_spacing(routes: List[Route]) -> float:
+    """Returns minimum distance between two routes on the same layer."""
+    from shapely.geometry import Polygon
+    from shapely.ops import unary_union
+
+    shapes = []
+    for route in routes:
+        polygons = {}
+        for reference in route.references:
+            for layer, points in reference.get_polygons(by_spec=True).items():
+                polygons.setdefault(layer, []).extend(Polygon(p) for p in points)
+        shapes.append({layer: unary_union(p) for layer, p in polygons.items()})
+
+    spacing = np.inf
+    for k, shapes1 in enumerate(shapes):
+        for shapes2 in shapes[k + 1 :]:
+            for layer in shapes1.keys() & shapes2.keys():
+                spacing = min(spacing, shapes1[layer].distance(shapes2[layer]))
+    return spacing
+
+
+def test_get_routes_pathfinder() -> None:
+    c = gf.Component("test_get_routes_pathfinder")
+    pads1 = c << gf.components.pad_array(columns=4, orientation=90)
+    pads2 = c << gf.components.pad_array(columns=4, orientation=270)
+    pads2.move((300, 600))
+    ports1 = list(pads1.ports.values())
+    ports2 = list(pads2.ports.values())
+
+    routes = get_routes_pathfinder(c, ports1, ports2)
+    assert len(routes) == 4
+    assert _get_spacing(routes) >= 10
+
+    # all nets cross, so they need two layers
+    routes = get_routes_pathfinder_multilayer(c, ports1, ports2[::-1])
+    assert len(routes) == 4
+    assert _get_spacing(routes) >= 10
+
+
+if __name__ == "__main__":
+    c = gf.Component("get_routes_pathfinder")
+    pads1 = c << gf.components.pad_array(columns=4, orientation=90)
+    pads2 = c << gf.components.pad_array(columns=4, orientation=270)
+    pads2.move((300, 500))
+
+    ports1 = list(pads1.ports.values())
+    ports2 = list(pads2.ports.values())[::-1]
+    routes = get_routes_pathfinder_multilayer(c, ports1, ports2)
+    for route in routes:
+        c.add(route.references)
+    c.show()
@@ -1,3 +1,4 @@
+from collections.abc import Mapping
 from typing import Dict, List, Union
 
 import gdsfactory as gf
@@ -19,7 +20,7 @@ def get_routes_straight(
         straight: function for straight
         **kwargs: waveguide settings
     """
-    ports = list(ports.values()) if isinstance(ports, dict) else ports
+    ports = list(ports.values()) if isinstance(ports, Mapping) else ports
     straight = straight(**kwargs)
     references = [straight.ref() for _ in ports]
     references = [ref.connect("o1", port) for port, ref in zip(ports, references)]
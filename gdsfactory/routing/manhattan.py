@@ -1,6 +1,8 @@
+import contextlib
+import threading
 import uuid
 import warnings
-from typing import Callable, Dict, List, Optional, Tuple, Union
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 
 import gdspy
 import numpy as np
@@ -24,6 +26,7 @@ from gdsfactory.types import (
     Coordinates,
     CrossSection,
     CrossSectionSpec,
+    Floats,
     Layer,
     Layers,
     MultiCrossSectionAngleSpec,
@@ -36,6 +39,9 @@ RAD2DEG = 1 / DEG2RAD
 
 O2D = {0: "East", 180: "West", 90: "North", 270: "South"}
 
+# batches with fewer routes use the scalar route generator (faster for a few routes)
+MIN_BATCH_SIZE = 16
+
 
 class RouteWarning(UserWarning):
     pass
@@ -45,6 +51,54 @@ class RouteError(ValueError):
     pass
 
 
+_route_cache = threading.local()
+
+
+@contextlib.contextmanager
+def route_cache() -> Iterator[Dict[Any, Any]]:
+    """Reuses the cross_sections, bends, tapers and straights resolved by \
+    round_corners inside the context (or in the decorated function).
+
+    Routing a bundle resolves the same specs for every route and the same
+    straight for every segment with the same (snapped) length, so inside
+    the context each one is only resolved once. Nested contexts share the
+    outermost cache.
+    """
+    cache = getattr(_route_cache, "cache", None)
+    if cache is not None:
+        yield cache
+        return
+    _route_cache.cache = {}
+    try:
+        yield _route_cache.cache
+    finally:
+        _route_cache.cache = None
+
+
+def _get_key(value) -> Any:
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return ("id", id(value))
+
+
+def _cached(function: Callable, *args, **kwargs) -> Any:
+    """Returns function(*args, **kwargs), cached inside route_cache."""
+    cache = getattr(_route_cache, "cache", None)
+    if cache is None:
+        return function(*args, **kwargs)
+    key = (
+        function,
+        tuple(_get_key(arg) for arg in args),
+        tuple(sorted((name, _get_key(value)) for name, value in kwargs.items())),
+    )
+    if key not in cache:
+        # keep the arguments alive so their ids are not reused
+        cache[key] = (args, kwargs, function(*args, **kwargs))
+    return cache[key][2]
+
+
 def sign(x: float) -> int:
     return -1 if x < 0 else 1
 
@@ -150,6 +204,11 @@ def gen_sref(
     return ref
 
 
+def _isclose(a: float, b: float) -> bool:
+    """Same as np.isclose for two floats."""
+    return abs(a - b) <= 1e-8 + 1e-5 * abs(b)
+
+
 def _is_vertical(p0: ndarray, p1: ndarray) -> bool_:
     return np.abs(p0[0] - p1[0]) < TOLERANCE
 
@@ -413,6 +472,212 @@ def _generate_route_manhattan_points(
     return points
 
 
+def _per_route(value: Union[float, Floats], n: int) -> List[float]:
+    """Returns a list with one value per route."""
+    if np.ndim(value):
+        if len(value) != n:
+            raise ValueError(f"Got {len(value)} values for {n} routes")
+        return [float(v) for v in value]
+    return [float(value)] * n
+
+
+def _rotation_matrices(angles_deg: ndarray) -> ndarray:
+    c = np.cos(DEG2RAD * angles_deg)
+    s = np.sin(DEG2RAD * angles_deg)
+    return np.stack([np.stack([c, s], axis=-1), np.stack([-s, c], axis=-1)], axis=-2)
+
+
+def _generate_route_manhattan_points_batch(
+    input_ports: List[Port],
+    output_ports: List[Port],
+    bs1: float,
+    bs2: float,
+    start_straight_length: Union[float, Floats] = 0.01,
+    end_straight_length: Union[float, Floats] = 0.01,
+    min_straight_length: Union[float, Floats] = 0.01,
+) -> List[ndarray]:
+    """Returns the points of the routes between N pairs of ports.
+
+    Same as `_generate_route_manhattan_points` for each pair but all the
+    routes advance one waypoint at a time with array operations.
+
+    Args:
+        input_ports: N input ports.
+        output_ports: N output ports.
+        bs1: bend size.
+        bs2: bend size.
+        start_straight_length: float or one per route.
+        end_straight_length: float or one per route.
+        min_straight_length: float or one per route.
+    """
+    n = len(input_ports)
+    if n != len(output_ports):
+        raise ValueError(
+            f"input_ports={len(input_ports)} and output_ports={len(output_ports)} "
+            "must be equal"
+        )
+    start_straight_lengths = _per_route(start_straight_length, n)
+    end_straight_lengths = _per_route(end_straight_length, n)
+    min_straight_lengths = _per_route(min_straight_length, n)
+    if n < MIN_BATCH_SIZE:
+        return [
+            _generate_route_manhattan_points(
+                input_ports[i],
+                output_ports[i],
+                bs1,
+                bs2,
+                start_straight_lengths[i],
+                end_straight_lengths[i],
+                min_straight_lengths[i],
+            )
+            for i in range(n)
+        ]
+
+    threshold = TOLERANCE
+    routes: List[Optional[ndarray]] = [None] * n
+
+    rows = []
+    for i, (input_port, output_port) in enumerate(zip(input_ports, output_ports)):
+        if output_port.orientation is None and input_port.orientation is None:
+            x0, y0 = input_port.midpoint
+            x2, y2 = output_port.midpoint
+            routes[i] = np.array([input_port.midpoint, (x0, y2), output_port.midpoint])
+        elif input_port.orientation is None:
+            raise ValueError("input_port orientation is None")
+        elif output_port.orientation is None:
+            raise ValueError("output_port orientation is None")
+        else:
+            rows.append(i)
+    if not rows:
+        return routes
+
+    # transform I/O to the case where output is at (0, 0) pointing east (180)
+    p_input = np.array([input_ports[i].midpoint for i in rows], dtype=float)
+    p_output = np.array([output_ports[i].midpoint for i in rows], dtype=float)
+    bend_orientation = np.array(
+        [180 - output_ports[i].orientation for i in rows], dtype=float
+    )
+    rotation = _rotation_matrices(bend_orientation)
+    pts_io = np.stack([p_input, p_output], axis=1) - p_output[:, None]
+    pts_io = pts_io @ rotation
+    p = pts_io[:, 0, :].copy()
+    p_end = pts_io[:, 1, :]
+
+    a = (
+        np.array([input_ports[i].orientation for i in rows], dtype=float)
+        + bend_orientation
+    ).astype(int) % 360
+
+    start = np.array(start_straight_lengths)[rows]
+    end = np.array(end_straight_lengths)[rows]
+    min_length = np.array(min_straight_lengths)[rows]
+    s = start.copy()
+
+    max_count = 40
+    m = len(rows)
+    points = np.full((m, 2 * max_count + 2, 2), np.nan)
+    points[:, 0] = p
+    n_points = np.ones(m, dtype=int)
+    active = np.ones(m, dtype=bool)
+
+    def _append(mask: ndarray, values: ndarray) -> None:
+        idx = np.flatnonzero(mask)
+        points[idx, n_points[idx]] = values[idx]
+        n_points[idx] += 1
+
+    count = 0
+    while active.any():
+        count += 1
+        if count > max_count:
+            i = rows[int(np.flatnonzero(active)[0])]
+            raise AttributeError(
+                f"Too many iterations for in {input_ports[i]} -> out {output_ports[i]}"
+            )
+        x, y = p[:, 0].copy(), p[:, 1].copy()
+        sigp = np.sign(y)
+        sigp[sigp == 0] = 1
+        a_mod = a % 360
+        e = end
+        ms = min_length
+
+        # same directions
+        same = active & (a_mod == 0)
+        reached = same & (np.abs(y) < threshold) & (x <= threshold)
+        left = same & ~reached
+        s_bend = left & (
+            (x + (bs1 + bs2 + e + s) < threshold)
+            & (np.abs(y) - (bs1 + bs2 + ms) > -threshold)
+        )
+        left &= ~s_bend
+        aside = left & (x + (2 * bs1 + 2 * bs2 + e + s + ms) < threshold)
+        left &= ~aside
+        far = left & (np.abs(y) - (2 * bs1 + 2 * bs2 + 2 * ms) > -threshold)
+        left &= ~far
+        p[s_bend, 0] = (-e - bs2)[s_bend]
+        moved = aside | far | left
+        p[moved, 0] = (x + s + bs1)[moved]
+        a = np.where(s_bend | aside | far, -sigp * 90, a).astype(int)
+        a = np.where(left, sigp * 90, a).astype(int)
+
+        # opposite directions
+        opposite = active & (a_mod == 180)
+        u_turn = opposite & (np.abs(y) - (bs1 + bs2 + ms) > -threshold)
+        turn = opposite & ~u_turn
+        p[u_turn, 0] = (np.minimum(x - s, -e) - bs2)[u_turn]
+        p[turn, 0] = np.minimum(x - s - bs1, -e - ms - 2 * bs1 - bs2)[turn]
+        a = np.where(opposite, -sigp * 90, a).astype(int)
+
+        # perpendicular directions
+        perpendicular = active & (a_mod % 180 == 90)
+        siga = -np.sign(a_mod - 180)
+        siga[siga == 0] = 1
+        one_bend = perpendicular & (
+            ((-y * siga) - (s + bs2) > -threshold) & (-x - (e + bs2) > -threshold)
+        )
+        left = perpendicular & ~one_bend
+        west = left & ((y * siga) <= threshold) & (x + (e + bs1) > -threshold)
+        left &= ~west
+        up = left & (-x - (e + 2 * bs1 + bs2 + ms) > -threshold)
+        left &= ~up
+        s_bend_v = left & (-x - (e + bs2) > -threshold)
+        left &= ~s_bend_v
+
+        p[one_bend, 1] = 0
+        # go to the west, and then turn upward. This will sometimes result in
+        # too sharp bends, but there is no avoiding this!
+        _y = np.minimum(
+            np.maximum(np.minimum(ms, 0.5 * np.abs(y)), np.abs(y) - s - bs1),
+            bs1 + bs2 + ms,
+        )
+        if count == 1:  # take care of the start_straight case
+            p[west, 1] = (-sigp * np.maximum(start, _y))[west]
+        else:
+            p[west, 1] = (sigp * _y)[west]
+        p[up, 1] = (siga * np.maximum(y * siga + s + bs1, bs1 + bs2 + ms))[up]
+        # make vertical S-bend to get sufficient room for movement
+        y_s_bend = y + siga * (bs2 + s)
+        _append(s_bend_v, np.stack([x, y_s_bend], axis=-1))
+        p[s_bend_v, 0] = np.minimum(x - bs1 + bs2 + ms, -2 * bs1 - bs2 - e - ms)[
+            s_bend_v
+        ]
+        p[s_bend_v, 1] = y_s_bend[s_bend_v]
+        # no viable solution for this case. May result in crossed straights
+        p[left, 1] = (y + sigp * (s + bs1))[left]
+        a = np.where(one_bend | up, 0, a)
+        a = np.where(west | left, 180, a)
+
+        _append(reached, p_end)
+        active &= ~reached
+        _append(active, p)
+        s = ms + bs1
+
+    # transform back to the original coordinates
+    points = points @ _rotation_matrices(-bend_orientation) + p_output[:, None]
+    for j, i in enumerate(rows):
+        routes[i] = points[j, : n_points[j]]
+    return routes
+
+
 def _get_bend_reference_parameters(
     p0: ndarray,
     p1: ndarray,
@@ -467,7 +732,9 @@ def _get_bend_reference_parameters(
         (False, -1, -1): (270, True),  # H R270 + vertical mirror
     }
 
-    b1, b2 = [p.midpoint for p in _get_bend_ports(bend=bend_cell, layer=port_layer)]
+    b1, b2 = [
+        p.midpoint for p in _cached(_get_bend_ports, bend=bend_cell, layer=port_layer)
+    ]
 
     bsx = b2[0] - b1[0]
     bsy = b2[1] - b1[1]
@@ -572,6 +839,7 @@ def get_route_error(
     return Route(references=references, ports=[port1, port2], length=-1, labels=labels)
 
 
+@route_cache()
 def round_corners(
     points: Coordinates,
     straight: ComponentSpec = straight_function,
@@ -609,10 +877,13 @@ def round_corners(
     """
     multi_cross_section = isinstance(cross_section, list)
     if multi_cross_section:
-        x = [gf.get_cross_section(xsection[0], **kwargs) for xsection in cross_section]
+        x = [
+            _cached(gf.get_cross_section, xsection[0], **kwargs)
+            for xsection in cross_section
+        ]
         layer = [_x.layer for _x in x]
     else:
-        x = gf.get_cross_section(cross_section, **kwargs)
+        x = _cached(gf.get_cross_section, cross_section, **kwargs)
         layer = x.layer
 
     points = (
@@ -624,7 +895,7 @@ def round_corners(
     bend90 = (
         bend
         if isinstance(bend, Component)
-        else gf.get_component(bend, cross_section=cross_section, **kwargs)
+        else _cached(gf.get_component, bend, cross_section=cross_section, **kwargs)
     )
 
     # bsx = bsy = _get_bend_size(bend90)
@@ -647,14 +918,15 @@ def round_corners(
     if isinstance(cross_section, list):
         taper = None
     elif taper is None:
-        taper = taper_function(
+        taper = _cached(
+            taper_function,
             cross_section=cross_section,
             width1=width,
             width2=width_wide,
             length=taper_length,
         )
     elif not isinstance(taper, Component):
-        taper = gf.get_component(taper, cross_section=cross_section, **kwargs)
+        taper = _cached(gf.get_component, taper, cross_section=cross_section, **kwargs)
 
     # If there is a taper, make sure its length is known
     if taper and isinstance(taper, Component):
@@ -699,7 +971,7 @@ def round_corners(
 
     try:
         pname_west, pname_north = [
-            p.name for p in _get_bend_ports(bend=bend90, layer=layer)
+            p.name for p in _cached(_get_bend_ports, bend=bend90, layer=layer)
         ]
     except ValueError as exc:
         raise ValueError(
@@ -726,14 +998,14 @@ def round_corners(
             matching_ports = [
                 port
                 for port in bend_ref.ports.values()
-                if np.isclose(port.x, points[i][0])
+                if _isclose(port.x, points[i][0])
             ]
 
         if abs(dy_points) < TOLERANCE:
             matching_ports = [
                 port
                 for port in bend_ref.ports.values()
-                if np.isclose(port.y, points[i][1])
+                if _isclose(port.y, points[i][1])
             ]
 
         if matching_ports:
@@ -809,7 +1081,7 @@ def round_corners(
                     break
         else:
             xsection = cross_section
-        x = gf.get_cross_section(xsection, **kwargs)
+        x = _cached(gf.get_cross_section, xsection, **kwargs)
 
         with_taper = False
         # wg_width = list(bend90.ports.values())[0].width
@@ -817,7 +1089,8 @@ def round_corners(
         total_length += length
 
         if isinstance(cross_section, list):
-            wg = gf.get_component(
+            wg = _cached(
+                gf.get_component,
                 straight_fall_back_no_taper,
                 length=length,
                 cross_section=xsection,
@@ -830,7 +1103,7 @@ def round_corners(
             taper_origin = straight_origin
 
             pname_west, pname_east = [
-                p.name for p in _get_straight_ports(taper, layer=x.layer)
+                p.name for p in _cached(_get_straight_ports, taper, layer=x.layer)
             ]
             taper_ref = taper.ref(
                 position=taper_origin, port_id=pname_west, rotation=angle
@@ -847,14 +1120,18 @@ def round_corners(
             kwargs_wide.update(width=width_wide)
 
             if callable(cross_section):
-                cross_section_wide = gf.partial(cross_section, **kwargs_wide)
+                cross_section_wide = _cached(gf.partial, cross_section, **kwargs_wide)
             else:
-                cross_section_wide = cross_section.get_copy(width=width_wide)
-            wg = gf.get_component(
-                straight, length=length, cross_section=cross_section_wide
+                cross_section_wide = _cached(cross_section.get_copy, width=width_wide)
+            wg = _cached(
+                gf.get_component,
+                straight,
+                length=length,
+                cross_section=cross_section_wide,
             )
         else:
-            wg = gf.get_component(
+            wg = _cached(
+                gf.get_component,
                 straight_fall_back_no_taper,
                 length=length,
                 cross_section=xsection,
@@ -862,7 +1139,9 @@ def round_corners(
             )
 
         if straight_ports is None:
-            straight_ports = [p.name for p in _get_straight_ports(wg, layer=x.layer)]
+            straight_ports = [
+                p.name for p in _cached(_get_straight_ports, wg, layer=x.layer)
+            ]
         pname_west, pname_east = straight_ports
 
         wg_ref = wg.ref()
@@ -884,7 +1163,7 @@ def round_corners(
 
             taper_origin = wg_ref.ports[pname_east]
             pname_west, pname_east = [
-                p.name for p in _get_straight_ports(taper, layer=x.layer)
+                p.name for p in _cached(_get_straight_ports, taper, layer=x.layer)
             ]
 
             taper_ref = taper.ref(
@@ -939,6 +1218,51 @@ def generate_manhattan_waypoints(
         cross_section: spec.
         kwargs: cross_section settings.
 
+    """
+    return generate_manhattan_waypoints_batch(
+        [input_port],
+        [output_port],
+        start_straight_length=start_straight_length,
+        end_straight_length=end_straight_length,
+        min_straight_length=min_straight_length,
+        bend=bend,
+        cross_section=cross_section,
+        **kwargs,
+    )[0]
+
+
+def _or_default(value, default: float):
+    """Returns `value or default` for a value or a sequence of values."""
+    if np.ndim(value):
+        return [v or default for v in value]
+    return value or default
+
+
+def generate_manhattan_waypoints_batch(
+    input_ports: List[Port],
+    output_ports: List[Port],
+    start_straight_length: Union[None, float, Floats] = None,
+    end_straight_length: Union[None, float, Floats] = None,
+    min_straight_length: Union[None, float, Floats] = None,
+    bend: ComponentSpec = bend_euler,
+    cross_section: Union[CrossSectionSpec, MultiCrossSectionAngleSpec] = strip,
+    **kwargs,
+) -> List[ndarray]:
+    """Return waypoints for the Manhattan routes between pairs of ports.
+
+    Same as `generate_manhattan_waypoints` for each pair of ports, but
+    computes all the routes at once with numpy arrays.
+
+    Args:
+        input_ports: source ports.
+        output_ports: destination ports.
+        start_straight_length: Optional start length (float or one per route).
+        end_straight_length: in um (float or one per route).
+        min_straight_length: in um (float or one per route).
+        bend: bend spec.
+        cross_section: spec.
+        kwargs: cross_section settings.
+
     """
     if "straight" in kwargs.keys():
         _ = kwargs.pop("straight")
@@ -950,27 +1274,20 @@ def generate_manhattan_waypoints(
     )
     if isinstance(cross_section, list):
         x = [gf.get_cross_section(xsection[0], **kwargs) for xsection in cross_section]
-        start_straight_length = start_straight_length or min(
-            [_x.min_length for _x in x]
-        )
-        end_straight_length = end_straight_length or min([_x.min_length for _x in x])
-        min_straight_length = min_straight_length or min([_x.min_length for _x in x])
+        min_length = min(_x.min_length for _x in x)
     else:
         x = gf.get_cross_section(cross_section, **kwargs)
-        start_straight_length = start_straight_length or x.min_length
-        end_straight_length = end_straight_length or x.min_length
-        min_straight_length = min_straight_length or x.min_length
+        min_length = x.min_length
     bsx = bsy = _get_bend_size(bend90)
-    points = _generate_route_manhattan_points(
-        input_port,
-        output_port,
+    return _generate_route_manhattan_points_batch(
+        input_ports,
+        output_ports,
         bsx,
         bsy,
-        start_straight_length,
-        end_straight_length,
-        min_straight_length,
+        _or_default(start_straight_length, min_length),
+        _or_default(end_straight_length, min_length),
+        _or_default(min_straight_length, min_length),
     )
-    return points
 
 
 def _get_bend_size(bend90: Component):
@@ -1028,6 +1345,47 @@ def route_manhattan(
     )
 
 
+def test_generate_route_manhattan_points_batch() -> None:
+    rng = np.random.default_rng(0)
+    orientations = rng.choice([0, 90, 180, 270], size=(200, 2))
+    midpoints = np.round(rng.normal(size=(200, 2, 2)) * 50, 3)
+    ports1 = [
+        Port(f"i{i}", midpoint=m[0], width=0.5, orientation=o[0], layer=(1, 0))
+        for i, (m, o) in enumerate(zip(midpoints, orientations))
+    ]
+    ports2 = [
+        Port(f"o{i}", midpoint=m[1], width=0.5, orientation=o[1], layer=(1, 0))
+        for i, (m, o) in enumerate(zip(midpoints, orientations))
+    ]
+    end_straight_lengths = rng.choice([0.01, 1, 15], size=200)
+
+    routes = _generate_route_manhattan_points_batch(
+        ports1, ports2, 10, 10, 0.01, end_straight_lengths, 0.01
+    )
+    for port1, port2, end_straight_length, points in zip(
+        ports1, ports2, end_straight_lengths, routes
+    ):
+        expected = _generate_route_manhattan_points(
+            port1, port2, 10, 10, 0.01, end_straight_length, 0.01
+        )
+        assert np.array_equal(points, expected)
+
+
+def test_route_cache() -> None:
+    with route_cache() as cache:
+        routes = [
+            round_corners([(0, 10 * i), (100, 10 * i), (100, 10 * i + 50)])
+            for i in range(10)
+        ]
+        n_entries = len(cache)
+        round_corners([(0, 0), (100, 0), (100, 50)])
+        assert len(cache) == n_entries
+
+    straights = {route.references[1].parent for route in routes}
+    assert len(straights) == 1
+    assert _route_cache.cache is None
+
+
 def test_manhattan() -> Component:
     top_cell = Component()
 
@@ -1,3 +1,4 @@
+from collections.abc import Mapping
 from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import numpy as np
@@ -58,7 +59,7 @@ def route_ports_to_side(
         return [], []
 
     # Accept list of ports, Component or dict of ports
-    if isinstance(ports, dict):
+    if isinstance(ports, Mapping):
         ports = list(ports.values())
 
     elif isinstance(ports, (Component, ComponentReference)):
@@ -0,0 +1,553 @@
+"""Hierarchical spatial index for region queries.
+
+Each cell gets a `CellIndex` with the bounding boxes of its polygons and
+references (as numpy arrays) and the bounding box of each layer, including
+the layers of the cells it references. Indexes are cached per cell and shared
+by all the references to it, so querying a region of a mask only visits the
+polygons and references that overlap the region, transformed through each
+`ComponentReference` (or element of a `CellArray`).
+
+Indexes are invalidated when you `add` or `remove` elements to a Component
+or `move`, `rotate` or `reflect` one of its references. If you change the
+points of a polygon or the origin of a reference directly call
+`invalidate(component)`.
+"""
+import weakref
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+import gdspy
+import numpy as np
+
+Layer = Tuple[int, int]
+
+_INDEX: "weakref.WeakKeyDictionary[gdspy.Cell, CellIndex]" = weakref.WeakKeyDictionary()
+_EPOCH = [0]
+
+
+def invalidate(cell: gdspy.Cell) -> None:
+    """Marks cell index as outdated (and the index of any cell referencing it)."""
+    _INDEX.pop(cell, None)
+    _EPOCH[0] += 1
+
+
+def _layer_key(layers: np.ndarray) -> np.ndarray:
+    return layers[:, 0].astype(np.int64) * 65536 + layers[:, 1]
+
+
+def _transform_bboxes(
+    bboxes: np.ndarray, matrices: np.ndarray, offsets: np.ndarray
+) -> np.ndarray:
+    """Returns (N, 4) bboxes of the transformed (N, 4) bboxes.
+
+    Args:
+        bboxes: (N, 4) xmin, ymin, xmax, ymax.
+        matrices: (N, 2, 2) linear transformations.
+        offsets: (N, 2) translations.
+    """
+    corners = np.stack(
+        [
+            bboxes[:, [0, 1]],
+            bboxes[:, [2, 1]],
+            bboxes[:, [2, 3]],
+            bboxes[:, [0, 3]],
+        ],
+        axis=1,
+    )
+    corners = np.einsum("nij,nkj->nki", matrices, corners) + offsets[:, None, :]
+    return np.concatenate([corners.min(axis=1), corners.max(axis=1)], axis=1)
+
+
+def _transform_bbox(
+    bbox: np.ndarray, matrix: np.ndarray, offset: np.ndarray
+) -> np.ndarray:
+    corners = np.array(
+        [[bbox[0], bbox[1]], [bbox[2], bbox[1]], [bbox[2], bbox[3]], [bbox[0], bbox[3]]]
+    )
+    corners = corners @ matrix.T + offset
+    return np.concatenate([corners.min(axis=0), corners.max(axis=0)])
+
+
+def _overlaps(bboxes: np.ndarray, bbox: np.ndarray) -> np.ndarray:
+    return (
+        (bboxes[:, 0] <= bbox[2])
+        & (bboxes[:, 2] >= bbox[0])
+        & (bboxes[:, 1] <= bbox[3])
+        & (bboxes[:, 3] >= bbox[1])
+    )
+
+
+def _union(bboxes: Iterable[np.ndarray]) -> Optional[np.ndarray]:
+    bboxes = [bbox for bbox in bboxes if bbox is not None and len(bbox)]
+    if not bboxes:
+        return None
+    bboxes = np.vstack(bboxes)
+    return np.concatenate([bboxes[:, :2].min(axis=0), bboxes[:, 2:].max(axis=0)])
+
+
+def _or_nan(bbox: Optional[np.ndarray]) -> np.ndarray:
+    return np.full(4, np.nan) if bbox is None else bbox
+
+
+def _get_reference_transform(reference) -> Tuple[np.ndarray, ...]:
+    """Returns matrix, origin, column and row steps, columns and rows.
+
+    Follows gdspy: magnification, x_reflection, rotation and then origin.
+    CellArray spacing is applied before the reflection and rotation.
+    """
+    angle = np.deg2rad(reference.rotation or 0)
+    c, s = np.cos(angle), np.sin(angle)
+    rotation = np.array([[c, -s], [s, c]])
+    if reference.x_reflection:
+        rotation = rotation @ np.diag([1, -1])
+    magnification = reference.magnification or 1
+    origin = np.zeros(2) if reference.origin is None else np.array(reference.origin)
+
+    if isinstance(reference, gdspy.CellArray):
+        columns, rows = reference.columns, reference.rows
+        step_column = rotation @ np.array([reference.spacing[0], 0])
+        step_row = rotation @ np.array([0, reference.spacing[1]])
+    else:
+        columns, rows = 1, 1
+        step_column = step_row = np.zeros(2)
+    return magnification * rotation, origin, step_column, step_row, columns, rows
+
+
+class CellIndex:
+    """Bounding boxes of the polygons and references of a cell.
+
+    Args:
+        cell: to index.
+    """
+
+    def __init__(self, cell: gdspy.Cell) -> None:
+        polygons: List[np.ndarray] = []
+        layers: List[Tuple[int, int]] = []
+        polygonsets = list(cell.polygons) + [
+            path.to_polygonset() for path in cell.paths
+        ]
+        for polygonset in polygonsets:
+            if polygonset is None:
+                continue
+            for points, layer, datatype in zip(
+                polygonset.polygons, polygonset.layers, polygonset.datatypes
+            ):
+                polygons.append(np.asarray(points))
+                layers.append((int(layer), int(datatype)))
+
+        self.polygons = polygons
+        self.layer_tuples = layers
+        self.layers = np.array(layers, dtype=np.int64).reshape(-1, 2)
+        self.layer_keys = _layer_key(self.layers)
+
+        if polygons:
+            points = np.concatenate(polygons)
+            starts = np.cumsum([0] + [len(p) for p in polygons[:-1]])
+            self.bboxes = np.concatenate(
+                [
+                    np.minimum.reduceat(points, starts),
+                    np.maximum.reduceat(points, starts),
+                ],
+                axis=1,
+            )
+        else:
+            self.bboxes = np.empty((0, 4))
+
+        ports = getattr(cell, "ports", {})
+        if ports:
+            midpoints = np.array([port.midpoint for port in ports.values()])
+            self.ports_bbox = np.concatenate(
+                [midpoints.min(axis=0), midpoints.max(axis=0)]
+            )
+        else:
+            self.ports_bbox = None
+
+        self.ref_positions = [
+            i
+            for i, reference in enumerate(cell.references)
+            if isinstance(reference.ref_cell, gdspy.Cell)
+        ]
+        references = [cell.references[i] for i in self.ref_positions]
+        self.children: List[Tuple[gdspy.Cell, CellIndex]] = []
+        child_indexes: Dict[int, CellIndex] = {}
+        for reference in references:
+            if id(reference.ref_cell) not in child_indexes:
+                index = get_index(reference.ref_cell)
+                child_indexes[id(reference.ref_cell)] = index
+                self.children.append((reference.ref_cell, index))
+
+        self.ref_indexes = [child_indexes[id(r.ref_cell)] for r in references]
+        transforms = [_get_reference_transform(r) for r in references]
+        n = len(references)
+        self.ref_matrices = np.array([t[0] for t in transforms]).reshape(n, 2, 2)
+        self.ref_origins = np.array([t[1] for t in transforms]).reshape(n, 2)
+        self.ref_steps = np.array([t[2:4] for t in transforms]).reshape(n, 2, 2)
+        self.ref_shapes = np.array([t[4:] for t in transforms], dtype=int).reshape(n, 2)
+        self.ref_bboxes = self._get_ref_bboxes(
+            np.array([_or_nan(index.bbox) for index in self.ref_indexes]).reshape(n, 4)
+        )
+
+        # like gdspy, references with non-cardinal rotations use the bbox of the
+        # flattened polygons (the transformed cell bbox is too large)
+        self._ref_layer_bboxes: Dict[int, Dict[Layer, np.ndarray]] = {}
+        for i, reference in enumerate(references):
+            if reference.rotation is not None and reference.rotation % 90 != 0:
+                layer_bboxes = {
+                    layer: _union(
+                        [np.hstack([p.min(axis=0), p.max(axis=0)]) for p in ps]
+                    )
+                    for layer, ps in reference.get_polygons(by_spec=True).items()
+                }
+                self._ref_layer_bboxes[i] = layer_bboxes
+                self.ref_bboxes[i] = _or_nan(_union(layer_bboxes.values()))
+
+        self.ref_ports_bboxes = self._get_ref_bboxes(
+            np.array(
+                [
+                    _or_nan(None if isinstance(r, gdspy.CellArray) else i.ports_bbox)
+                    for i, r in zip(self.ref_indexes, references)
+                ]
+            ).reshape(n, 4)
+        )
+
+        self.bbox = _union(
+            [
+                self.bboxes,
+                self.ref_bboxes[~np.isnan(self.ref_bboxes[:, 0])],
+            ]
+        )
+        self._layer_bboxes: Optional[Dict[Layer, np.ndarray]] = None
+        self._bbox_by_layers: Dict[FrozenSet[Layer], Optional[np.ndarray]] = {}
+        self.epoch = _EPOCH[0]
+
+    def _get_ref_bboxes(self, child_bboxes: np.ndarray) -> np.ndarray:
+        """Returns bboxes of all the references (all the CellArray elements)."""
+        bboxes = _transform_bboxes(child_bboxes, self.ref_matrices, self.ref_origins)
+        last = (self.ref_shapes - 1)[:, :, None] * self.ref_steps
+        bboxes[:, :2] += np.minimum(0, last[:, 0]) + np.minimum(0, last[:, 1])
+        bboxes[:, 2:] += np.maximum(0, last[:, 0]) + np.maximum(0, last[:, 1])
+        return bboxes
+
+    @property
+    def layer_bboxes(self) -> Dict[Layer, np.ndarray]:
+        """Returns {layer: bbox} including the layers of the references."""
+        if self._layer_bboxes is not None:
+            return self._layer_bboxes
+
+        layer_bboxes: Dict[Layer, np.ndarray] = {}
+        for key in np.unique(self.layer_keys):
+            layer = (int(key // 65536), int(key % 65536))
+            layer_bboxes[layer] = _union([self.bboxes[self.layer_keys == key]])
+
+        layers = {layer for index in self.ref_indexes for layer in index.layer_bboxes}
+        for layer in layers:
+            bboxes = self.get_ref_bboxes(layer)
+            bboxes = bboxes[~np.isnan(bboxes[:, 0])]
+            layer_bboxes[layer] = _union([layer_bboxes.get(layer), bboxes])
+
+        self._layer_bboxes = layer_bboxes
+        return layer_bboxes
+
+    def get_ref_bboxes(self, layer: Optional[Layer] = None) -> np.ndarray:
+        """Returns (N, 4) bbox of each reference on a layer (nan without polygons).
+
+        Args:
+            layer: None returns the bboxes of all the layers.
+        """
+        if layer is None:
+            return self.ref_bboxes
+        child_bboxes = np.array(
+            [_or_nan(index.layer_bboxes.get(layer)) for index in self.ref_indexes]
+        ).reshape(-1, 4)
+        bboxes = self._get_ref_bboxes(child_bboxes)
+        for i, ref_layer_bboxes in self._ref_layer_bboxes.items():
+            bboxes[i] = _or_nan(ref_layer_bboxes.get(layer))
+        return bboxes
+
+    def get_bbox(
+        self, layers: Optional[FrozenSet[Layer]] = None
+    ) -> Optional[np.ndarray]:
+        """Returns bbox (xmin, ymin, xmax, ymax) of some layers (None for all)."""
+        if layers is None:
+            return self.bbox
+        if layers not in self._bbox_by_layers:
+            self._bbox_by_layers[layers] = _union(
+                self.layer_bboxes.get(layer) for layer in layers
+            )
+        return self._bbox_by_layers[layers]
+
+
+def get_index(cell: gdspy.Cell) -> CellIndex:
+    """Returns cached CellIndex, rebuilds it if cell or its references changed.
+
+    Locked Components are immutable, so their index is reused without
+    checking the cells they reference.
+    """
+    component = hasattr(cell, "_locked")
+    if component and not cell._bb_valid:
+        # phidl marks cells as changed when moving their polygons
+        invalidate(cell)
+
+    index = _INDEX.get(cell)
+    if index is not None and (
+        index.epoch == _EPOCH[0] or getattr(cell, "_locked", False)
+    ):
+        return index
+    if index is not None and all(
+        get_index(child) is child_index for child, child_index in index.children
+    ):
+        index.epoch = _EPOCH[0]
+        return index
+
+    index = CellIndex(cell)
+    _INDEX[cell] = index
+    if component:
+        cell._bb_valid = True
+    return index
+
+
+def _get_bbox(bbox) -> np.ndarray:
+    bbox = np.asarray(bbox, dtype=float).reshape(-1)
+    if bbox.size != 4:
+        raise ValueError(f"bbox needs ((xmin, ymin), (xmax, ymax)), got {bbox}")
+    return np.concatenate(
+        [np.minimum(bbox[:2], bbox[2:]), np.maximum(bbox[:2], bbox[2:])]
+    )
+
+
+def iter_instances(
+    component: gdspy.Cell,
+    layers: Optional[Iterable[Layer]] = None,
+    bbox=None,
+    depth: Optional[int] = None,
+) -> Iterator[Tuple[List[np.ndarray], List[Layer], np.ndarray, np.ndarray]]:
+    """Yields (polygons, layers, matrix, origin) for each cell instance.
+
+    `polygons` are the arrays stored in the cell (not copies), so the
+    polygons of an instance are `points @ matrix.T + origin`. Instances are
+    visited depth first, in the same order as `get_polygons`.
+
+    Args:
+        component: to iterate.
+        layers: only yield polygons in these layers. None yields all layers.
+        bbox: ((xmin, ymin), (xmax, ymax)) only yields the polygons and
+            instances whose bounding box overlaps bbox. None yields all.
+        depth: how many reference levels to visit. None visits all of them.
+    """
+    bbox = _get_bbox(bbox) if bbox is not None else None
+    layers = frozenset(tuple(layer) for layer in layers) if layers else None
+    layer_keys = (
+        _layer_key(np.array(sorted(layers), dtype=np.int64)) if layers else None
+    )
+
+    stack = [(get_index(component), np.eye(2), np.zeros(2), 0)]
+    while stack:
+        index, matrix, origin, level = stack.pop()
+        local = None
+        if bbox is not None:
+            (a, b), (c, d) = matrix
+            matrix_inv = np.array([[d, -b], [-c, a]]) / (a * d - b * c)
+            local = _transform_bbox(bbox, matrix_inv, -matrix_inv @ origin)
+
+        if not index.polygons:
+            pass
+        elif local is None and layer_keys is None:
+            yield index.polygons, index.layer_tuples, matrix, origin
+        else:
+            mask = np.ones(len(index.polygons), dtype=bool)
+            if local is not None:
+                mask &= _overlaps(index.bboxes, local)
+            if layer_keys is not None:
+                mask &= np.isin(index.layer_keys, layer_keys)
+            hits = np.flatnonzero(mask).tolist()
+            if hits:
+                yield (
+                    [index.polygons[i] for i in hits],
+                    [index.layer_tuples[i] for i in hits],
+                    matrix,
+                    origin,
+                )
+
+        if depth is not None and level >= depth:
+            continue
+
+        if local is not None:
+            refs = np.flatnonzero(_overlaps(index.ref_bboxes, local)).tolist()
+        else:
+            refs = range(len(index.ref_indexes))
+        children = []
+        for i in refs:
+            child = index.ref_indexes[i]
+            child_bbox = child.get_bbox(layers)
+            if child_bbox is None:
+                continue
+            ref_matrix = index.ref_matrices[i]
+            columns, rows = index.ref_shapes[i]
+            if columns == rows == 1:
+                offsets = index.ref_origins[i][None]
+            else:
+                rows_, columns_ = np.meshgrid(np.arange(rows), np.arange(columns))
+                offsets = (
+                    index.ref_origins[i]
+                    + columns_.reshape(-1, 1) * index.ref_steps[i, 0]
+                    + rows_.reshape(-1, 1) * index.ref_steps[i, 1]
+                )
+            if local is not None and (layers or len(offsets) > 1):
+                element_bbox = _transform_bbox(child_bbox, ref_matrix, np.zeros(2))
+                element_bboxes = element_bbox + np.tile(offsets, 2)
+                offsets = offsets[_overlaps(element_bboxes, local)]
+            for offset in offsets:
+                children.append(
+                    (child, matrix @ ref_matrix, matrix @ offset + origin, level + 1)
+                )
+        stack.extend(reversed(children))
+
+
+def iter_polygons(
+    component: gdspy.Cell,
+    layers: Optional[Iterable[Layer]] = None,
+    bbox=None,
+    depth: Optional[int] = None,
+) -> Iterator[Tuple[Layer, np.ndarray]]:
+    """Yields (layer, points) for each polygon, transformed one instance at a time.
+
+    Same polygons as `component.get_polygons(by_spec=True)` without
+    flattening the whole hierarchy in memory.
+
+    Args:
+        component: to iterate.
+        layers: only yield polygons in these layers. None yields all layers.
+        bbox: ((xmin, ymin), (xmax, ymax)) only yields the polygons whose
+            bounding box overlaps bbox. None yields all.
+        depth: how many reference levels to visit. None visits all of them.
+    """
+    bbox = _get_bbox(bbox) if bbox is not None else None
+    for polygons, polygon_layers, matrix, origin in iter_instances(
+        component, layers=layers, bbox=bbox, depth=depth
+    ):
+        (a, b), (c, d) = matrix.tolist()
+        # for manhattan transformations the bbox check of iter_instances is exact
+        check = bbox is not None and abs(a * b) + abs(c * d) > 1e-12
+        if len(polygons) < 8:
+            matrix_t = matrix.T
+            transformed = [polygon @ matrix_t + origin for polygon in polygons]
+        else:
+            points = np.concatenate(polygons) @ matrix.T + origin
+            sizes = np.cumsum([len(polygon) for polygon in polygons[:-1]])
+            transformed = np.split(points, sizes)
+        for layer, points in zip(polygon_layers, transformed):
+            if (
+                check
+                and not _overlaps(
+                    np.concatenate([points.min(axis=0), points.max(axis=0)])[None],
+                    bbox,
+                )[0]
+            ):
+                continue
+            yield layer, points
+
+
+def query_region(
+    component: gdspy.Cell,
+    bbox,
+    layers: Optional[Iterable[Layer]] = None,
+    depth: Optional[int] = None,
+) -> Dict[Layer, List[np.ndarray]]:
+    """Returns polygons that overlap bbox {layer: [polygon points]}.
+
+    Same output as `component.get_polygons(by_spec=True)` but only with the
+    polygons whose bounding box overlaps the region.
+
+    Args:
+        component: to query.
+        bbox: ((xmin, ymin), (xmax, ymax)) region.
+        layers: only return polygons in these layers. None returns all layers.
+        depth: how many reference levels to visit. None visits all of them.
+    """
+    polygons: Dict[Layer, List[np.ndarray]] = {}
+    for layer, points in iter_polygons(
+        component, layers=layers, bbox=_get_bbox(bbox), depth=depth
+    ):
+        polygons.setdefault(layer, []).append(points)
+    return polygons
+
+
+def nearest_ports(
+    component: gdspy.Cell,
+    point: Tuple[float, float],
+    k: int = 1,
+    include_references: bool = False,
+    **kwargs,
+) -> List:
+    """Returns the k ports closest to point, sorted by distance.
+
+    Only gets the ports of the references that can be closer than the k
+    closest ports found so far.
+
+    Args:
+        component: to get the ports from.
+        point: x, y.
+        k: number of ports.
+        include_references: also include the ports of component references.
+
+    Keyword Args:
+        select_ports settings (layer, prefix, orientation, port_type ...).
+    """
+    point = np.asarray(point, dtype=float)
+    ports = list(component.get_ports_list(**kwargs))
+    distances = [float(np.hypot(*(port.midpoint - point))) for port in ports]
+
+    if include_references:
+        index = get_index(component)
+        bboxes = index.ref_ports_bboxes
+        dx = np.maximum.reduce([bboxes[:, 0] - point[0], point[0] - bboxes[:, 2]])
+        dy = np.maximum.reduce([bboxes[:, 1] - point[1], point[1] - bboxes[:, 3]])
+        bbox_distances = np.hypot(np.maximum(dx, 0), np.maximum(dy, 0))
+        bbox_distances[np.isnan(bbox_distances)] = np.inf
+
+        for i in np.argsort(bbox_distances, kind="stable").tolist():
+            if bbox_distances[i] == np.inf or (
+                len(distances) >= k and bbox_distances[i] > sorted(distances)[k - 1]
+            ):
+                break
+            reference = component.references[index.ref_positions[i]]
+            for port in reference.get_ports_list(**kwargs):
+                ports.append(port)
+                distances.append(float(np.hypot(*(port.midpoint - point))))
+
+    order = np.argsort(distances, kind="stable")[:k]
+    return [ports[i] for i in order]
+
+
+def test_query_region() -> None:
+    import gdsfactory as gf
+
+    c = gf.Component("query_region")
+    mzi = gf.components.mzi()
+    ref = c << mzi
+    ref.rotate(90).movex(100)
+    c.add_array(gf.components.pad(), columns=3, rows=2, spacing=(200, 200))
+    bbox = ((-10, -10), (300, 120))
+
+    polygons = query_region(c, bbox)
+    polygons_all = c.get_polygons(by_spec=True)
+    for layer, points_list in polygons_all.items():
+        expected = [
+            p
+            for p in points_list
+            if p[:, 0].min() <= 300
+            and p[:, 0].max() >= -10
+            and p[:, 1].min() <= 120
+            and p[:, 1].max() >= -10
+        ]
+        assert len(polygons.get(layer, [])) == len(expected), layer
+
+    assert set(query_region(c, bbox, layers=[(1, 0)])) == {(1, 0)}
+
+
+if __name__ == "__main__":
+    import gdsfactory as gf
+
+    c = gf.Component("query_region")
+    c.add_array(gf.components.pad(), columns=3, rows=2, spacing=(200, 200))
+    polygons = query_region(c, bbox=((-10, -10), (120, 120)))
+    print({layer: len(points) for layer, points in polygons.items()})
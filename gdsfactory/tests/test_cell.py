@@ -1,3 +1,5 @@
+import importlib
+
 import pytest
 from pydantic import ValidationError
 
@@ -19,6 +21,140 @@ def test_validator_error() -> None:
         _dummy2(length="error")
 
 
+@gf.cell
+def _dummy_parent(length: int = 3) -> gf.Component:
+    c = gf.Component()
+    c << _dummy(length=length)
+    return c
+
+
+def test_cache_limits() -> None:
+    from gdsfactory.cell import CACHE, cache_info, set_cache_limits
+
+    gf.clear_cache()
+    try:
+        set_cache_limits(max_entries=4)
+        parent = _dummy_parent(length=100)
+        child = _dummy(length=100)
+        for length in range(10):
+            _dummy(length=length)
+
+        info = cache_info()
+        assert info["entries"] <= 4, info
+        assert info["evictions"] >= 7, info
+        assert child.name in CACHE, "cell referenced by a cached parent evicted"
+        assert _dummy_parent(length=100) is parent
+        assert _dummy(length=100) is child
+    finally:
+        set_cache_limits()
+        gf.clear_cache()
+
+
+def test_cache_nbytes(monkeypatch) -> None:
+    cell_module = importlib.import_module("gdsfactory.cell")
+
+    gf.clear_cache()
+    try:
+
+        def _fail(component):
+            raise AssertionError("cell size measured without max_bytes")
+
+        with monkeypatch.context() as m:
+            m.setattr(cell_module, "get_component_nbytes", _fail)
+            for length in range(5):
+                _dummy_parent(length=length)
+
+        nbytes = cell_module.get_component_nbytes(_dummy_parent(length=0))
+        cell_module.set_cache_limits(max_bytes=12 * nbytes)
+        for length in range(5, 40):
+            _dummy_parent(length=length)
+        info = cell_module.cache_info()
+        assert 0 < info["nbytes"] <= 12 * nbytes, info
+        assert info["evictions"] > 0, info
+    finally:
+        cell_module.set_cache_limits()
+        gf.clear_cache()
+
+
+def test_cache_hit_fast(monkeypatch) -> None:
+    """Cache hits skip signature inspection and argument serialization."""
+    cell_module = importlib.import_module("gdsfactory.cell")
+    c = gf.components.straight(length=11.1, cross_section="strip")
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("cell name built on a cache hit")
+
+    monkeypatch.setattr(cell_module, "clean_value_name", _fail)
+    monkeypatch.setattr(cell_module, "get_name_short", _fail)
+    assert gf.components.straight(length=11.1, cross_section="strip") is c
+
+
+def test_cache_call_names() -> None:
+    from gdsfactory.cell import CALL_KEYS, CALL_NAMES, set_cache_limits
+
+    gf.clear_cache()
+    try:
+        _dummy(length=1)
+        assert CALL_NAMES and CALL_KEYS
+        gf.clear_cache()
+        assert not CALL_NAMES and not CALL_KEYS
+
+        set_cache_limits(max_entries=4)
+        for length in range(20):
+            _dummy(length=length)
+        assert len(CALL_NAMES) <= 4, len(CALL_NAMES)
+        assert set(CALL_NAMES.values()) <= set(CALL_KEYS)
+    finally:
+        set_cache_limits()
+        gf.clear_cache()
+
+
+def test_cache_hit_name_consistency() -> None:
+    c1 = _dummy(3)
+    assert _dummy(length=3) is c1
+    assert _dummy(length=3.0).name == c1.name
+    assert _dummy(length=True).name != _dummy(length=1).name
+    assert _dummy(length=3, name="_dummy_custom").name == "_dummy_custom"
+    assert _dummy(length=3).name == c1.name
+
+
+def test_cache_disk(tmp_path, monkeypatch) -> None:
+    from gdsfactory.cell_cache import DISK_CACHE
+
+    monkeypatch.setattr(DISK_CACHE, "dirpath", tmp_path)
+    monkeypatch.setattr(DISK_CACHE, "_size", None)
+    DISK_CACHE.reset_counters()
+
+    c1 = _dummy(length=11, cache_disk=True)
+    assert DISK_CACHE.stores == 1
+
+    gf.clear_cache()
+    c2 = _dummy(length=11, cache_disk=True)
+    assert DISK_CACHE.hits == 1
+    assert c2 is not c1
+    assert c2.name == c1.name
+    assert c2.settings.full["length"] == 11
+    assert _dummy(length=11) is c2
+
+
+def test_cache_disk_children(tmp_path, monkeypatch) -> None:
+    from gdsfactory.cell_cache import DISK_CACHE
+
+    monkeypatch.setattr(DISK_CACHE, "dirpath", tmp_path)
+    monkeypatch.setattr(DISK_CACHE, "_size", None)
+
+    _dummy_parent(length=12, cache_disk=True)
+    gf.clear_cache()
+    child = _dummy(length=12)
+    parent = _dummy_parent(length=12, cache_disk=True)
+    assert parent.references[0].parent is child
+
+    c = gf.Component("test_cache_disk_children")
+    c << parent
+    c << child
+    c.write_gds(tmp_path / "top.gds", on_duplicate_cell="error")
+
+
 if __name__ == "__main__":
     # test_raise_error_args()
     test_validator_error()
@@ -0,0 +1,144 @@
+import functools
+import importlib
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import gdsfactory as gf
+
+builds = []
+builds_lock = threading.Lock()
+
+
+@gf.cell
+def _slow_rectangle(width: float = 1.0) -> gf.Component:
+    with builds_lock:
+        builds.append(width)
+    time.sleep(0.05)
+    c = gf.Component()
+    c.add_polygon([(0, 0), (width, 0), (width, 1), (0, 1)], layer=(1, 0))
+    return c
+
+
+@gf.cell
+def _slow_array(width: float = 1.0, columns: int = 3) -> gf.Component:
+    c = gf.Component()
+    c.add_array(_slow_rectangle(width=width), columns=columns, rows=1)
+    return c
+
+
+@gf.cell
+def _with_plain_child(width: float = 1.0) -> gf.Component:
+    child = gf.Component("_plain_child")
+    child.add_polygon([(0, 0), (width, 0), (width, 1), (0, 1)], layer=(1, 0))
+    c = gf.Component()
+    c << child
+    return c
+
+
+def test_threads_build_cell_once() -> None:
+    builds.clear()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(_slow_array, width=2.5) for _ in range(8)]
+        components = [future.result() for future in futures]
+
+    assert builds == [2.5], builds
+    assert all(c is components[0] for c in components)
+
+
+def test_threads_build_different_cells() -> None:
+    widths = [3.1, 3.2, 3.3, 3.4]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        components = list(executor.map(lambda w: _slow_array(width=w), widths))
+    assert len({c.name for c in components}) == len(widths)
+
+
+def test_threads_unique_uids() -> None:
+    def _build(_):
+        components = [gf.Component() for _ in range(200)]
+        ports = [
+            gf.Port(name="o1", midpoint=(0, 0), width=1, orientation=0, layer=(1, 0))
+            for _ in range(200)
+        ]
+        return [c.uid for c in components], [p.uid for p in ports]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(_build, range(8)))
+    component_uids = [uid for uids, _ in results for uid in uids]
+    port_uids = [uid for _, uids in results for uid in uids]
+    assert len(set(component_uids)) == len(component_uids)
+    assert len(set(port_uids)) == len(port_uids)
+
+
+def test_merge_cache_from_process_pool() -> None:
+    straight = gf.components.straight(length=10)
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        futures = [
+            executor.submit(gf.components.mzi, delta_length=length)
+            for length in [10, 20]
+        ]
+        components = [gf.merge_cache(future.result()) for future in futures]
+
+    for component in components:
+        assert (
+            gf.components.mzi(delta_length=component.settings.full["delta_length"])
+            is component
+        )
+
+    c = gf.Component("top_merged")
+    for component in components:
+        c << component
+    c << straight
+    cells = c.get_dependencies(recursive=True)
+    names = [cell.name for cell in cells]
+    assert len(names) == len(set(names)), "duplicated cells after merge"
+    straights = [cell for cell in cells if cell.name == straight.name]
+    assert all(cell is straight for cell in straights)
+
+
+def test_merge_cache_renames_collisions() -> None:
+    """Cells not built by @cell with the same name in two workers are renamed."""
+    widths = [1.5, 2.5]
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(_with_plain_child, width=w) for w in widths]
+        components = [gf.merge_cache(future.result()) for future in futures]
+
+    children = [c.references[0].parent for c in components]
+    assert children[0] is not children[1]
+    assert children[0].name != children[1].name
+    assert [child.xsize for child in children] == widths
+
+    c = gf.Component("top_merged_collisions")
+    for component in components:
+        c << component
+    names = [cell.name for cell in c.get_dependencies(recursive=True)]
+    assert len(names) == len(set(names)), names
+    assert gf.merge_cache(components[0]) is components[0]
+    assert children[0].name == components[0].references[0].parent.name
+
+
+def test_build_parallel_deterministic_names(monkeypatch) -> None:
+    """Renamed cells do not depend on the order the workers finish."""
+    build_parallel = importlib.import_module("gdsfactory.build_parallel")
+    specs = [functools.partial(_with_plain_child, width=w) for w in [1.25, 2.25, 3.25]]
+
+    def _get_names():
+        gf.clear_cache()
+        build_parallel.BUILT.clear()
+        components = build_parallel.build_components_parallel(
+            specs, max_workers=2, progress=False
+        )
+        return [c.references[0].parent.name for c in components]
+
+    names = _get_names()
+    monkeypatch.setattr(
+        build_parallel, "as_completed", lambda futures: reversed(list(futures))
+    )
+    assert _get_names() == names
+    assert len(set(names)) == len(names)
+
+
+if __name__ == "__main__":
+    test_threads_build_cell_once()
+    test_merge_cache_from_process_pool()
@@ -0,0 +1,56 @@
+import gdspy
+import numpy as np
+
+import gdsfactory as gf
+
+
+def test_bbox_invalidation() -> None:
+    c = gf.Component("test_bbox_invalidation")
+    ref = c << gf.components.straight(length=10)
+    assert c.bbox.tolist() == [[0, -0.25], [10, 0.25]]
+
+    ref.movex(5)
+    assert c.bbox.tolist() == [[5, -0.25], [15, 0.25]]
+
+    ref.rotate(90)
+    assert c.bbox.tolist() == [[-0.25, 5], [0.25, 15]]
+
+    c.add_polygon([(0, 0), (20, 0), (20, 20)], layer=(2, 0))
+    assert c.bbox.tolist() == [[-0.25, 0], [20, 20]]
+    assert c.get_bbox(layers=[(1, 0)]).tolist() == [[-0.25, 5], [0.25, 15]]
+
+    c2 = gf.Component("test_bbox_invalidation_parent")
+    c2 << c
+    assert c2.bbox.tolist() == [[-0.25, 0], [20, 20]]
+    ref.movey(-10)
+    assert c2.bbox.tolist() == [[-0.25, -5], [20, 20]]
+
+
+def test_bbox_same_as_gdspy() -> None:
+    c = gf.Component("test_bbox_same_as_gdspy")
+    mzi = gf.components.mzi()
+    c << mzi
+    ref = c << mzi
+    ref.rotate(30).move((100, 100))
+    c.add_array(gf.components.pad(), columns=3, rows=2, spacing=(200, 200))
+
+    for cell in list(c.get_dependencies(recursive=True)) + [c]:
+        cell._bb_valid = False
+        bbox_gdspy = gdspy.Cell.get_bounding_box(cell)
+        assert np.allclose(cell.get_bounding_box(), bbox_gdspy)
+
+
+def test_bbox_cached(monkeypatch) -> None:
+    c = gf.Component("test_bbox_cached")
+    mzi = gf.components.mzi()
+    for i in range(500):
+        ref = c << mzi
+        ref.movex(i * 200)
+    bbox = c.bbox
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("bbox recomputed")
+
+    monkeypatch.setattr(gf.spatial_index, "CellIndex", _fail)
+    monkeypatch.setattr(gdspy.Cell, "get_bounding_box", _fail)
+    assert c.bbox.tolist() == bbox.tolist()
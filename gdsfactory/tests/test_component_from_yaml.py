@@ -5,10 +5,17 @@ import numpy as np
 import pytest
 from omegaconf import OmegaConf
 from pytest_regressions.data_regression import DataRegressionFixture
+from yaml.constructor import ConstructorError
 
+from gdsfactory.cell import clear_cache
 from gdsfactory.component import Component
 from gdsfactory.difftest import difftest
-from gdsfactory.read.from_yaml import from_yaml, sample_doe_function, sample_mmis
+from gdsfactory.read.from_yaml import (
+    ROUTES_CACHE,
+    from_yaml,
+    sample_doe_function,
+    sample_mmis,
+)
 
 sample_connections = """
 name: sample_connections
@@ -504,6 +511,89 @@ yaml_strings = dict(
 )
 
 
+sample_incremental = """
+name: sample_incremental
+
+instances:
+    mmi_a:
+      component: mmi2x2
+    mmi_b:
+      component: mmi2x2
+      settings:
+        length_mmi: {length_mmi}
+    mmi_c:
+      component: mmi2x2
+
+placements:
+    mmi_b:
+        x: 100
+    mmi_c:
+        x: 200
+        y: 50
+
+routes:
+    ab:
+        links:
+            mmi_a,o3: mmi_b,o2
+    bc:
+        links:
+            mmi_b,o3: mmi_c,o2
+"""
+
+
+def test_incremental() -> None:
+    """Rebuilding a changed YAML reuses the routes whose ports did not change."""
+    c1 = from_yaml(sample_incremental.format(length_mmi=10))
+    keys1 = set(ROUTES_CACHE["sample_incremental"])
+    c2 = from_yaml(sample_incremental.format(length_mmi=20))
+    keys2 = set(ROUTES_CACHE["sample_incremental"])
+    assert c1.name != c2.name
+    assert len(keys1 & keys2) == 1, "only route ab should be reused"
+    assert c1.routes["mmi_a,o3:mmi_b,o2"] == c2.routes["mmi_a,o3:mmi_b,o2"]
+    assert not {id(ref) for ref in c1.references} & {id(ref) for ref in c2.references}
+
+    clear_cache()
+    assert not ROUTES_CACHE
+    c3 = from_yaml(sample_incremental.format(length_mmi=20))
+    assert c3.routes == c2.routes
+    assert np.allclose(c3.bbox, c2.bbox)
+    assert c3.get_netlist() == c2.get_netlist()
+
+    unnamed = sample_incremental.replace("name: sample_incremental\n", "")
+    assert unnamed != sample_incremental
+    clear_cache()
+    from_yaml(unnamed.format(length_mmi=20))
+    assert not ROUTES_CACHE
+
+
+def test_duplicated_top_level_key() -> None:
+    """A repeated top level key is reported by the YAML loader, not merged."""
+    yaml_text = """
+name: sample_duplicated_instances
+instances:
+    mmi_a:
+      component: mmi2x2
+instances:
+    mmi_b:
+      component: mmi2x2
+"""
+    with pytest.raises(ConstructorError):
+        from_yaml(yaml_text)
+
+
+def test_max_workers() -> None:
+    """Instances built in a process pool give the same Component."""
+    c1 = from_yaml(sample_mmis)
+    clear_cache()
+    c2 = from_yaml(sample_mmis, max_workers=2)
+
+    assert c1.name == c2.name
+    assert np.allclose(c1.bbox, c2.bbox)
+    assert c1.get_netlist() == c2.get_netlist()
+    names = [cell.name for cell in c2.get_dependencies(recursive=True)]
+    assert len(names) == len(set(names))
+
+
 @pytest.mark.parametrize("yaml_key", yaml_strings.keys())
 def test_gds(yaml_key: str, data_regression: DataRegressionFixture) -> None:
     """Avoid regressions in GDS geometry shapes and layers."""
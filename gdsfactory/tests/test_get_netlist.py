@@ -7,6 +7,31 @@ def test_get_netlist_cell_array() -> None:
     assert len(n.keys()) == 5
 
 
+def test_get_instance_names() -> None:
+    from gdsfactory.add_pins import add_instance_label
+    from gdsfactory.get_netlist import get_instance_name, get_instance_names
+
+    c = gf.Component("test_get_instance_names")
+    s1 = c << gf.c.straight()
+    s2 = c << gf.c.straight()
+    s2.connect("o1", s1.ports["o2"])
+    add_instance_label(c, s1, instance_name="s1")
+
+    names = get_instance_names(c)
+    assert names == [get_instance_name(c, ref) for ref in c.references]
+    assert names[0] == "s1"
+
+    netlist = c.get_netlist_dict()
+    assert netlist["connections"] == {"s1,o2": f"{names[1]},o1"}
+
+
+def test_get_netlist_recursive_once() -> None:
+    c = gf.c.ring_single_array()
+    netlists = c.get_netlist_recursive()
+    assert len(netlists) == len(set(netlists))
+    assert f"{c.name}.ba" in netlists
+
+
 if __name__ == "__main__":
     c = gf.c.array()
     n = c.get_netlist_dict()
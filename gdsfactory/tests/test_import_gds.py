@@ -23,6 +23,20 @@ def test_import_gds_hierarchy() -> gf.Component:
     return c
 
 
+def test_import_gds_lazy() -> gf.Component:
+    c0 = gf.grid([gf.components.mzi_arms(), gf.components.straight(length=13)])
+    gdspath = c0.write_gds()
+    mzi = gf.components.mzi_arms()
+
+    c = import_gds(gdspath, cellname=mzi.name, lazy=True)
+    assert c.name == mzi.name, c.name
+    assert len(c.get_dependencies(recursive=True)) == len(
+        mzi.get_dependencies(recursive=True)
+    )
+    assert (c.bbox == mzi.bbox).all()
+    return c
+
+
 def test_import_ports() -> gf.Component:
     """Make sure you can import the ports"""
     c0 = gf.components.mzi_arms(decorator=gf.add_pins.add_pins)
@@ -0,0 +1,132 @@
+import copy
+import pickle
+import tracemalloc
+
+import pytest
+
+import gdsfactory as gf
+from gdsfactory.component import Component
+from gdsfactory.port_table import PortTable, TablePort
+
+
+@pytest.fixture(autouse=True)
+def port_table_min_ports(monkeypatch) -> None:
+    monkeypatch.setattr(gf.component, "PORT_TABLE_MIN_PORTS", 256)
+
+
+def _add_ports(c: Component, n: int) -> Component:
+    for i in range(n):
+        c.add_port(
+            f"e{i}",
+            midpoint=(10 * (i % 40), 5 * (i // 40)),
+            width=10,
+            orientation=90 * (i % 4),
+            layer=(49, 0) if i % 3 else (41, 0),
+            port_type="electrical" if i % 5 else "optical",
+        )
+    return c
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        dict(),
+        dict(clockwise=False),
+        dict(layer=(49, 0)),
+        dict(prefix="e1"),
+        dict(suffix="7"),
+        dict(orientation=90),
+        dict(width=10),
+        dict(layers_excluded=((41, 0),)),
+        dict(port_type="optical", clockwise=False),
+    ],
+)
+def test_port_table_select(kwargs) -> None:
+    c = _add_ports(Component(), 300)
+    assert isinstance(c.ports, PortTable)
+    ports = dict(c.ports.items())
+
+    selected = gf.port.select_ports(c.ports, **kwargs)
+    expected = gf.port.select_ports(ports, **kwargs)
+    assert list(selected) == list(expected)
+    assert [p.midpoint.tolist() for p in selected.values()] == [
+        p.midpoint.tolist() for p in expected.values()
+    ]
+
+
+def test_port_table_mutate() -> None:
+    c = _add_ports(Component(), 300)
+    port = c.ports["e5"]
+    port.move((1, 2))
+    port.orientation = 180
+    port.info["pad"] = 1
+    assert c.ports["e5"] is port
+    assert c.ports["e5"].midpoint.tolist() == [51, 2]
+    assert c.ports["e5"].orientation == 180
+
+    p = c.ports.pop("e5")
+    assert "e5" not in c.ports
+    assert p.info == {"pad": 1}
+    assert len(c.ports) == 299
+
+    c.add_port(name="e5", port=p)
+    assert list(c.ports)[-1] == "e5"
+    assert c.ports["e5"].midpoint.tolist() == [51, 2]
+
+    c2 = pickle.loads(pickle.dumps(c))
+    assert isinstance(c2.ports["e5"], TablePort)
+    assert c2.ports["e5"].parent is c2
+    assert c2.ports["e5"].to_dict() == c.ports["e5"].to_dict()
+
+
+def test_port_table_churn() -> None:
+    c = _add_ports(Component(), 300)
+    port = c.add_port("e_last", midpoint=(0, 0), width=1, orientation=0, layer=(1, 0))
+    for i in range(2000):
+        p = c.ports.pop(f"e{i % 300}")
+        p.move((1, 0))
+        c.add_port(name=f"e{i % 300}", port=p)
+
+    assert len(c.ports) == 301
+    assert len(c.ports._data) < 4 * 301
+    assert len(c.ports._xy) == len(c.ports._data)
+    assert port.name == "e_last" and port.width == 1
+    assert c.ports["e5"].midpoint.tolist() == [50 + 7, 0]
+    assert list(c.ports)[-1] == "e199"
+    assert c.ports.select(prefix="e_").keys() == {"e_last"}
+
+
+def test_port_table_deepcopy() -> None:
+    c = _add_ports(Component(), 300)
+    port = c.ports["e5"]
+    port.info["pad"] = [1]
+
+    p = copy.deepcopy(port)
+    assert not isinstance(p, TablePort)
+    assert p.to_dict() == port.to_dict()
+    p.info["pad"].append(2)
+    p.move((1, 0))
+    assert port.info["pad"] == [1]
+    assert c.ports["e5"].midpoint.tolist() == [50, 0]
+
+    ports = copy.deepcopy(c.ports)
+    assert isinstance(ports["e5"], TablePort)
+    ports["e5"].move((1, 0))
+    assert c.ports["e5"].midpoint.tolist() == [50, 0]
+
+
+def _get_memory(n: int) -> int:
+    tracemalloc.start()
+    c = _add_ports(Component(), n)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert len(c.ports) == n
+    return size
+
+
+def test_port_table_memory(monkeypatch) -> None:
+    n = 5000
+    size_table = _get_memory(n)
+    monkeypatch.setattr(gf.component, "PORT_TABLE_MIN_PORTS", None)
+    size_dict = _get_memory(n)
+    assert size_table * 2 < size_dict, (size_table / n, size_dict / n)
@@ -0,0 +1,70 @@
+import numpy as np
+
+import gdsfactory as gf
+
+
+@gf.cell
+def _many_ports(n: int = 300) -> gf.Component:
+    c = gf.Component()
+    for i in range(n):
+        c.add_port(
+            name=f"e{i}",
+            midpoint=(i * 1.5, i % 7),
+            width=0.5,
+            orientation=90 * (i % 4),
+            layer=(1, 0),
+        )
+    c.add_port(name="none", midpoint=(1, 2), width=1, orientation=None, layer=(1, 0))
+    return c
+
+
+def test_reference_ports_transform() -> None:
+    c = gf.Component()
+    ref = c << _many_ports()
+    ref.rotate(37)
+    ref.mirror()
+    ref.move((10.3, -7))
+
+    ports = ref.ports
+    for name, port in ref.parent.ports.items():
+        midpoint, orientation = ref._transform_port(
+            port.midpoint, port.orientation, ref.origin, ref.rotation, ref.x_reflection
+        )
+        np.testing.assert_allclose(ports[name].midpoint, midpoint)
+        if orientation is None:
+            assert ports[name].orientation is None
+        else:
+            np.testing.assert_allclose(ports[name].orientation, orientation)
+
+
+def test_reference_ports_invalidation() -> None:
+    c = gf.Component()
+    ref = c << _many_ports()
+    x0 = ref.ports["e1"].x
+    assert ref.ports is ref.ports
+
+    ref.move((5, 0))
+    assert ref.ports["e1"].x == x0 + 5
+
+    ref.rotate(90)
+    assert ref.ports["e0"].orientation == 90
+
+    ref.reflect_v()
+    assert ref.ports["e0"].orientation == 270
+
+
+def test_reference_ports_edit() -> None:
+    """Editing a returned port does not change the reference ports."""
+    parent = gf.Component()
+    parent.add_port(name="o2", midpoint=(10, 0), width=0.5, orientation=0, layer=(1, 0))
+    c = gf.Component()
+    ref = c << parent
+
+    port = ref.ports["o2"]
+    port.move((5, 0))
+    port.orientation = 90
+    assert np.allclose(ref.ports["o2"].midpoint, (10, 0))
+    assert ref.ports["o2"].orientation == 0
+
+    parent.ports["o2"].midpoint[1] = 3
+    assert np.allclose(ref.ports["o2"].midpoint, (10, 3))
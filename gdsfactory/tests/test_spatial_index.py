@@ -0,0 +1,101 @@
+import numpy as np
+
+import gdsfactory as gf
+from gdsfactory.spatial_index import get_index
+
+
+def _get_polygons_in_region(component, bbox):
+    (xmin, ymin), (xmax, ymax) = bbox
+    polygons = {}
+    for layer, layer_polygons in component.get_polygons(by_spec=True).items():
+        for p in layer_polygons:
+            if (
+                p[:, 0].min() <= xmax
+                and p[:, 0].max() >= xmin
+                and p[:, 1].min() <= ymax
+                and p[:, 1].max() >= ymin
+            ):
+                polygons.setdefault(layer, []).append(p)
+    return polygons
+
+
+def _assert_same_polygons(polygons1, polygons2) -> None:
+    assert set(polygons1) == set(polygons2)
+    for layer, polygons in polygons1.items():
+        key = sorted(tuple(np.round(p, 3).ravel()) for p in polygons)
+        key2 = sorted(tuple(np.round(p, 3).ravel()) for p in polygons2[layer])
+        assert key == key2, layer
+
+
+def test_query_region_transforms() -> None:
+    c = gf.Component("test_query_region_transforms")
+    mzi = gf.components.mzi()
+    c << mzi
+    ref = c << mzi
+    ref.rotate(90).move((200, 30))
+    ref = c << mzi
+    ref.reflect((0, 1), (1, 0)).rotate(30).move((-100, 200))
+    array = c.add_array(gf.components.straight(), columns=4, rows=3, spacing=(20, 15))
+    array.rotation = 90
+    array.origin = (0, -100)
+
+    for bbox in [((-10, -10), (50, 50)), ((150, 0), (250, 120)), ((-60, -80), (0, 0))]:
+        _assert_same_polygons(c.query_region(bbox), _get_polygons_in_region(c, bbox))
+
+
+def test_iter_polygons() -> None:
+    c = gf.Component("test_iter_polygons")
+    array = c.add_array(gf.components.mzi(), columns=3, rows=2, spacing=(300, 200))
+    array.rotate(37)
+    ref = c << gf.components.ring_single()
+    ref.rotate(30).mirror()
+
+    polygons = {}
+    for layer, points in c.iter_polygons():
+        polygons.setdefault(layer, []).append(points)
+
+    expected = c.get_polygons(by_spec=True)
+    assert set(polygons) == set(expected)
+    for layer, points in expected.items():
+        assert len(polygons[layer]) == len(points)
+        for p1, p2 in zip(polygons[layer], points):
+            np.testing.assert_allclose(p1, p2)
+
+    layer = (1, 0)
+    assert sum(1 for _ in c.iter_polygons(layers=[layer])) == len(expected[layer])
+    assert sum(1 for _ in c.iter_polygons(depth=0)) == 0
+
+
+def test_query_region_invalidation() -> None:
+    c = gf.Component("test_query_region_invalidation")
+    ref = c << gf.components.straight(length=10)
+    bbox = ((100, -1), (101, 1))
+    assert c.query_region(bbox) == {}
+    index = get_index(c)
+
+    ref.movex(95)
+    assert get_index(c) is not index
+    assert set(c.query_region(bbox)) == {(1, 0)}
+
+    c.add_polygon([(200, 0), (210, 0), (210, 10)], layer=(2, 0))
+    assert set(c.query_region(((205, 1), (206, 2)))) == {(2, 0)}
+    assert c.query_region(((205, 1), (206, 2)), layers=[(1, 0)]) == {}
+
+
+def test_nearest_ports() -> None:
+    c = gf.Component("test_nearest_ports")
+    for i in range(20):
+        ref = c << gf.components.straight(length=5)
+        ref.move((20 * i, 0))
+    c.add_port("o1", port=c.references[0].ports["o1"])
+
+    point = (103, 0)
+    ports = c.nearest_ports(point, k=3, include_references=True)
+    all_ports = list(c.ports.values()) + [
+        port for ref in c.references for port in ref.ports.values()
+    ]
+    expected = sorted(all_ports, key=lambda p: np.hypot(*(p.midpoint - point)))[:3]
+    assert [p.midpoint.tolist() for p in ports] == [
+        p.midpoint.tolist() for p in expected
+    ]
+    assert c.nearest_ports((-5, 0))[0].name == "o1"